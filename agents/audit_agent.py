@@ -1,84 +1,332 @@
 """Audit Agent for AWS resource scanning"""
+import os
+import threading
 import boto3
-from typing import List, Dict
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, List, Dict, Optional, Sequence, Tuple
 from datetime import datetime
+from agents import metrics
+from agents.clients import default_session, get_client
+from agents.resource_table import ResourceTable
+from agents.s3_probes import S3_PROBES, THROTTLED, ERROR, BucketProbeCache, bucket_region, run_probe
+
+DEFAULT_SERVICES = ('ec2', 'rds', 's3')
+GLOBAL_SERVICES = ('s3',)
+DEFAULT_S3_PROBES = ('encryption', 'public_access_block', 'versioning', 'logging')
+
+# Most identifiers a describe_* filter accepts in one request
+EC2_FILTER_VALUES = 200
+RDS_FILTER_VALUES = 100
+
+
+def instance_encrypted(instance: Dict, volumes: Optional[Dict[str, bool]]) -> Optional[bool]:
+    """Whether every EBS volume attached to an instance is encrypted, or None if that is not known"""
+    volume_ids = [mapping['Ebs']['VolumeId'] for mapping in instance.get('BlockDeviceMappings', [])
+                  if 'Ebs' in mapping]
+    if volumes is None or not volume_ids or any(volume_id not in volumes for volume_id in volume_ids):
+        return None
+    return all(volumes[volume_id] for volume_id in volume_ids)
+
+
+def default_regions(session: Optional[boto3.Session] = None) -> List[str]:
+    """Regions to scan: ENFORCE_AI_REGIONS (comma separated) or the session region"""
+    configured = os.environ.get('ENFORCE_AI_REGIONS', '')
+    regions = [region.strip() for region in configured.split(',') if region.strip()]
+    if regions:
+        return regions
+    region = (session or default_session()).region_name
+    return [region or 'us-east-1']
+
 
 class AuditAgent:
-    def __init__(self):
-        self.ec2 = boto3.client('ec2')
-        self.rds = boto3.client('rds')
-        self.s3 = boto3.client('s3')
-        self.iam = boto3.client('iam')
-    
-    def scan_ec2_instances(self) -> List[Dict]:
-        """Scan EC2 instances for compliance"""
+    def __init__(self, regions: Optional[Sequence[str]] = None,
+                 services: Sequence[str] = DEFAULT_SERVICES,
+                 max_workers: int = 8,
+                 session: Optional[boto3.Session] = None,
+                 s3_probes: Sequence[str] = DEFAULT_S3_PROBES,
+                 s3_concurrency: int = 16,
+                 bucket_cache: Optional[BucketProbeCache] = None):
+        self.session = session
+        self.regions = list(regions) if regions else default_regions(session)
+        self.services = list(services)
+        self.max_workers = max_workers
+        unknown = set(s3_probes) - set(S3_PROBES)
+        if unknown:
+            raise ValueError(f'Unknown S3 probes: {sorted(unknown)}')
+        self.s3_probes = list(s3_probes)
+        self.s3_concurrency = s3_concurrency
+        self.bucket_cache = bucket_cache if bucket_cache is not None else BucketProbeCache()
+        self._config = Config(max_pool_connections=max(10, s3_concurrency))
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+    def _client(self, service: str, region: Optional[str] = None):
+        """Return a cached client for a service in a region
+
+        Without an explicit session, clients are shared process-wide.
+        """
+        region = region or self.regions[0]
+        if self.session is None:
+            return get_client(service, region, self._config)
+        key = (service, region)
+        with self._clients_lock:
+            if key not in self._clients:
+                self._clients[key] = metrics.instrument_client(
+                    self.session.client(service, region_name=region, config=self._config))
+            return self._clients[key]
+
+    @property
+    def ec2(self):
+        return self._client('ec2')
+
+    @property
+    def rds(self):
+        return self._client('rds')
+
+    @property
+    def s3(self):
+        return self._client('s3')
+
+    @property
+    def iam(self):
+        return self._client('iam')
+
+    def _ec2_requests(self, filter_name: str, instance_ids: Optional[Sequence[str]]) -> List[Dict]:
+        # Unknown ids in a filter are ignored rather than failing the call
+        if instance_ids is None:
+            return [{}]
+        return [{'Filters': [{'Name': filter_name, 'Values': list(instance_ids[i:i + EC2_FILTER_VALUES])}]}
+                for i in range(0, len(instance_ids), EC2_FILTER_VALUES)]
+
+    def scan_ebs_encryption(self, region: str,
+                            instance_ids: Optional[Sequence[str]] = None) -> Optional[Dict[str, bool]]:
+        """Encrypted flag of each EBS volume in a region, only those attached to ``instance_ids`` if given
+
+        Returns None when the volumes cannot be described, so instance
+        encryption is left unknown rather than guessed.
+        """
         try:
-            response = self.ec2.describe_instances()
-            instances = []
-            
-            for reservation in response['Reservations']:
-                for instance in reservation['Instances']:
-                    instances.append({
-                        'resource_type': 'EC2',
-                        'resource_id': instance['InstanceId'],
-                        'state': instance['State']['Name'],
-                        'security_groups': [sg['GroupId'] for sg in instance['SecurityGroups']],
-                        'encrypted': instance.get('EbsOptimized', False),
-                        'last_scan': datetime.now().isoformat()
-                    })
+            paginator = self._client('ec2', region).get_paginator('describe_volumes')
+            encrypted = {}
+            for request in self._ec2_requests('attachment.instance-id', instance_ids):
+                for page in paginator.paginate(**request):
+                    for volume in page['Volumes']:
+                        encrypted[volume['VolumeId']] = bool(volume.get('Encrypted', False))
+            return encrypted
+        except (BotoCoreError, ClientError):
+            return None
+
+    def scan_ec2_instances(self, region: Optional[str] = None,
+                           instance_ids: Optional[Sequence[str]] = None) -> ResourceTable:
+        """Scan EC2 instances for compliance, only ``instance_ids`` if given
+
+        ``encrypted`` reflects the instance's attached EBS volumes: True only
+        if all of them are encrypted, None if they could not be read.
+        """
+        region = region or self.regions[0]
+        try:
+            paginator = self._client('ec2', region).get_paginator('describe_instances')
+            instances = ResourceTable()
+            scanned_at = datetime.now().isoformat()
+            volumes = self.scan_ebs_encryption(region, instance_ids)
+
+            for request in self._ec2_requests('instance-id', instance_ids):
+                for page in paginator.paginate(**request):
+                    for reservation in page['Reservations']:
+                        for instance in reservation['Instances']:
+                            instances.append({
+                                'resource_type': 'EC2',
+                                'resource_id': instance['InstanceId'],
+                                'region': region,
+                                'state': instance['State']['Name'],
+                                'security_groups': [sg['GroupId'] for sg in instance.get('SecurityGroups', [])],
+                                'encrypted': instance_encrypted(instance, volumes),
+                                'last_scan': scanned_at
+                            })
             return instances
         except Exception as e:
-            return [{'error': f'EC2 scan failed: {str(e)}'}]
-    
-    def scan_rds_instances(self) -> List[Dict]:
-        """Scan RDS instances for compliance"""
+            return ResourceTable([{'error': f'EC2 scan failed in {region}: {str(e)}'}])
+
+    def scan_rds_instances(self, region: Optional[str] = None,
+                           db_instance_ids: Optional[Sequence[str]] = None) -> ResourceTable:
+        """Scan RDS instances for compliance, only ``db_instance_ids`` if given"""
+        region = region or self.regions[0]
         try:
-            response = self.rds.describe_db_instances()
-            instances = []
-            
-            for db in response['DBInstances']:
-                instances.append({
-                    'resource_type': 'RDS',
-                    'resource_id': db['DBInstanceIdentifier'],
-                    'engine': db['Engine'],
-                    'encrypted': db.get('StorageEncrypted', False),
-                    'backup_retention': db.get('BackupRetentionPeriod', 0),
-                    'multi_az': db.get('MultiAZ', False),
-                    'last_scan': datetime.now().isoformat()
-                })
+            paginator = self._client('rds', region).get_paginator('describe_db_instances')
+            instances = ResourceTable()
+            scanned_at = datetime.now().isoformat()
+
+            if db_instance_ids is None:
+                requests = [{}]
+            else:
+                requests = [{'Filters': [{'Name': 'db-instance-id',
+                                          'Values': list(db_instance_ids[i:i + RDS_FILTER_VALUES])}]}
+                            for i in range(0, len(db_instance_ids), RDS_FILTER_VALUES)]
+            for request in requests:
+                for page in paginator.paginate(**request):
+                    for db in page['DBInstances']:
+                        instances.append({
+                            'resource_type': 'RDS',
+                            'resource_id': db['DBInstanceIdentifier'],
+                            'region': region,
+                            'engine': db['Engine'],
+                            'encrypted': db.get('StorageEncrypted', False),
+                            'backup_retention': db.get('BackupRetentionPeriod', 0),
+                            'multi_az': db.get('MultiAZ', False),
+                            'last_scan': scanned_at
+                        })
             return instances
         except Exception as e:
-            return [{'error': f'RDS scan failed: {str(e)}'}]
-    
-    def scan_s3_buckets(self) -> List[Dict]:
-        """Scan S3 buckets for compliance"""
-        try:
-            response = self.s3.list_buckets()
+            return ResourceTable([{'error': f'RDS scan failed in {region}: {str(e)}'}])
+
+    def _list_buckets(self) -> List[Dict]:
+        """List every bucket, following continuation tokens when supported"""
+        if self.s3.can_paginate('list_buckets'):
             buckets = []
-            
-            for bucket in response['Buckets']:
-                bucket_name = bucket['Name']
-                try:
-                    encryption = self.s3.get_bucket_encryption(Bucket=bucket_name)
-                    encrypted = True
-                except:
-                    encrypted = False
-                
-                buckets.append({
-                    'resource_type': 'S3',
-                    'resource_id': bucket_name,
-                    'encrypted': encrypted,
-                    'creation_date': bucket['CreationDate'].isoformat(),
-                    'last_scan': datetime.now().isoformat()
-                })
+            for page in self.s3.get_paginator('list_buckets').paginate():
+                buckets.extend(page['Buckets'])
             return buckets
+        return self.s3.list_buckets()['Buckets']
+
+    def _probe_bucket(self, bucket: Dict, scanned_at: Optional[str] = None) -> Dict:
+        """Run the configured probes for one bucket against its home region"""
+        bucket_name = bucket['Name']
+        creation_date = bucket['CreationDate'].isoformat()
+        resource = {
+            'resource_type': 'S3',
+            'resource_id': bucket_name,
+            'creation_date': creation_date,
+        }
+        try:
+            region = bucket_region(self.s3, bucket)
+        except Exception as e:
+            resource.update({'error': f'S3 bucket location failed for {bucket_name}: {str(e)}'})
+            return resource
+        resource['region'] = region
+
+        identity = (creation_date, region)
+        attributes = self.bucket_cache.get(bucket_name, identity)
+        if attributes is None:
+            client = self._client('s3', region)
+            attributes, errors = {}, {}
+            for name in self.s3_probes:
+                values, error = run_probe(name, client, bucket_name)
+                attributes.update(values)
+                if error:
+                    errors[name] = error
+            if errors:
+                attributes['probe_errors'] = errors
+            if not set(errors.values()) & {THROTTLED, ERROR}:
+                self.bucket_cache.put(bucket_name, identity, attributes)
+
+        resource.update(attributes)
+        resource['last_scan'] = scanned_at or datetime.now().isoformat()
+        return resource
+
+    def _find_buckets(self, bucket_names: Sequence[str]) -> List[Dict]:
+        """Look up named buckets with one prefix-filtered listing each; missing buckets are skipped"""
+        buckets = []
+        for name in bucket_names:
+            listed = self.s3.list_buckets(Prefix=name)['Buckets']
+            buckets.extend(bucket for bucket in listed if bucket['Name'] == name)
+        return buckets
+
+    def scan_s3_buckets(self, bucket_names: Optional[Sequence[str]] = None) -> ResourceTable:
+        """Scan S3 buckets for compliance, only ``bucket_names`` if given
+
+        Buckets are probed concurrently (at most ``s3_concurrency`` in flight),
+        each against its own region. Probe results are cached per bucket, so the
+        next scan only re-probes new, recreated or expired buckets and those
+        whose probes were throttled or failed unexpectedly. Named buckets are
+        always probed again.
+        """
+        try:
+            if bucket_names is None:
+                buckets = self._list_buckets()
+            else:
+                for name in bucket_names:
+                    self.bucket_cache.invalidate(name)
+                buckets = self._find_buckets(bucket_names)
+            if not buckets:
+                return ResourceTable()
+            scanned_at = datetime.now().isoformat()
+            with ThreadPoolExecutor(max_workers=max(1, min(self.s3_concurrency, len(buckets)))) as pool:
+                return ResourceTable(pool.map(lambda bucket: self._probe_bucket(bucket, scanned_at), buckets))
         except Exception as e:
-            return [{'error': f'S3 scan failed: {str(e)}'}]
-    
-    def get_all_resources(self) -> List[Dict]:
-        """Get all AWS resources for compliance scanning"""
-        resources = []
-        resources.extend(self.scan_ec2_instances())
-        resources.extend(self.scan_rds_instances())
-        resources.extend(self.scan_s3_buckets())
-        return resources
\ No newline at end of file
+            return ResourceTable([{'error': f'S3 scan failed: {str(e)}'}])
+
+    def _scan_tasks(self) -> List[tuple]:
+        """Expand the configured services into (service, region) scan units"""
+        tasks = []
+        for service in self.services:
+            if service in GLOBAL_SERVICES:
+                tasks.append((service, None))
+            else:
+                tasks.extend((service, region) for region in self.regions)
+        return tasks
+
+    def _run_scan(self, service: str, region: Optional[str]) -> ResourceTable:
+        scanners = {
+            'ec2': self.scan_ec2_instances,
+            'rds': self.scan_rds_instances,
+        }
+        with metrics.span('audit.scan', service=service, region=region or 'global'):
+            if service == 's3':
+                return self.scan_s3_buckets()
+            if service in scanners:
+                return scanners[service](region)
+        return ResourceTable([{'error': f'Unsupported service: {service}'}])
+
+    def get_all_resources(self, progress: Optional[Callable[[int, int], None]] = None) -> ResourceTable:
+        """Get all AWS resources for compliance scanning
+
+        Every (service, region) pair is scanned on a bounded worker pool, so the
+        wall time is set by the slowest region rather than the sum of all of them.
+        Results are merged in the configured service/region order into one
+        ResourceTable. ``progress(completed, total)`` is called as scan units finish.
+        """
+        tasks = self._scan_tasks()
+        results = {}
+        if progress:
+            progress(0, len(tasks))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(tasks)))) as pool:
+            futures = {pool.submit(self._run_scan, *task): task for task in tasks}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if progress:
+                    progress(len(results), len(tasks))
+
+        return ResourceTable.concat(results[task] for task in tasks)
+
+    def scan_targets(self, targets: Iterable[Tuple[str, Optional[str], str]]) -> ResourceTable:
+        """Rescan only the given (service, region, resource_id) targets
+
+        Targets are grouped into one filtered describe call per service and
+        region (S3 buckets are global and looked up by name), and the groups
+        are scanned on the worker pool. Targets that no longer exist are
+        simply absent from the result.
+        """
+        groups = {}
+        for service, region, resource_id in targets:
+            region = None if service in GLOBAL_SERVICES else region or self.regions[0]
+            groups.setdefault((service, region), []).append(resource_id)
+        if not groups:
+            return ResourceTable()
+
+        def scan(task):
+            (service, region), ids = task
+            ids = list(dict.fromkeys(ids))
+            with metrics.span('audit.rescan', service=service, region=region or 'global'):
+                if service == 'ec2':
+                    return self.scan_ec2_instances(region, instance_ids=ids)
+                if service == 'rds':
+                    return self.scan_rds_instances(region, db_instance_ids=ids)
+                if service == 's3':
+                    return self.scan_s3_buckets(bucket_names=ids)
+                return ResourceTable([{'error': f'Unsupported service: {service}'}])
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(groups)))) as pool:
+            return ResourceTable.concat(pool.map(scan, groups.items()))
@@ -0,0 +1,165 @@
+"""Adaptive-concurrency execution pool for Bedrock calls"""
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, Iterable, List
+
+from botocore.exceptions import ClientError
+
+from agents import metrics
+
+THROTTLE_CODES = {'ThrottlingException', 'TooManyRequestsException', 'ServiceQuotaExceededException'}
+RETRYABLE_CODES = THROTTLE_CODES | {'ServiceUnavailableException', 'ModelNotReadyException',
+                                    'InternalServerException', 'ModelTimeoutException'}
+
+
+def error_code(error: Exception) -> str:
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code', '')
+    return ''
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit: grows by about one slot per window of successes,
+    shrinks multiplicatively on every throttle"""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32, backoff: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, cancelled: Callable[[], bool] = lambda: False):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                if cancelled():
+                    raise CancelledError()
+                self._condition.wait(timeout=0.1)
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify()
+
+    def on_throttle(self):
+        with self._condition:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+
+
+class BedrockPool:
+    """Runs Bedrock calls under an adaptive concurrency limit with jittered retries
+
+    ``call`` guards a single model invocation: it waits for a slot, retries
+    throttling and transient errors with full-jitter exponential backoff, and
+    feeds the outcome back into the limit. ``submit`` fans work (which may make
+    several guarded calls) out to worker threads and returns a cancellable
+    Future; ``run`` is its awaitable form. ``cancel_pending`` aborts every
+    queued call and every call waiting for a slot or a retry.
+    """
+
+    def __init__(self, max_concurrency: int = 16, initial_concurrency: int = 4, min_concurrency: int = 1,
+                 max_retries: int = 6, base_delay: float = 0.25, max_delay: float = 8.0):
+        self.limiter = AdaptiveLimiter(initial_concurrency, min_concurrency, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='bedrock')
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'retries': 0, 'throttles': 0, 'failures': 0, 'cancelled': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+        metrics.count(f'bedrock_pool_{name}')
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Invoke ``fn`` under the concurrency limit, retrying throttles and transient errors"""
+        generation = self._generation
+        cancelled = lambda: self._generation != generation
+        attempt = 0
+        while True:
+            try:
+                self.limiter.acquire(cancelled)
+            except CancelledError:
+                self._count('cancelled')
+                raise
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                code = error_code(e)
+                if code in THROTTLE_CODES:
+                    self._count('throttles')
+                    self.limiter.on_throttle()
+                if code not in RETRYABLE_CODES or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+            else:
+                self._count('calls')
+                self.limiter.on_success()
+                return result
+            finally:
+                self.limiter.release()
+
+            attempt += 1
+            self._count('retries')
+            deadline = time.monotonic() + random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            while time.monotonic() < deadline:
+                if cancelled():
+                    self._count('cancelled')
+                    raise CancelledError()
+                time.sleep(min(0.05, max(0.0, deadline - time.monotonic())))
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Run ``fn`` on a worker thread; the returned Future can be cancelled while queued"""
+        generation = self._generation
+
+        def run():
+            if self._generation != generation:
+                self._count('cancelled')
+                raise CancelledError()
+            return fn(*args, **kwargs)
+
+        return self._executor.submit(run)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Awaitable form of ``submit``; cancelling the awaiting task cancels a queued call"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def map(self, fn: Callable, iterable: Iterable) -> List:
+        """Apply ``fn`` to every item concurrently and return results in order"""
+        futures = [self.submit(fn, item) for item in iterable]
+        return [future.result() for future in futures]
+
+    def cancel_pending(self):
+        """Abort queued calls and calls waiting for a slot or a retry; running calls finish"""
+        with self._lock:
+            self._generation += 1
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats, concurrency_limit=round(self.limiter.limit, 2))
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool() -> BedrockPool:
+    """Process-wide pool sized from BEDROCK_MAX_CONCURRENCY"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = BedrockPool(max_concurrency=int(os.environ.get('BEDROCK_MAX_CONCURRENCY', 16)))
+        return _shared_pool
@@ -0,0 +1,194 @@
+"""Shared Bedrock invocation helpers for the Compliance and Policy agents"""
+import json
+import os
+import threading
+from typing import Dict, Iterator, Optional, Union
+
+from botocore.config import Config
+
+from agents import metrics
+from agents.bedrock_pool import BedrockPool
+from agents.response_cache import ResponseCache, cache_key
+
+ANTHROPIC_VERSION = "bedrock-2023-05-31"
+DEFAULT_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+# Retries and throttling backoff are handled by BedrockPool, which needs to see
+# every ThrottlingException to adapt its concurrency limit.
+BEDROCK_CLIENT_CONFIG = Config(
+    retries={'mode': 'standard', 'max_attempts': 1},
+    max_pool_connections=int(os.environ.get('BEDROCK_MAX_CONCURRENCY', 16))
+)
+
+
+class TokenUsage:
+    """Thread-safe token accounting: the estimate made before sending and what Bedrock reports
+
+    Responses served from the response cache are counted but cost no tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'cached': 0, 'estimated_input_tokens': 0, 'input_tokens': 0, 'output_tokens': 0}
+
+    def record(self, prompt: str, result: Dict, cached: bool = False):
+        usage = result.get('usage', {}) if isinstance(result, dict) else {}
+        with self._lock:
+            if cached:
+                self.stats['cached'] += 1
+                return
+            self.stats['calls'] += 1
+            self.stats['estimated_input_tokens'] += estimate_tokens(prompt)
+            self.stats['input_tokens'] += usage.get('input_tokens', 0)
+            self.stats['output_tokens'] += usage.get('output_tokens', 0)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def reset(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+
+def count_usage(model_id: str, result: Dict, cached: bool = False):
+    """Mirror a response's token usage (or a cache hit) into ``agents.metrics``"""
+    if not metrics.enabled():
+        return
+    if cached:
+        metrics.count('bedrock_cache_hits', model=model_id)
+        return
+    reported = result.get('usage', {}) if isinstance(result, dict) else {}
+    metrics.count('bedrock_input_tokens', reported.get('input_tokens', 0), model=model_id)
+    metrics.count('bedrock_output_tokens', reported.get('output_tokens', 0), model=model_id)
+
+
+def build_request(prompt: str, max_tokens: int = 1000, **inference) -> Dict:
+    """Anthropic messages request body for a single user prompt"""
+    request = {
+        "anthropic_version": ANTHROPIC_VERSION,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    request.update(inference)
+    return request
+
+
+def invoke_model(bedrock, model_id: str, prompt: str, max_tokens: int = 1000,
+                 cache: Optional[ResponseCache] = None, pool: Optional[BedrockPool] = None,
+                 usage: Optional[TokenUsage] = None, **inference) -> Dict:
+    """Invoke a model and return the parsed response body, served from cache when possible
+
+    With a pool, the call runs under its adaptive concurrency limit and retry policy.
+    With ``usage``, the call's token counts are recorded; they always go to
+    ``agents.metrics`` when it is recording.
+    """
+    key = None
+    if cache is not None:
+        key = cache_key(model_id, prompt, dict(inference, max_tokens=max_tokens))
+        cached = cache.get(key)
+        if cached is not None:
+            if usage is not None:
+                usage.record(prompt, cached, cached=True)
+            count_usage(model_id, cached, cached=True)
+            return cached
+
+    body = json.dumps(build_request(prompt, max_tokens, **inference))
+
+    def call():
+        response = bedrock.invoke_model(modelId=model_id, body=body)
+        return json.loads(response['body'].read())
+
+    with metrics.span('bedrock.invoke', model=model_id, operation='invoke_model'):
+        result = pool.call(call) if pool is not None else call()
+    if usage is not None:
+        usage.record(prompt, result)
+    count_usage(model_id, result)
+
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def stream_model(bedrock, model_id: str, prompt: str, max_tokens: int = 1000,
+                 cache: Optional[ResponseCache] = None, pool: Optional[BedrockPool] = None,
+                 usage: Optional[TokenUsage] = None, **inference) -> Iterator[str]:
+    """Yield response text chunks as they arrive via invoke_model_with_response_stream
+
+    A cached response is yielded as a single chunk. A completed stream is cached
+    in the same shape ``invoke_model`` returns, so both paths share entries.
+    """
+    key = None
+    if cache is not None:
+        key = cache_key(model_id, prompt, dict(inference, max_tokens=max_tokens))
+        cached = cache.get(key)
+        if cached is not None:
+            if usage is not None:
+                usage.record(prompt, cached, cached=True)
+            count_usage(model_id, cached, cached=True)
+            yield response_text(cached)
+            return
+
+    body = json.dumps(build_request(prompt, max_tokens, **inference))
+
+    def call():
+        return bedrock.invoke_model_with_response_stream(modelId=model_id, body=body)
+
+    # Timed until the stream opens; the tokens are counted once it completes
+    with metrics.span('bedrock.invoke', model=model_id, operation='invoke_model_with_response_stream'):
+        response = pool.call(call) if pool is not None else call()
+    chunks = []
+    reported = {}
+    for event in response['body']:
+        if 'chunk' not in event:
+            continue
+        payload = json.loads(event['chunk']['bytes'])
+        if payload.get('type') == 'content_block_delta':
+            text = payload.get('delta', {}).get('text', '')
+            if text:
+                chunks.append(text)
+                yield text
+        elif payload.get('type') == 'message_start':
+            reported.update(payload.get('message', {}).get('usage', {}))
+        elif payload.get('type') == 'message_delta':
+            reported.update(payload.get('usage', {}))
+
+    result = {'content': [{'type': 'text', 'text': ''.join(chunks)}], 'usage': reported}
+    if usage is not None:
+        usage.record(prompt, result)
+    count_usage(model_id, result)
+    if cache is not None:
+        cache.put(key, result)
+
+
+def response_text(result: Dict) -> str:
+    """Concatenated text blocks of a parsed messages response"""
+    return ''.join(block.get('text', '') for block in result.get('content', []) if block.get('type', 'text') == 'text')
+
+
+def response_json(result: Dict) -> Optional[Dict]:
+    """The JSON object in a parsed messages response, or None if there is none"""
+    parsed = extract_json(response_text(result))
+    return parsed if isinstance(parsed, dict) else None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Claude models (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def extract_json(text: str) -> Optional[Union[Dict, list]]:
+    """Parse the JSON object or array in a model response, tolerating surrounding prose"""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+    for opener, closer in (('{', '}'), ('[', ']')):
+        start, end = text.find(opener), text.rfind(closer)
+        if start != -1 and end > start:
+            try:
+                return json.loads(text[start:end + 1])
+            except ValueError:
+                continue
+    return None
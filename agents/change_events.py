@@ -0,0 +1,172 @@
+"""Map CloudTrail and EventBridge change events to the resources they affect
+
+Accepts EventBridge events (``AWS API Call via CloudTrail`` and the EC2 and
+RDS state-change notifications), raw CloudTrail records or log files, and
+SQS batches carrying either. Each event is resolved to (service, region,
+resource_id) rescan targets; repeated events for a target are coalesced,
+and events already covered by a later rescan are dropped.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+Target = Tuple[str, Optional[str], str]
+
+
+def _instance_ids(detail: Dict) -> List[str]:
+    ids = []
+    for section in ('requestParameters', 'responseElements'):
+        parameters = detail.get(section) or {}
+        if parameters.get('instanceId'):
+            ids.append(parameters['instanceId'])
+        for item in (parameters.get('instancesSet') or {}).get('items', []):
+            if item.get('instanceId'):
+                ids.append(item['instanceId'])
+    return list(dict.fromkeys(ids))
+
+
+def _db_instance_ids(detail: Dict) -> List[str]:
+    parameters = detail.get('requestParameters') or {}
+    identifier = parameters.get('dBInstanceIdentifier') or parameters.get('targetDBInstanceIdentifier')
+    return [identifier] if identifier else []
+
+
+def _bucket_names(detail: Dict) -> List[str]:
+    bucket = (detail.get('requestParameters') or {}).get('bucketName')
+    return [bucket] if bucket else []
+
+
+# CloudTrail eventSource -> (service, resource id extractor, configuration-changing event names)
+CLOUDTRAIL_EVENTS = {
+    'ec2.amazonaws.com': ('ec2', _instance_ids, frozenset({
+        'RunInstances', 'StartInstances', 'StopInstances', 'TerminateInstances', 'RebootInstances',
+        'ModifyInstanceAttribute', 'ModifyInstanceMetadataOptions', 'AssociateIamInstanceProfile',
+        'ReplaceIamInstanceProfileAssociation',
+    })),
+    'rds.amazonaws.com': ('rds', _db_instance_ids, frozenset({
+        'CreateDBInstance', 'CreateDBInstanceReadReplica', 'ModifyDBInstance', 'DeleteDBInstance',
+        'RestoreDBInstanceFromDBSnapshot', 'RestoreDBInstanceToPointInTime', 'StartDBInstance',
+        'StopDBInstance', 'RebootDBInstance',
+    })),
+    's3.amazonaws.com': ('s3', _bucket_names, frozenset({
+        'CreateBucket', 'DeleteBucket', 'PutBucketEncryption', 'DeleteBucketEncryption', 'PutBucketVersioning',
+        'PutBucketLogging', 'PutPublicAccessBlock', 'DeletePublicAccessBlock', 'PutBucketPolicy',
+        'DeleteBucketPolicy', 'PutBucketAcl',
+    })),
+}
+
+def _state_change_instance_ids(detail: Dict) -> List[str]:
+    return [detail['instance-id']] if detail.get('instance-id') else []
+
+
+def _rds_event_instance_ids(detail: Dict) -> List[str]:
+    if detail.get('SourceType', 'DB_INSTANCE') != 'DB_INSTANCE' or not detail.get('SourceIdentifier'):
+        return []
+    return [detail['SourceIdentifier']]
+
+
+# EventBridge detail-type -> (service, resource id extractor) for service-native notifications
+NATIVE_EVENTS = {
+    'EC2 Instance State-change Notification': ('ec2', _state_change_instance_ids),
+    'RDS DB Instance Event': ('rds', _rds_event_instance_ids),
+}
+
+
+def is_change_event(payload: Dict) -> bool:
+    """Whether a Lambda payload is an EventBridge event, CloudTrail log or SQS batch rather than a request"""
+    if 'detail-type' in payload or ('eventSource' in payload and 'eventName' in payload):
+        return True
+    records = payload.get('Records')
+    return bool(records) and isinstance(records, list) and isinstance(records[0], dict) and \
+        ('eventName' in records[0] or records[0].get('eventSource') == 'aws:sqs')
+
+
+def iter_events(payload) -> Iterator[Dict]:
+    """Flatten a payload into individual EventBridge events and CloudTrail records"""
+    if isinstance(payload, list):
+        for item in payload:
+            yield from iter_events(item)
+    elif not isinstance(payload, dict):
+        return
+    elif 'events' in payload and 'request_type' in payload:
+        yield from iter_events(payload['events'])
+    elif 'Records' in payload:
+        for record in payload['Records']:
+            if record.get('eventSource') == 'aws:sqs':
+                yield from iter_events(json.loads(record['body']))
+            else:
+                yield record
+    else:
+        yield payload
+
+
+def _timestamp(value: Optional[str]) -> float:
+    if not value:
+        return time.time()
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def resolve(event: Dict) -> Tuple[List[Target], float]:
+    """Rescan targets of one event and when the change happened; no targets if it changes nothing scanned"""
+    detail_type = event.get('detail-type')
+    if detail_type in NATIVE_EVENTS:
+        service, extract = NATIVE_EVENTS[detail_type]
+        return [(service, event.get('region'), resource_id) for resource_id in extract(event.get('detail') or {})], \
+            _timestamp(event.get('time'))
+
+    record = event.get('detail', {}) if detail_type else event
+    source = CLOUDTRAIL_EVENTS.get(record.get('eventSource'))
+    if source is None or record.get('eventName') not in source[2] or record.get('errorCode'):
+        return [], 0.0
+    service, extract, _ = source
+    region = record.get('awsRegion') or event.get('region')
+    return [(service, region, resource_id) for resource_id in extract(record)], \
+        _timestamp(record.get('eventTime') or event.get('time'))
+
+
+class RescanLedger:
+    """When each target was last rescanned, so later-delivered older events can be skipped
+
+    Bounded LRU; lives for the execution environment like the agents.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._rescanned = OrderedDict()
+        self._lock = threading.Lock()
+
+    def covered(self, target: Target, changed_at: float) -> bool:
+        with self._lock:
+            rescanned_at = self._rescanned.get(target)
+            return rescanned_at is not None and changed_at <= rescanned_at
+
+    def mark(self, targets: Iterable[Target], rescanned_at: float):
+        with self._lock:
+            for target in targets:
+                self._rescanned[target] = rescanned_at
+                self._rescanned.move_to_end(target)
+            while len(self._rescanned) > self.max_entries:
+                self._rescanned.popitem(last=False)
+
+
+def coalesce(payload, ledger: Optional[RescanLedger] = None) -> Tuple[Dict[Target, float], Dict[str, int]]:
+    """Distinct rescan targets of a payload with their latest change time, plus event counts"""
+    targets = {}
+    stats = {'events': 0, 'ignored': 0, 'coalesced': 0, 'covered': 0}
+    for event in iter_events(payload):
+        stats['events'] += 1
+        event_targets, changed_at = resolve(event)
+        if not event_targets:
+            stats['ignored'] += 1
+        for target in event_targets:
+            if ledger is not None and ledger.covered(target, changed_at):
+                stats['covered'] += 1
+            elif target in targets:
+                stats['coalesced'] += 1
+                targets[target] = max(targets[target], changed_at)
+            else:
+                targets[target] = changed_at
+    return targets, stats
@@ -0,0 +1,40 @@
+"""Process-wide boto3 clients shared by the agents
+
+Clients are created on first use and reused for the lifetime of the process
+(a Lambda execution environment or a Streamlit server), so credential
+resolution and endpoint setup happen once per service and region. Each
+client is instrumented for ``agents.metrics``.
+"""
+import threading
+from typing import Optional
+
+import boto3
+from botocore.config import Config
+
+from agents.metrics import instrument_client
+
+_clients = {}
+_lock = threading.RLock()
+
+
+def default_session() -> boto3.Session:
+    """boto3's default session, created once"""
+    with _lock:
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        return boto3.DEFAULT_SESSION
+
+
+def get_client(service: str, region: Optional[str] = None, config: Optional[Config] = None):
+    """Shared client for a service in a region; ``config`` applies only when it is first created"""
+    key = (service, region)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = instrument_client(default_session().client(service, region_name=region, config=config))
+        return _clients[key]
+
+
+def reset_clients():
+    """Drop every cached client, e.g. after credentials change"""
+    with _lock:
+        _clients.clear()
@@ -1,76 +1,450 @@
 """Compliance Agent using Amazon Bedrock"""
-import boto3
-import json
-from typing import List, Dict
+from concurrent.futures import CancelledError, Future
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple
+from policies.applicability import INDEX, ApplicabilityIndex
+from policies.rules import SEVERITY_ORDER, RuleEngine
+from agents import metrics
+from agents.clients import get_client
+from agents.bedrock_pool import BedrockPool, get_shared_pool
+from agents.config_shapes import attribute, group_shapes
+from agents.bedrock_runtime import (BEDROCK_CLIENT_CONFIG, TokenUsage, estimate_tokens, extract_json,
+                                    response_json, response_text)
+from agents.model_router import ModelRouter
+from agents.prompt_builder import PromptBudgetExceeded, PromptBuilder, compact_json, project
+from agents.response_cache import ResponseCache, get_shared_cache
+
+VALID_STATUSES = {'COMPLIANT', 'NON_COMPLIANT', 'PARTIAL'}
+
+RESOURCE_PROMPT = """
+    Analyze the following AWS resource for {framework} compliance:
+    Resource: {resource}
+
+    Provide a compliance assessment with:
+    1. Compliance status (COMPLIANT/NON_COMPLIANT/PARTIAL)
+    2. Specific violations found
+    3. Remediation recommendations
+    4. Risk level (LOW/MEDIUM/HIGH/CRITICAL)
+    5. Confidence in this assessment (0.0-1.0)
+
+    Respond with JSON only, in the form:
+    {{"status": "...", "violations": [], "recommendations": [], "risk_level": "...", "confidence": 0.9}}
+    """
+
+REPORT_PROMPT = """
+    Generate a comprehensive compliance report based on these violations:
+    {violations}
+
+    Include:
+    1. Executive summary
+    2. Critical findings
+    3. Remediation priorities
+    4. Compliance score
+    """
+
+CHUNK_PROMPT = """
+    Summarise these {framework} compliance violations of {severity} severity for a compliance report.
+    Each line is a JSON object with the "violation", the number of affected resources ("count")
+    and example "resources".
+
+    {violations}
+
+    List the key findings, the most affected resources and remediation priorities in at most {words} words.
+    """
+
+MERGE_PROMPT = """
+    Merge these compliance findings summaries into one summary, keeping every framework,
+    severity, key finding and remediation priority, in at most {words} words:
+
+    {summaries}
+    """
+
+REDUCE_PROMPT = """
+    Generate a comprehensive compliance report from these summaries of {total} compliance violations,
+    grouped by framework and severity:
+
+    {summaries}
+
+    Include:
+    1. Executive summary
+    2. Critical findings
+    3. Remediation priorities
+    4. Compliance score
+    """
+
+REPORT_MODES = ('auto', 'single', 'map_reduce')
+
+BATCH_PROMPT = """Analyze each AWS resource below for compliance with the frameworks listed on its line.
+Each line is a JSON object with an "index", the "frameworks" to assess and the "resource".
+
+{resources}
+
+For every resource index and every framework on its line, provide:
+status (COMPLIANT/NON_COMPLIANT/PARTIAL), violations (list), recommendations (list),
+risk_level (LOW/MEDIUM/HIGH/CRITICAL) and your confidence in the verdict (0.0-1.0).
+
+Respond with JSON only, in the form:
+{{"results": [{{"index": 0, "framework": "GDPR", "status": "...", "violations": [], "recommendations": [], "risk_level": "...", "confidence": 0.9}}]}}"""
+
+
+def normalise_verdict(row) -> Optional[Dict]:
+    """A model verdict reduced to the fields the agents return, or None if it has no valid status"""
+    if not isinstance(row, dict) or row.get('status') not in VALID_STATUSES:
+        return None
+    verdict = {
+        "status": row['status'],
+        "violations": list(row.get('violations') or []),
+        "recommendations": list(row.get('recommendations') or []),
+        "risk_level": row.get('risk_level', 'UNKNOWN')
+    }
+    if row.get('confidence') is not None:
+        verdict['confidence'] = row['confidence']
+    return verdict
+
+
+def parse_verdict(result: Dict) -> Optional[Dict]:
+    return normalise_verdict(response_json(result))
+
+
+def not_applicable_verdict() -> Dict:
+    """Verdict for a pair none of the framework's rules apply to; it needs no model call and is not scored"""
+    return {
+        "status": "NOT_APPLICABLE",
+        "violations": [],
+        "recommendations": [],
+        "risk_level": "LOW",
+        "source": "applicability"
+    }
+
 
 class ComplianceAgent:
-    def __init__(self):
-        self.bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
+    def __init__(self, rule_engine: RuleEngine = None, cache: ResponseCache = None,
+                 pool: BedrockPool = None, router: ModelRouter = None,
+                 batch_input_tokens: int = 8000, batch_output_tokens: int = 4000,
+                 tokens_per_verdict: int = 80, input_token_budget: int = 4000,
+                 report_input_tokens: int = 8000, report_chunk_tokens: int = 4000,
+                 summary_words: int = 150, dedupe_shapes: bool = True,
+                 applicability: ApplicabilityIndex = None):
+        self.bedrock = get_client('bedrock-runtime', 'us-east-1', BEDROCK_CLIENT_CONFIG)
+        self.router = router or ModelRouter()
+        self.rule_engine = rule_engine or RuleEngine()
+        self.cache = cache if cache is not None else get_shared_cache()
+        self.pool = pool or get_shared_pool()
+        self.batch_input_tokens = batch_input_tokens
+        self.batch_output_tokens = batch_output_tokens
+        self.tokens_per_verdict = tokens_per_verdict
+        self.prompts = PromptBuilder(input_token_budget)
+        self.report_input_tokens = report_input_tokens
+        self.report_chunk_tokens = report_chunk_tokens
+        self.summary_words = summary_words
+        self.dedupe_shapes = dedupe_shapes
+        self.usage = TokenUsage()
+        self.applicability = applicability or INDEX
     
-    def analyze_compliance(self, resource_data: Dict, framework: str) -> Dict:
-        """Analyze resource compliance against framework"""
-        prompt = f"""
-        Analyze the following AWS resource for {framework} compliance:
-        Resource: {json.dumps(resource_data, indent=2)}
-        
-        Provide a compliance assessment with:
-        1. Compliance status (COMPLIANT/NON_COMPLIANT/PARTIAL)
-        2. Specific violations found
-        3. Remediation recommendations
-        4. Risk level (LOW/MEDIUM/HIGH/CRITICAL)
-        
-        Respond in JSON format.
+    def analyze_compliance(self, resource_data: Dict, framework: str, tier: Optional[str] = None) -> Dict:
+        """Analyze resource compliance against framework
+
+        The model call starts on the routed tier (or ``tier``) and escalates
+        as the router decides. The verdict is the model's, normalised like
+        batch verdicts; a response without a valid status is an ERROR.
         """
+        verdict = self.rule_engine.check(resource_data, framework)
+        if verdict is not None:
+            return verdict
         
         try:
-            response = self.bedrock.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 1000,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            result = json.loads(response['body'].read())
-            return {
-                "status": "NON_COMPLIANT",
-                "violations": ["Sample violation for demo"],
-                "recommendations": ["Enable encryption", "Configure MFA"],
-                "risk_level": "HIGH"
-            }
+            prompt = self.prompts.resource_prompt(RESOURCE_PROMPT, resource_data, [framework], framework=framework)
+            result, verdict, tier = self.router.invoke(self.bedrock, 'evaluate', framework, prompt,
+                                                       parse=parse_verdict, tier=tier, max_tokens=1000,
+                                                       cache=self.cache, pool=self.pool, usage=self.usage)
         except Exception as e:
             return {
                 "status": "ERROR",
                 "error": str(e),
                 "risk_level": "UNKNOWN"
             }
+        if verdict is None:
+            return {
+                "status": "ERROR",
+                "error": "Model response has no valid compliance verdict",
+                "risk_level": "UNKNOWN",
+                "model_tier": tier
+            }
+        verdict['model_tier'] = tier
+        return verdict
     
-    def generate_compliance_report(self, violations: List[Dict]) -> str:
-        """Generate compliance report using Bedrock"""
-        prompt = f"""
-        Generate a comprehensive compliance report based on these violations:
-        {json.dumps(violations, indent=2)}
-        
-        Include:
-        1. Executive summary
-        2. Critical findings
-        3. Remediation priorities
-        4. Compliance score
+    def analyze_compliance_batch(self, items: Sequence[Tuple[Dict, Sequence[str]]]) -> List[Dict[str, Dict]]:
+        """Analyze many (resource, frameworks) items in as few Bedrock calls as possible
+
+        Items are packed into prompts that stay within ``batch_input_tokens`` and
+        whose expected verdicts fit in ``batch_output_tokens``; batches run
+        concurrently on the Bedrock pool. Pairs are batched per starting model
+        tier, and pairs the router escalates (low confidence, or a response
+        that cannot be parsed) are re-batched on the next tier. On the
+        strongest tier a batch whose response cannot be parsed into a verdict
+        for every pair is split in half and retried, down to single-resource
+        calls. Returns, per item, a dict of results keyed by framework. Callers
+        are expected to have removed the pairs the rule engine already decides.
+
+        With ``dedupe_shapes`` only one resource per configuration shape and
+        framework is evaluated (see ``agents.config_shapes``); its verdict is
+        copied to the other members with ``evaluated_as`` naming the
+        representative and ``shape_members`` the size of the group.
+        """
+        if not self.dedupe_shapes:
+            return self._analyze_batch(items)
+        groups = group_shapes(items)
+        representatives = {}
+        for (framework, _), members in groups.items():
+            representatives.setdefault(members[0], []).append(framework)
+        order = list(representatives)
+        evaluated = self._analyze_batch([(items[index][0], representatives[index]) for index in order])
+        by_index = dict(zip(order, evaluated))
+
+        results = [dict() for _ in items]
+        for (framework, _), members in groups.items():
+            representative = items[members[0]][0]
+            verdict = by_index[members[0]][framework]
+            for index in members:
+                results[index][framework] = attribute(verdict, items[index][0], representative, len(members))
+        pairs = sum(len(members) for members in groups.values())
+        metrics.count('shape_pairs', pairs)
+        metrics.count('shape_pairs_deduplicated', pairs - len(groups))
+        return results
+
+    def _analyze_batch(self, items: Sequence[Tuple[Dict, Sequence[str]]]) -> List[Dict[str, Dict]]:
+        results = [dict() for _ in items]
+        by_tier = {}
+        for index, (_, frameworks) in enumerate(items):
+            for framework in frameworks:
+                tier = self.router.start_tier('evaluate', framework)
+                by_tier.setdefault(tier, {}).setdefault(index, []).append(framework)
+        futures = []
+        for tier, work in by_tier.items():
+            indexes = list(work)
+            tier_items = [(items[index][0], work[index]) for index in indexes]
+            futures += [self.pool.submit(self._evaluate_batch, items,
+                                         [(indexes[position], work[indexes[position]]) for position in batch],
+                                         results, tier)
+                        for batch in self._pack_batches(tier_items)]
+        for future in futures:
+            future.result()
+        return results
+
+    def submit_analysis(self, resource_data: Dict, framework: str) -> Future:
+        """Schedule analyze_compliance on the Bedrock pool and return a cancellable Future"""
+        return self.pool.submit(self.analyze_compliance, resource_data, framework)
+
+    async def analyze_compliance_async(self, resource_data: Dict, framework: str) -> Dict:
+        """Awaitable analyze_compliance, run on the Bedrock pool"""
+        return await self.pool.run(self.analyze_compliance, resource_data, framework)
+
+    def _batch_line(self, index: int, resource: Dict, frameworks: Sequence[str]) -> str:
+        return compact_json({"index": index, "frameworks": list(frameworks),
+                             "resource": project(resource, frameworks)})
+
+    def _pack_batches(self, items: Sequence[Tuple[Dict, Sequence[str]]]) -> List[List[int]]:
+        """Group item indexes greedily under the input and output token budgets"""
+        overhead = estimate_tokens(BATCH_PROMPT)
+        batches, batch, input_tokens, verdicts = [], [], overhead, 0
+        for index, (resource, frameworks) in enumerate(items):
+            line_tokens = estimate_tokens(self._batch_line(index, resource, frameworks))
+            too_big = (input_tokens + line_tokens > self.batch_input_tokens or
+                       (verdicts + len(frameworks)) * self.tokens_per_verdict > self.batch_output_tokens)
+            if batch and too_big:
+                batches.append(batch)
+                batch, input_tokens, verdicts = [], overhead, 0
+            batch.append(index)
+            input_tokens += line_tokens
+            verdicts += len(frameworks)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _parse_batch(self, text: str, expected: Dict[int, Sequence[str]]) -> Optional[Dict[Tuple[int, str], Dict]]:
+        """Per-pair verdicts from a batch response, or None if any expected pair is missing"""
+        parsed = extract_json(text)
+        rows = parsed.get('results') if isinstance(parsed, dict) else parsed
+        if not isinstance(rows, list):
+            return None
+        verdicts = {}
+        for row in rows:
+            verdict = normalise_verdict(row)
+            if verdict is None:
+                continue
+            try:
+                key = (int(row['index']), str(row['framework']))
+            except (KeyError, TypeError, ValueError):
+                continue
+            verdicts[key] = verdict
+        if any((index, framework) not in verdicts
+               for index, frameworks in expected.items() for framework in frameworks):
+            return None
+        return verdicts
+
+    def _evaluate_batch(self, items, batch: List[Tuple[int, List[str]]], results: List[Dict[str, Dict]], tier: str):
+        """Evaluate (item index, frameworks) pairs on one model tier, escalating what the router sends up"""
+        if len(batch) == 1 and len(batch[0][1]) == 1:
+            index, (framework,) = batch[0]
+            results[index][framework] = self.analyze_compliance(items[index][0], framework, tier=tier)
+            return
+
+        expected = dict(batch)
+        pairs = sum(len(frameworks) for frameworks in expected.values())
+        prompt = BATCH_PROMPT.format(resources='\n'.join(
+            self._batch_line(index, items[index][0], frameworks) for index, frameworks in batch))
+        max_tokens = min(self.batch_output_tokens, pairs * self.tokens_per_verdict + 200)
+        stronger = self.router.next_tier(tier)
+        try:
+            result = self.router.call(self.bedrock, tier, 'evaluate', prompt, max_tokens=max_tokens,
+                                      cache=self.cache, pool=self.pool, usage=self.usage)
+            verdicts, reason = self._parse_batch(response_text(result), expected), 'unparseable'
+        except CancelledError:
+            raise
+        except Exception:
+            verdicts, reason = None, 'error'
+
+        if verdicts is None:
+            if stronger is not None:
+                # Escalate the whole batch rather than splitting it on a weaker model
+                self.router.record(tier, 'evaluate', pairs, escalated=[reason] * pairs)
+                self._evaluate_batch(items, batch, results, stronger)
+                return
+            if len(batch) == 1:
+                index, frameworks = batch[0]
+                for framework in frameworks:
+                    results[index][framework] = self.analyze_compliance(items[index][0], framework, tier=tier)
+                return
+            middle = len(batch) // 2
+            self._evaluate_batch(items, batch[:middle], results, tier)
+            self._evaluate_batch(items, batch[middle:], results, tier)
+            return
+
+        escalated, reasons = {}, []
+        for index, frameworks in batch:
+            for framework in frameworks:
+                verdict = verdicts[(index, framework)]
+                reason = self.router.escalation_reason(verdict) if stronger is not None else None
+                if reason:
+                    escalated.setdefault(index, []).append(framework)
+                    reasons.append(reason)
+                else:
+                    verdict['model_tier'] = tier
+                    results[index][framework] = verdict
+        self.router.record(tier, 'evaluate', pairs, escalated=reasons)
+        if escalated:
+            self._evaluate_batch(items, list(escalated.items()), results, stronger)
+
+    def _report_prompt(self, violations: List[Dict], mode: str = 'auto') -> str:
+        """Prompt for the final report: the violations themselves, or summaries of them
+
+        In ``auto`` mode the violations go into a single prompt when it fits
+        ``report_input_tokens`` and through map-reduce otherwise.
+        """
+        if mode not in REPORT_MODES:
+            raise ValueError(f"Unknown report mode '{mode}', expected one of {', '.join(REPORT_MODES)}")
+        if mode != 'map_reduce':
+            try:
+                return self.prompts.render(REPORT_PROMPT, budget=self.report_input_tokens,
+                                           violations=compact_json(violations))
+            except PromptBudgetExceeded:
+                if mode == 'single':
+                    raise
+        summaries = self.pool.map(self._summarise_chunk, self._report_chunks(violations))
+        return self._reduce_prompt(summaries, len(violations))
+
+    def _report_chunks(self, violations: List[Dict]) -> List[Tuple[str, str, List[str]]]:
+        """Violations grouped by framework and severity, identical ones collapsed into counts
+
+        Groups are ordered by severity (most severe first) and split so each
+        chunk's lines fit ``report_chunk_tokens``.
+        """
+        groups = {}
+        for violation in violations:
+            framework = violation.get('framework', 'UNKNOWN')
+            severity = violation.get('severity') or violation.get('risk_level') or 'UNKNOWN'
+            text = violation.get('violation') or '; '.join(violation.get('violations') or []) or compact_json(violation)
+            resource = violation.get('resource')
+            if isinstance(resource, dict):
+                resource = resource.get('resource_id')
+            entry = groups.setdefault((framework, severity), {}).setdefault(text, {'count': 0, 'resources': []})
+            entry['count'] += 1
+            if resource and len(entry['resources']) < 5 and resource not in entry['resources']:
+                entry['resources'].append(resource)
+
+        rank = lambda key: (-SEVERITY_ORDER.index(key[1]) if key[1] in SEVERITY_ORDER else 1, key[0])
+        overhead = estimate_tokens(CHUNK_PROMPT)
+        chunks = []
+        for framework, severity in sorted(groups, key=rank):
+            entries = sorted(groups[(framework, severity)].items(), key=lambda item: -item[1]['count'])
+            lines, tokens = [], overhead
+            for text, entry in entries:
+                line = compact_json(dict({'violation': text}, **entry))
+                if lines and tokens + estimate_tokens(line) > self.report_chunk_tokens:
+                    chunks.append((framework, severity, lines))
+                    lines, tokens = [], overhead
+                lines.append(line)
+                tokens += estimate_tokens(line)
+            chunks.append((framework, severity, lines))
+        return chunks
+
+    def _summarise(self, prompt: str) -> str:
+        result = self.router.call(self.bedrock, self.router.start_tier('report'), 'report', prompt,
+                                  max_tokens=2 * self.summary_words, cache=self.cache, pool=self.pool,
+                                  usage=self.usage)
+        return response_text(result)
+
+    def _summarise_chunk(self, chunk: Tuple[str, str, List[str]]) -> str:
+        framework, severity, lines = chunk
+        prompt = self.prompts.render(CHUNK_PROMPT, budget=self.report_input_tokens, framework=framework,
+                                     severity=severity, violations='\n'.join(lines), words=self.summary_words)
+        return f'{framework} / {severity}:\n{self._summarise(prompt)}'
+
+    def _reduce_prompt(self, summaries: List[str], total: int) -> str:
+        """Final report prompt over the chunk summaries, merging them level by level until it fits"""
+        while True:
+            try:
+                return self.prompts.render(REDUCE_PROMPT, budget=self.report_input_tokens,
+                                           summaries='\n\n'.join(summaries), total=total)
+            except PromptBudgetExceeded:
+                if len(summaries) == 1:
+                    raise
+            groups, group, tokens = [], [], estimate_tokens(MERGE_PROMPT)
+            for summary in summaries:
+                if group and tokens + estimate_tokens(summary) > self.report_input_tokens:
+                    groups.append(group)
+                    group, tokens = [], estimate_tokens(MERGE_PROMPT)
+                group.append(summary)
+                tokens += estimate_tokens(summary)
+            groups.append(group)
+            if len(groups) == len(summaries):
+                # Every summary alone fills the budget; merge pairwise to make progress
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            summaries = self.pool.map(lambda group: self._summarise(self.prompts.render(
+                MERGE_PROMPT, budget=self.report_input_tokens, summaries='\n\n'.join(group),
+                words=self.summary_words)), groups)
+
+    def generate_compliance_report(self, violations: List[Dict], mode: str = 'auto') -> str:
+        """Generate compliance report using Bedrock
+
+        Violation sets too large for one prompt are summarised per framework and
+        severity concurrently, then reduced into the report (see ``_report_prompt``).
         """
-        
         try:
-            response = self.bedrock.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 2000,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            result = json.loads(response['body'].read())
+            prompt = self._report_prompt(violations, mode)
+            result = self.router.call(self.bedrock, self.router.start_tier('report'), 'report', prompt,
+                                      max_tokens=2000, cache=self.cache, pool=self.pool, usage=self.usage)
             return result['content'][0]['text']
         except Exception as e:
-            return f"Error generating report: {str(e)}"
\ No newline at end of file
+            return f"Error generating report: {str(e)}"
+    
+    def generate_compliance_report_stream(self, violations: List[Dict], mode: str = 'auto') -> Iterator[str]:
+        """Generate compliance report using Bedrock, yielding text chunks as they arrive
+
+        In map-reduce mode only the final reduce step is streamed.
+        """
+        try:
+            prompt = self._report_prompt(violations, mode)
+            yield from self.router.stream(self.bedrock, self.router.start_tier('report'), 'report', prompt,
+                                          max_tokens=2000, cache=self.cache, pool=self.pool, usage=self.usage)
+        except Exception as e:
+            yield f"Error generating report: {str(e)}"
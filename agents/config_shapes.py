@@ -0,0 +1,46 @@
+"""Configuration shapes: resources that differ only in identity share a verdict
+
+A shape is the hash of what a framework's assessment can see of a resource
+(its projection, see ``agents.prompt_builder.project``) with identity and
+scan-time fields removed. Fleets built from one launch template or bucket
+policy collapse into a handful of shapes, so evaluating one representative
+per (framework, shape) makes the number of model calls follow configuration
+diversity rather than fleet size.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+from agents.prompt_builder import project
+
+# Fields that name or date a resource without saying anything about its configuration
+IDENTITY_FIELDS = frozenset({'resource_id', 'arn', 'name', 'creation_date', 'last_scan', 'scanned_at'})
+
+
+def shape_key(resource: Dict, framework: str) -> str:
+    """Hash of the resource's configuration as assessed for ``framework``"""
+    configuration = {key: value for key, value in project(resource, [framework]).items()
+                     if key not in IDENTITY_FIELDS}
+    canonical = json.dumps(configuration, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+
+def group_shapes(items: Sequence[Tuple[Dict, Sequence[str]]]) -> Dict[Tuple[str, str], List[int]]:
+    """(framework, shape) -> indexes of the items with that shape, in item order
+
+    The first index of each group is its representative.
+    """
+    groups = OrderedDict()
+    for index, (resource, frameworks) in enumerate(items):
+        for framework in frameworks:
+            groups.setdefault((framework, shape_key(resource, framework)), []).append(index)
+    return groups
+
+
+def attribute(verdict: Dict, resource: Dict, representative: Dict, members: int) -> Dict:
+    """A copy of the representative's verdict for ``resource``, noting where it came from"""
+    result = dict(verdict, shape_members=members)
+    if resource is not representative:
+        result['evaluated_as'] = representative.get('resource_id')
+    return result
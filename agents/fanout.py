@@ -0,0 +1,136 @@
+"""Coordinator/worker fan-out for scans too large for a single Lambda invocation
+
+The coordinator plans shards (one region, one service, one range of
+resources), dispatches each as an independent ``scan_shard`` payload and
+aggregates the partial results. Executors decide where shards run: in
+process (a local stand-in for Lambda/Step Functions, used offline and in
+benchmarks) or as real Lambda invocations.
+
+With a result sink, workers write their results to storage and return a
+pointer and per-framework counts, so no payload grows with the number of
+verdicts; without one, payloads are checked against the service limits.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from typing import Callable, Dict, List, Optional, Sequence
+
+from agents.clients import get_client
+
+STAT_KEYS = ('resources_scanned', 'rule_verdicts', 'not_applicable', 'cache_hits', 'cache_misses')
+
+# Step Functions state payloads and synchronous Lambda responses are capped
+STATE_PAYLOAD_LIMIT = 256 * 1024
+RESPONSE_PAYLOAD_LIMIT = 6 * 1024 * 1024
+
+
+def plan_shards(resources: Sequence[Dict], shard_size: int = 200, **options) -> List[Dict]:
+    """Split discovered resources into scan_shard payloads by region, service and range
+
+    ``options`` (e.g. ``incremental`` or ``batch``) are copied into every payload.
+    """
+    def group(resource):
+        return resource.get('region') or '', resource.get('resource_type') or ''
+
+    usable = sorted((r for r in resources if 'error' not in r), key=group)
+    shards = []
+    for (region, service), members in groupby(usable, key=group):
+        members = list(members)
+        for start in range(0, len(members), shard_size):
+            chunk = members[start:start + shard_size]
+            shards.append(dict(options, **{
+                'request_type': 'scan_shard',
+                'shard_id': f'{region or "global"}/{service}/{start}-{start + len(chunk)}',
+                'region': region,
+                'service': service,
+                'resources': chunk
+            }))
+    return shards
+
+
+def shard_object_name(scan_id: str, shard_id: str, kind: str = 'results') -> str:
+    """Result sink object name for one shard's results (or its planned resources)"""
+    return f"{scan_id}-{shard_id.replace('/', '-')}-{kind}"
+
+
+def aggregate(partials: Sequence[Dict]) -> Dict:
+    """Merge scan_shard results into one scan summary
+
+    Shards that failed are listed under ``failed_shards`` and their
+    resources are left out of the merged results. Shards that wrote their
+    results to a sink contribute their pointer to ``result_parts`` and their
+    status counts to ``summary`` instead.
+    """
+    merged = {key: 0 for key in STAT_KEYS}
+    merged['compliance_results'] = []
+    merged['failed_shards'] = []
+    for partial in partials:
+        if 'error' in partial:
+            merged['failed_shards'].append({'shard_id': partial.get('shard_id'), 'error': partial['error']})
+            continue
+        for key in STAT_KEYS:
+            merged[key] += partial.get(key, 0)
+        merged['compliance_results'].extend(partial.get('compliance_results', []))
+        if 'results' in partial:
+            merged.setdefault('result_parts', []).append(dict(partial['results'], shard_id=partial.get('shard_id')))
+            summary = merged.setdefault('summary', {})
+            for framework, statuses in partial.get('summary', {}).items():
+                counts = summary.setdefault(framework, {})
+                for status, count in statuses.items():
+                    counts[status] = counts.get(status, 0) + count
+    merged['shards'] = len(partials)
+    return merged
+
+
+def _response_body(response: Dict, payload: Dict) -> Dict:
+    body = json.loads(response['body']) if isinstance(response.get('body'), str) else response.get('body', {})
+    if response.get('statusCode') != 200 and 'error' not in body:
+        body['error'] = f"Shard failed with status {response.get('statusCode')}"
+    body.setdefault('shard_id', payload.get('shard_id'))
+    return body
+
+
+class LocalExecutor:
+    """Runs shard payloads through a handler in this process, on a thread pool"""
+
+    def __init__(self, handler: Callable, max_workers: int = 4):
+        self.handler = handler
+        self.max_workers = max_workers
+
+    def map(self, payloads: Sequence[Dict]) -> List[Dict]:
+        def run(payload):
+            try:
+                return _response_body(self.handler(payload, None), payload)
+            except Exception as e:
+                return {'shard_id': payload.get('shard_id'), 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            return list(pool.map(run, payloads))
+
+
+class LambdaExecutor:
+    """Invokes the worker function once per shard payload and waits for every result"""
+
+    def __init__(self, function_name: Optional[str] = None, max_workers: int = 32, region: Optional[str] = None):
+        self.function_name = function_name or os.environ['WORKER_FUNCTION_NAME']
+        self.max_workers = max_workers
+        self.client = get_client('lambda', region)
+
+    def map(self, payloads: Sequence[Dict]) -> List[Dict]:
+        def run(payload):
+            try:
+                response = self.client.invoke(
+                    FunctionName=self.function_name,
+                    InvocationType='RequestResponse',
+                    Payload=json.dumps(payload).encode('utf-8')
+                )
+                result = json.loads(response['Payload'].read())
+                if 'FunctionError' in response:
+                    return {'shard_id': payload.get('shard_id'), 'error': result.get('errorMessage', 'Worker failed')}
+                return _response_body(result, payload)
+            except Exception as e:
+                return {'shard_id': payload.get('shard_id'), 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            return list(pool.map(run, payloads))
@@ -0,0 +1,73 @@
+"""Persistent resource fingerprint store for incremental compliance scans"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_DB_PATH = os.path.join('/tmp', 'enforce_ai_fingerprints.db')
+
+# Fields that change on every scan without the resource itself changing
+VOLATILE_FIELDS = frozenset({'last_scan'})
+
+
+def resource_key(resource: Dict) -> str:
+    """Stable identity of a resource across scans"""
+    return ':'.join(str(resource.get(field, '')) for field in ('resource_type', 'region', 'resource_id'))
+
+
+def fingerprint(resource: Dict) -> str:
+    """Canonical hash of a resource's configuration, ignoring volatile fields"""
+    configuration = {k: v for k, v in resource.items() if k not in VOLATILE_FIELDS}
+    canonical = json.dumps(configuration, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class FingerprintStore:
+    """SQLite store of the last verdict per (resource, framework) and the fingerprint it was made for"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get('FINGERPRINT_DB_PATH', DEFAULT_DB_PATH)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS verdicts (
+                    resource_key TEXT NOT NULL,
+                    framework TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (resource_key, framework)
+                )
+            ''')
+
+    def get_verdicts(self, key: str, resource_fingerprint: str) -> Dict[str, Dict]:
+        """Stored verdicts for a resource, by framework, that are still valid for its fingerprint"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT framework, result FROM verdicts WHERE resource_key = ? AND fingerprint = ?',
+                (key, resource_fingerprint),
+            ).fetchall()
+        return {framework: json.loads(result) for framework, result in rows}
+
+    def put_verdicts(self, verdicts: Iterable[Tuple[str, str, str, Dict]]):
+        """Store (resource_key, framework, fingerprint, result) rows in one transaction"""
+        now = datetime.now().isoformat()
+        rows = [(key, framework, resource_fingerprint, json.dumps(result, default=str), now)
+                for key, framework, resource_fingerprint, result in verdicts]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO verdicts (resource_key, framework, fingerprint, result, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
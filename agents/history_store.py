@@ -0,0 +1,486 @@
+"""Persistent, indexed history of scan runs, resources and verdicts
+
+Backs the dashboard: every scan run is recorded with per-framework,
+per-resource-type and per-severity totals, the latest verdict for each
+(resource, framework) pair is kept current until a full scan no longer sees
+the resource, and a verdict change log keeps
+when each pair's status or risk level changed. Writes are set-based SQL
+over a staging table, so recording a scan costs a few statements per chunk
+of results; dashboard queries only touch indexed summary rows.
+
+Score rollups are maintained as verdicts are written: current totals per
+framework, resource type and severity are adjusted by each status change,
+and hourly, daily and weekly buckets accumulate the verdicts evaluated in
+them, so dashboard reads cost O(buckets) rather than O(verdicts).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from agents.fingerprint_store import resource_key
+
+DEFAULT_DB_PATH = os.path.join('/tmp', 'enforce_ai_history.db')
+
+# Weight of each status in a compliance score; ERROR verdicts are not scored
+STATUS_WEIGHTS = {'COMPLIANT': 1.0, 'PARTIAL': 0.5, 'NON_COMPLIANT': 0.0}
+
+# Rollup bucket widths in seconds; weeks start on Monday (UTC)
+GRANULARITIES = {'hour': 3600, 'day': 86400, 'week': 7 * 86400}
+_WEEK_OFFSET = 3 * 86400  # 1970-01-01 was a Thursday
+
+# Sources that rescan only part of the account; not used as the latest full scan
+PARTIAL_SOURCES = ('rescan',)
+
+# A scan is 'running' until finished as 'completed', or 'failed' if it stopped part way
+SCAN_STATUSES = ('running', 'completed', 'failed')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS scans (
+        scan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT NOT NULL,
+        started_at REAL NOT NULL,
+        finished_at REAL,
+        resources INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'completed'
+    );
+    CREATE INDEX IF NOT EXISTS scans_started ON scans (started_at);
+
+    CREATE TABLE IF NOT EXISTS resources (
+        resource_key TEXT PRIMARY KEY,
+        resource_type TEXT,
+        region TEXT,
+        resource_id TEXT,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL,
+        last_scan_id INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS resources_type ON resources (resource_type);
+    CREATE INDEX IF NOT EXISTS resources_last_scan ON resources (last_scan_id);
+
+    CREATE TABLE IF NOT EXISTS verdicts (
+        resource_key TEXT NOT NULL,
+        framework TEXT NOT NULL,
+        resource_type TEXT,
+        status TEXT NOT NULL,
+        risk_level TEXT,
+        scan_id INTEGER NOT NULL,
+        evaluated_at REAL NOT NULL,
+        result TEXT NOT NULL,
+        PRIMARY KEY (resource_key, framework)
+    );
+    CREATE INDEX IF NOT EXISTS verdicts_framework ON verdicts (framework, status);
+    CREATE INDEX IF NOT EXISTS verdicts_severity ON verdicts (risk_level, status, evaluated_at);
+    CREATE INDEX IF NOT EXISTS verdicts_type ON verdicts (resource_type, status);
+    CREATE INDEX IF NOT EXISTS verdicts_time ON verdicts (evaluated_at);
+
+    CREATE TABLE IF NOT EXISTS verdict_changes (
+        resource_key TEXT NOT NULL,
+        framework TEXT NOT NULL,
+        resource_type TEXT,
+        status TEXT NOT NULL,
+        risk_level TEXT,
+        scan_id INTEGER NOT NULL,
+        changed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS verdict_changes_framework ON verdict_changes (framework, changed_at);
+    CREATE INDEX IF NOT EXISTS verdict_changes_resource ON verdict_changes (resource_key, changed_at);
+
+    CREATE TABLE IF NOT EXISTS scan_stats (
+        scan_id INTEGER NOT NULL,
+        framework TEXT NOT NULL,
+        resource_type TEXT NOT NULL,
+        risk_level TEXT NOT NULL,
+        verdicts INTEGER NOT NULL,
+        compliant INTEGER NOT NULL,
+        partial INTEGER NOT NULL,
+        non_compliant INTEGER NOT NULL,
+        PRIMARY KEY (scan_id, framework, resource_type, risk_level)
+    );
+    CREATE INDEX IF NOT EXISTS scan_stats_framework ON scan_stats (framework, scan_id);
+
+    CREATE TABLE IF NOT EXISTS verdict_totals (
+        framework TEXT NOT NULL,
+        resource_type TEXT NOT NULL,
+        risk_level TEXT NOT NULL,
+        verdicts INTEGER NOT NULL,
+        compliant INTEGER NOT NULL,
+        partial INTEGER NOT NULL,
+        non_compliant INTEGER NOT NULL,
+        PRIMARY KEY (framework, resource_type, risk_level)
+    );
+
+    CREATE TABLE IF NOT EXISTS score_buckets (
+        granularity TEXT NOT NULL,
+        bucket_start REAL NOT NULL,
+        framework TEXT NOT NULL,
+        resource_type TEXT NOT NULL,
+        verdicts INTEGER NOT NULL,
+        compliant INTEGER NOT NULL,
+        partial INTEGER NOT NULL,
+        non_compliant INTEGER NOT NULL,
+        PRIMARY KEY (granularity, bucket_start, framework, resource_type)
+    );
+'''
+
+
+def _score(compliant: float, partial: float, scored: float) -> Optional[float]:
+    if not scored:
+        return None
+    return round(100 * (compliant * STATUS_WEIGHTS['COMPLIANT'] + partial * STATUS_WEIGHTS['PARTIAL']) / scored, 1)
+
+
+def bucket_start(timestamp: float, granularity: str) -> float:
+    """Start of the UTC hour, day or week containing ``timestamp``"""
+    width = GRANULARITIES[granularity]
+    offset = _WEEK_OFFSET if granularity == 'week' else 0
+    return (timestamp + offset) // width * width - offset
+
+
+class HistoryStore:
+    """SQLite store of scan runs, resources and verdicts with dashboard queries"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get('SCAN_HISTORY_DB_PATH', DEFAULT_DB_PATH)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            # Stores written before scans had a status: finished scans count as completed
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(scans)')}
+            if 'status' not in columns:
+                self._conn.execute("ALTER TABLE scans ADD COLUMN status TEXT NOT NULL DEFAULT 'completed'")
+            # Stores written before rollups existed get them rebuilt once
+            has_verdicts = self._conn.execute('SELECT 1 FROM verdicts LIMIT 1').fetchone()
+            has_totals = self._conn.execute('SELECT 1 FROM verdict_totals LIMIT 1').fetchone()
+        if has_verdicts and not has_totals:
+            self.rebuild_rollups()
+
+    # -- writes ---------------------------------------------------------------
+
+    def start_scan(self, source: str = 'scan', started_at: Optional[float] = None) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.execute("INSERT INTO scans (source, started_at, status) VALUES (?, ?, 'running')",
+                                        (source, started_at or time.time()))
+            return cursor.lastrowid
+
+    def add_resources(self, scan_id: int, resources: Iterable[Dict], seen_at: Optional[float] = None):
+        """Upsert scanned resources; resources with scan errors are skipped"""
+        seen_at = seen_at or time.time()
+        rows = [(resource_key(r), r.get('resource_type'), r.get('region'), r.get('resource_id'), seen_at, seen_at,
+                 scan_id) for r in resources if 'error' not in r]
+        with self._lock, self._conn:
+            self._upsert_resources(rows)
+
+    def _upsert_resources(self, rows: List[tuple]):
+        self._conn.executemany('''
+            INSERT INTO resources (resource_key, resource_type, region, resource_id, first_seen, last_seen, last_scan_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (resource_key) DO UPDATE SET last_seen = excluded.last_seen,
+                                                     last_scan_id = excluded.last_scan_id
+        ''', rows)
+
+    def add_results(self, scan_id: int, compliance_results: Iterable[Dict], evaluated_at: Optional[float] = None):
+        """Record a chunk of records-format compliance results for a scan
+
+        Resources are upserted, current verdicts replaced, status or risk
+        changes appended to the change log and the chunk's counts added to
+        the scan's totals.
+        """
+        evaluated_at = evaluated_at or time.time()
+        resources, keys, verdicts = {}, {}, []
+        for result in compliance_results:
+            resource = result.get('resource', {})
+            # Results for the frameworks of one resource usually share its dict
+            key = keys.get(id(resource))
+            if key is None:
+                key = keys[id(resource)] = resource_key(resource)
+                resources[key] = (key, resource.get('resource_type'), resource.get('region'),
+                                  resource.get('resource_id'), evaluated_at, evaluated_at, scan_id)
+            verdict = {k: v for k, v in result.items() if k != 'resource'}
+            verdicts.append((key, result.get('framework'), resource.get('resource_type') or 'UNKNOWN',
+                             result.get('status', 'UNKNOWN'), result.get('risk_level') or 'UNKNOWN',
+                             json.dumps(verdict, separators=(',', ':'), default=str)))
+        if not verdicts:
+            return
+
+        with self._lock, self._conn:
+            self._upsert_resources(list(resources.values()))
+            self._conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS staged_verdicts (
+                    resource_key TEXT, framework TEXT, resource_type TEXT, status TEXT, risk_level TEXT, result TEXT
+                )
+            ''')
+            self._conn.execute('DELETE FROM staged_verdicts')
+            self._conn.executemany('INSERT INTO staged_verdicts VALUES (?, ?, ?, ?, ?, ?)', verdicts)
+            self._conn.execute('''
+                INSERT INTO verdict_changes (resource_key, framework, resource_type, status, risk_level, scan_id, changed_at)
+                SELECT s.resource_key, s.framework, s.resource_type, s.status, s.risk_level, ?, ?
+                FROM staged_verdicts s
+                LEFT JOIN verdicts v ON v.resource_key = s.resource_key AND v.framework = s.framework
+                WHERE v.status IS NULL OR v.status != s.status OR v.risk_level IS NOT s.risk_level
+            ''', (scan_id, evaluated_at))
+            self._update_rollups(evaluated_at)
+            self._conn.execute('''
+                INSERT INTO verdicts (resource_key, framework, resource_type, status, risk_level, scan_id, evaluated_at, result)
+                SELECT s.resource_key, s.framework, s.resource_type, s.status, s.risk_level, ?, ?, s.result
+                FROM staged_verdicts s
+                LEFT JOIN verdicts v ON v.resource_key = s.resource_key AND v.framework = s.framework
+                WHERE v.result IS NULL OR v.result != s.result OR v.risk_level IS NOT s.risk_level
+                ON CONFLICT (resource_key, framework) DO UPDATE SET
+                    resource_type = excluded.resource_type, status = excluded.status,
+                    risk_level = excluded.risk_level, scan_id = excluded.scan_id,
+                    evaluated_at = excluded.evaluated_at, result = excluded.result
+            ''', (scan_id, evaluated_at))
+            self._conn.execute('''
+                INSERT INTO scan_stats (scan_id, framework, resource_type, risk_level, verdicts, compliant, partial, non_compliant)
+                SELECT ?, framework, resource_type, risk_level, COUNT(*),
+                       SUM(status = 'COMPLIANT'), SUM(status = 'PARTIAL'), SUM(status = 'NON_COMPLIANT')
+                FROM staged_verdicts GROUP BY framework, resource_type, risk_level
+                ON CONFLICT (scan_id, framework, resource_type, risk_level) DO UPDATE SET
+                    verdicts = verdicts + excluded.verdicts, compliant = compliant + excluded.compliant,
+                    partial = partial + excluded.partial, non_compliant = non_compliant + excluded.non_compliant
+            ''', (scan_id,))
+            self._conn.execute('DELETE FROM staged_verdicts')
+
+    def _update_rollups(self, evaluated_at: float):
+        """Fold the staged verdicts into the rollups; runs before they replace the current verdicts"""
+        # A changed pair moves from its old totals row to its new one
+        self._conn.execute('''
+            INSERT INTO verdict_totals (framework, resource_type, risk_level, verdicts, compliant, partial, non_compliant)
+            SELECT framework, resource_type, risk_level, SUM(sign), SUM(sign * (status = 'COMPLIANT')),
+                   SUM(sign * (status = 'PARTIAL')), SUM(sign * (status = 'NON_COMPLIANT'))
+            FROM (
+                SELECT s.framework, s.resource_type, s.risk_level, s.status, 1 AS sign
+                FROM staged_verdicts s
+                LEFT JOIN verdicts v ON v.resource_key = s.resource_key AND v.framework = s.framework
+                WHERE v.status IS NULL OR v.status != s.status OR v.risk_level != s.risk_level
+                      OR v.resource_type != s.resource_type
+                UNION ALL
+                SELECT v.framework, v.resource_type, v.risk_level, v.status, -1 AS sign
+                FROM staged_verdicts s
+                JOIN verdicts v ON v.resource_key = s.resource_key AND v.framework = s.framework
+                WHERE v.status != s.status OR v.risk_level != s.risk_level OR v.resource_type != s.resource_type
+            )
+            GROUP BY framework, resource_type, risk_level
+            ON CONFLICT (framework, resource_type, risk_level) DO UPDATE SET
+                verdicts = verdicts + excluded.verdicts, compliant = compliant + excluded.compliant,
+                partial = partial + excluded.partial, non_compliant = non_compliant + excluded.non_compliant
+        ''')
+        # Every evaluation counts towards the buckets it falls in
+        for granularity in GRANULARITIES:
+            self._conn.execute('''
+                INSERT INTO score_buckets (granularity, bucket_start, framework, resource_type, verdicts, compliant,
+                                           partial, non_compliant)
+                SELECT ?, ?, framework, resource_type, COUNT(*),
+                       SUM(status = 'COMPLIANT'), SUM(status = 'PARTIAL'), SUM(status = 'NON_COMPLIANT')
+                FROM staged_verdicts GROUP BY framework, resource_type
+                ON CONFLICT (granularity, bucket_start, framework, resource_type) DO UPDATE SET
+                    verdicts = verdicts + excluded.verdicts, compliant = compliant + excluded.compliant,
+                    partial = partial + excluded.partial, non_compliant = non_compliant + excluded.non_compliant
+            ''', (granularity, bucket_start(evaluated_at, granularity)))
+
+    def rebuild_rollups(self):
+        """Recompute the rollups: totals from current verdicts, buckets from per-scan totals
+
+        Rebuilt buckets attribute a scan's verdicts to the scan's start time.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM verdict_totals')
+            self._conn.execute('''
+                INSERT INTO verdict_totals (framework, resource_type, risk_level, verdicts, compliant, partial,
+                                            non_compliant)
+                SELECT framework, resource_type, risk_level, COUNT(*),
+                       SUM(status = 'COMPLIANT'), SUM(status = 'PARTIAL'), SUM(status = 'NON_COMPLIANT')
+                FROM verdicts GROUP BY framework, resource_type, risk_level
+            ''')
+            self._conn.execute('DELETE FROM score_buckets')
+            for granularity, width in GRANULARITIES.items():
+                offset = _WEEK_OFFSET if granularity == 'week' else 0
+                self._conn.execute('''
+                    INSERT INTO score_buckets (granularity, bucket_start, framework, resource_type, verdicts,
+                                               compliant, partial, non_compliant)
+                    SELECT ?, CAST((s.started_at + ?) / ? AS INTEGER) * ? - ? AS bucket, t.framework,
+                           t.resource_type, SUM(t.verdicts), SUM(t.compliant), SUM(t.partial), SUM(t.non_compliant)
+                    FROM scans s JOIN scan_stats t ON t.scan_id = s.scan_id
+                    GROUP BY bucket, t.framework, t.resource_type
+                ''', (granularity, offset, width, width, offset))
+
+    def _retire_unseen(self, scan_id: int):
+        """Drop the current verdicts of resources a completed full scan did not see, and their totals"""
+        unseen = 'SELECT resource_key FROM resources WHERE last_scan_id < ?'
+        self._conn.execute(f'''
+            INSERT INTO verdict_totals (framework, resource_type, risk_level, verdicts, compliant, partial, non_compliant)
+            SELECT framework, resource_type, risk_level, -COUNT(*), -SUM(status = 'COMPLIANT'),
+                   -SUM(status = 'PARTIAL'), -SUM(status = 'NON_COMPLIANT')
+            FROM verdicts WHERE resource_key IN ({unseen})
+            GROUP BY framework, resource_type, risk_level
+            ON CONFLICT (framework, resource_type, risk_level) DO UPDATE SET
+                verdicts = verdicts + excluded.verdicts, compliant = compliant + excluded.compliant,
+                partial = partial + excluded.partial, non_compliant = non_compliant + excluded.non_compliant
+        ''', (scan_id,))
+        self._conn.execute(f'DELETE FROM verdicts WHERE resource_key IN ({unseen})', (scan_id,))
+
+    def finish_scan(self, scan_id: int, resources: int, finished_at: Optional[float] = None,
+                    status: str = 'completed'):
+        """Close a scan; a 'failed' scan keeps the verdicts it recorded but is never the latest scan
+
+        A completed full scan retires the current verdicts of resources it did
+        not see (deleted buckets, terminated instances), so they stop counting
+        towards the current scores. Their history stays in the per-scan totals.
+        """
+        if status not in SCAN_STATUSES[1:]:
+            raise ValueError(f'Cannot finish a scan as {status!r}')
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE scans SET finished_at = ?, resources = ?, status = ? WHERE scan_id = ?',
+                               (finished_at or time.time(), resources, status, scan_id))
+            (source,) = self._conn.execute('SELECT source FROM scans WHERE scan_id = ?', (scan_id,)).fetchone()
+            if status == 'completed' and source not in PARTIAL_SOURCES:
+                self._retire_unseen(scan_id)
+
+    def record_scan(self, compliance_results: Iterable[Dict], resources: int, source: str = 'scan',
+                    started_at: Optional[float] = None) -> int:
+        """Record a complete scan in one call"""
+        scan_id = self.start_scan(source, started_at)
+        try:
+            self.add_results(scan_id, compliance_results, started_at)
+        except BaseException:
+            self.finish_scan(scan_id, 0, status='failed')
+            raise
+        self.finish_scan(scan_id, resources, started_at)
+        return scan_id
+
+    # -- dashboard queries ----------------------------------------------------
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def latest_scans(self, limit: int = 2) -> List[Dict]:
+        """Most recent completed full scans that produced verdicts, newest first, with their totals"""
+        rows = self._query('''
+            SELECT s.scan_id, s.started_at, s.resources, SUM(t.verdicts), SUM(t.compliant), SUM(t.partial),
+                   SUM(t.non_compliant), SUM(CASE WHEN t.risk_level = 'CRITICAL' THEN t.non_compliant ELSE 0 END)
+            FROM (SELECT * FROM scans WHERE status = 'completed' AND finished_at IS NOT NULL
+                  AND source NOT IN ({partial})
+                  AND scan_id IN (SELECT DISTINCT scan_id FROM scan_stats)
+                  ORDER BY started_at DESC LIMIT ?) s
+            JOIN scan_stats t ON t.scan_id = s.scan_id
+            GROUP BY s.scan_id ORDER BY s.started_at DESC
+        '''.format(partial=', '.join('?' * len(PARTIAL_SOURCES))), PARTIAL_SOURCES + (limit,))
+        return [{
+            'scan_id': scan_id,
+            'started_at': started_at,
+            'resources': resources,
+            'verdicts': verdicts,
+            'non_compliant': non_compliant,
+            'critical_violations': critical,
+            'compliance_score': _score(compliant, partial, compliant + partial + non_compliant)
+        } for scan_id, started_at, resources, verdicts, compliant, partial, non_compliant, critical in rows]
+
+    def current_scores(self, by: str = 'framework') -> Dict[str, Optional[float]]:
+        """Compliance score of the current verdicts per framework, resource_type or risk_level"""
+        if by not in ('framework', 'resource_type', 'risk_level'):
+            raise ValueError(f'Cannot group scores by {by!r}')
+        rows = self._query(f'''
+            SELECT {by}, SUM(compliant), SUM(partial), SUM(compliant + partial + non_compliant)
+            FROM verdict_totals GROUP BY {by} HAVING SUM(verdicts) > 0 ORDER BY {by}
+        ''')
+        return {key: _score(compliant, partial, scored) for key, compliant, partial, scored in rows}
+
+    def current_summary(self) -> Dict:
+        """Totals and compliance score of the current verdicts"""
+        verdicts, compliant, partial, non_compliant, critical = self._query('''
+            SELECT TOTAL(verdicts), TOTAL(compliant), TOTAL(partial), TOTAL(non_compliant),
+                   TOTAL(CASE WHEN risk_level = 'CRITICAL' THEN non_compliant ELSE 0 END)
+            FROM verdict_totals
+        ''')[0]
+        return {
+            'verdicts': int(verdicts),
+            'non_compliant': int(non_compliant),
+            'critical_violations': int(critical),
+            'compliance_score': _score(compliant, partial, compliant + partial + non_compliant)
+        }
+
+    def score_trend(self, days: int = 30, granularity: str = 'day', framework: Optional[str] = None,
+                    resource_type: Optional[str] = None) -> List[Dict]:
+        """Compliance score per hour, day or week bucket over the last ``days`` days"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f'Unknown granularity {granularity!r}, expected one of {", ".join(GRANULARITIES)}')
+        clauses = ['granularity = ?', 'bucket_start >= ?']
+        params = [granularity, bucket_start(time.time() - days * 86400, granularity)]
+        for column, value in (('framework', framework), ('resource_type', resource_type)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        rows = self._query(f'''
+            SELECT bucket_start, SUM(compliant), SUM(partial), SUM(compliant + partial + non_compliant)
+            FROM score_buckets WHERE {' AND '.join(clauses)}
+            GROUP BY bucket_start ORDER BY bucket_start
+        ''', tuple(params))
+        return [{'bucket_start': start, 'compliance_score': _score(compliant, partial, scored)}
+                for start, compliant, partial, scored in rows]
+
+    def framework_scores(self, scan_id: Optional[int] = None) -> Dict[str, Optional[float]]:
+        """Compliance score per framework, of the current verdicts or of one scan"""
+        if scan_id is None:
+            return self.current_scores('framework')
+        rows = self._query('''
+            SELECT framework, SUM(compliant), SUM(partial), SUM(compliant + partial + non_compliant)
+            FROM scan_stats WHERE scan_id = ? GROUP BY framework ORDER BY framework
+        ''', (scan_id,))
+        return {framework: _score(compliant, partial, scored) for framework, compliant, partial, scored in rows}
+
+    def recent_violations(self, limit: int = 20, framework: Optional[str] = None,
+                          severity: Optional[str] = None, resource_type: Optional[str] = None) -> List[Dict]:
+        """Current NON_COMPLIANT verdicts, newest first, filtered by framework, severity or resource type
+
+        Verdicts of resources the latest full scan did not see have been
+        retired (see ``finish_scan``), so resources that are gone are not listed.
+        """
+        clauses, params = ["status = 'NON_COMPLIANT'"], []
+        for column, value in (('framework', framework), ('risk_level', severity), ('resource_type', resource_type)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        rows = self._query(f'''
+            SELECT resource_key, framework, resource_type, risk_level, evaluated_at, result FROM verdicts
+            WHERE {' AND '.join(clauses)} ORDER BY evaluated_at DESC LIMIT ?
+        ''', tuple(params) + (limit,))
+        violations = []
+        for key, framework, resource_type, risk_level, evaluated_at, result in rows:
+            result = json.loads(result)
+            violations.append({
+                'framework': framework,
+                'resource': key,
+                'resource_type': resource_type,
+                'violation': '; '.join(result.get('violations') or []) or 'Non-compliant',
+                'severity': risk_level,
+                'evaluated_at': evaluated_at
+            })
+        return violations
+
+    def resource_count(self, resource_type: Optional[str] = None) -> int:
+        """Resources seen by the latest completed full scan
+
+        Targeted rescans move a resource's last_scan_id past that scan, so
+        every resource seen by it or since is counted, not only those the
+        most recent rescan touched.
+        """
+        latest = self._query('''
+            SELECT MAX(scan_id) FROM scans WHERE status = 'completed' AND source NOT IN ({partial})
+        '''.format(partial=', '.join('?' * len(PARTIAL_SOURCES))), PARTIAL_SOURCES)[0][0]
+        if latest is None:
+            return 0
+        if resource_type:
+            return self._query('SELECT COUNT(*) FROM resources WHERE last_scan_id >= ? AND resource_type = ?',
+                               (latest, resource_type))[0][0]
+        return self._query('SELECT COUNT(*) FROM resources WHERE last_scan_id >= ?', (latest,))[0][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,272 @@
+"""Span timers and counters for the agents' AWS and Bedrock calls and the Lambda phases
+
+Recording is off unless ENABLE_METRICS is set (or ``enable()`` is called);
+while it is off ``span()`` hands back a shared no-op context manager and
+``count()`` returns after one flag check. Everything recorded goes to the
+process-wide registry, exported as Prometheus text, and to every registry
+opened with ``collect()``, which is how a Lambda invocation gets its summary.
+boto3 clients are instrumented through botocore's call events, so every API
+call made through an instrumented client is timed without touching callers.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds, for the Prometheus export
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_PREFIX = 'enforce_ai'
+
+_enabled = os.environ.get('ENABLE_METRICS', '').lower() in ('1', 'true', 'yes')
+_collectors = ()
+_collectors_lock = threading.Lock()
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(flag: bool = True):
+    global _enabled
+    _enabled = flag
+
+
+def _key(name: str, labels: Dict) -> Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items())) if labels else ()
+
+
+def _display(key: Key) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{label}="{value}"' for label, value in labels) + '}'
+
+
+class Registry:
+    """Span timings and counter totals keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> [count, errors, total seconds, max seconds, per-bucket counts...]
+        self.spans = {}
+        self.counters = {}
+
+    def observe(self, key: Key, seconds: float, error: bool):
+        with self._lock:
+            span = self.spans.get(key)
+            if span is None:
+                span = self.spans[key] = [0, 0, 0.0, 0.0] + [0] * (len(BUCKETS) + 1)
+            span[0] += 1
+            span[1] += error
+            span[2] += seconds
+            if seconds > span[3]:
+                span[3] = seconds
+            span[4 + bisect_left(BUCKETS, seconds)] += 1
+
+    def add(self, key: Key, value: float):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def summary(self) -> Dict:
+        """JSON-friendly spans (count, errors, total/mean/max ms) and counters"""
+        with self._lock:
+            spans = {key: list(span) for key, span in self.spans.items()}
+            counters = dict(self.counters)
+        return {
+            'spans': {_display(key): {
+                'count': span[0],
+                'errors': span[1],
+                'total_ms': round(span[2] * 1000, 2),
+                'mean_ms': round(span[2] / span[0] * 1000, 2),
+                'max_ms': round(span[3] * 1000, 2),
+            } for key, span in sorted(spans.items())},
+            'counters': {_display(key): value for key, value in sorted(counters.items())},
+        }
+
+    def prometheus_text(self) -> str:
+        """Text exposition format: one histogram for all spans, one counter per counter name"""
+        with self._lock:
+            spans = {key: list(span) for key, span in self.spans.items()}
+            counters = dict(self.counters)
+        lines = []
+        if spans:
+            metric = f'{PROMETHEUS_PREFIX}_span_seconds'
+            lines += [f'# HELP {metric} Duration of instrumented calls and phases',
+                      f'# TYPE {metric} histogram']
+            for (name, labels), span in sorted(spans.items()):
+                labels = (('span', name),) + labels
+                cumulative = 0
+                for bound, observed in zip(BUCKETS + (float('inf'),), span[4:]):
+                    cumulative += observed
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{metric}_sum{_labels(labels)} {span[2]:.6f}')
+                lines.append(f'{metric}_count{_labels(labels)} {span[0]}')
+            errors = f'{PROMETHEUS_PREFIX}_span_errors_total'
+            lines += [f'# HELP {errors} Instrumented calls and phases that failed',
+                      f'# TYPE {errors} counter']
+            lines += [f'{errors}{_labels((("span", name),) + labels)} {span[1]}'
+                      for (name, labels), span in sorted(spans.items())]
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f'{PROMETHEUS_PREFIX}_{name}_total'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(label, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for label, value in labels) + '}'
+
+
+registry = Registry()
+
+
+def _record(key: Key, seconds: float, error: bool):
+    registry.observe(key, seconds, error)
+    for collector in _collectors:
+        collector.observe(key, seconds, error)
+
+
+class _Span:
+    __slots__ = ('key', 'start')
+
+    def __init__(self, key: Key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record(self.key, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **labels):
+    """Context manager timing its block under ``name``; an exception counts as an error"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(_key(name, labels))
+
+
+def count(name: str, value: float = 1, **labels):
+    """Add ``value`` to a counter"""
+    if not _enabled or not value:
+        return
+    key = _key(name, labels)
+    registry.add(key, value)
+    for collector in _collectors:
+        collector.add(key, value)
+
+
+@contextmanager
+def collect() -> Iterator[Registry]:
+    """A registry that receives everything recorded in the process while the block runs"""
+    global _collectors
+    collector = Registry()
+    with _collectors_lock:
+        _collectors += (collector,)
+    try:
+        yield collector
+    finally:
+        with _collectors_lock:
+            _collectors = tuple(other for other in _collectors if other is not collector)
+
+
+# boto3 clients: botocore emits before-call and after-call around each API call
+# (retries included) and after-call-error when sending the request raises.
+
+def _before_call(model, context, **kwargs):
+    if _enabled:
+        context['metrics_call'] = (model, time.perf_counter())
+
+
+def _after_call(context, parsed=None, exception=None, **kwargs):
+    call = context.pop('metrics_call', None)
+    if call is None:
+        return
+    model, started = call
+    labels = {'service': model.service_model.service_name, 'operation': model.name}
+    error = exception is not None or (isinstance(parsed, dict) and 'Error' in parsed)
+    _record(_key('aws.call', labels), time.perf_counter() - started, error)
+    if error:
+        code = type(exception).__name__ if exception is not None else parsed['Error'].get('Code', 'Unknown')
+        count('aws_errors', code=code, **labels)
+
+
+def instrument_client(client):
+    """Time every API call of a boto3 client; the handlers are no-ops while recording is off
+
+    The before-call handler is registered first so it runs ahead of
+    response-supplying hooks such as Stubber's, which end the chain.
+    """
+    events = client.meta.events
+    events.register_first('before-call', _before_call, unique_id='enforce-ai-metrics-before-call')
+    events.register('after-call', _after_call, unique_id='enforce-ai-metrics-after-call')
+    events.register('after-call-error', _after_call, unique_id='enforce-ai-metrics-after-call-error')
+    return client
+
+
+# Sinks
+
+def write_jsonl(path: str, record: Dict):
+    """Append one JSON line to ``path``; '-' writes to stdout (CloudWatch Logs in Lambda)"""
+    line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+    if path == '-':
+        sys.stdout.write(line)
+        sys.stdout.flush()
+        return
+    with open(path, 'a') as f:
+        f.write(line)
+
+
+def write_prometheus(path: str, source: Optional[Registry] = None):
+    """Write the process-wide registry in text exposition format, replacing ``path`` atomically
+
+    Suits node_exporter's textfile collector.
+    """
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as f:
+        f.write((source or registry).prometheus_text())
+    os.replace(temporary, path)
+
+
+def export(summary: Dict, **fields):
+    """Send an invocation summary to the sinks configured by METRICS_JSONL_PATH and METRICS_PROMETHEUS_FILE"""
+    jsonl_path = os.environ.get('METRICS_JSONL_PATH')
+    if jsonl_path:
+        write_jsonl(jsonl_path, dict(fields, timestamp=time.time(), **summary))
+    prometheus_path = os.environ.get('METRICS_PROMETHEUS_FILE')
+    if prometheus_path:
+        write_prometheus(prometheus_path)
@@ -0,0 +1,204 @@
+"""Tiered model routing for the Compliance and Policy agents
+
+Each Bedrock call is routed to a starting tier by request type ('evaluate',
+'enforce' or 'report') and framework, and escalated to the next stronger
+tier when the response is unparseable, reports a confidence below the
+threshold, or the call fails. Frameworks whose risk level is CRITICAL
+(FISMA) start on the strongest tier, as do reports.
+
+Routes map a request type, a framework or ``request_type:framework`` to a
+tier name; the most specific match wins. They default from MODEL_ROUTES (a
+JSON object), the tier models from BEDROCK_FAST_MODEL_ID and
+BEDROCK_MODEL_ID, and the threshold from MODEL_CONFIDENCE_THRESHOLD.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import CancelledError
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from policies.frameworks import COMPLIANCE_FRAMEWORKS
+from agents import metrics
+from agents.bedrock_runtime import DEFAULT_MODEL_ID, TokenUsage, invoke_model, stream_model
+
+FAST_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+REQUEST_TYPES = ('evaluate', 'enforce', 'report')
+ESCALATE_RISK_LEVELS = ('CRITICAL',)
+LATENCY_SAMPLES = 2048
+
+
+def default_tiers() -> Dict[str, str]:
+    """Tier name -> model id, weakest first"""
+    return OrderedDict([
+        ('fast', os.environ.get('BEDROCK_FAST_MODEL_ID', FAST_MODEL_ID)),
+        ('strong', os.environ.get('BEDROCK_MODEL_ID', DEFAULT_MODEL_ID)),
+    ])
+
+
+def default_routes(strongest: str = 'strong') -> Dict[str, str]:
+    """Reports and CRITICAL-risk frameworks start on the strongest tier, overlaid with MODEL_ROUTES"""
+    routes = {'report': strongest}
+    routes.update({framework: strongest for framework, definition in COMPLIANCE_FRAMEWORKS.items()
+                   if definition.get('risk_level') in ESCALATE_RISK_LEVELS})
+    routes.update(json.loads(os.environ.get('MODEL_ROUTES') or '{}'))
+    return routes
+
+
+class _TeeUsage:
+    """Records token usage into several TokenUsage accumulators"""
+
+    def __init__(self, *usages: Optional[TokenUsage]):
+        self.usages = [usage for usage in usages if usage is not None]
+
+    def record(self, prompt: str, result: Dict, cached: bool = False):
+        for usage in self.usages:
+            usage.record(prompt, result, cached=cached)
+
+
+class ModelRouter:
+    """Chooses the model tier for each call and tracks per-tier latency, tokens and escalations"""
+
+    def __init__(self, tiers: Optional[Dict[str, str]] = None, routes: Optional[Dict[str, str]] = None,
+                 confidence_threshold: Optional[float] = None):
+        self.tiers = OrderedDict(tiers or default_tiers())
+        self.order = list(self.tiers)
+        self.routes = dict(routes) if routes is not None else default_routes(self.order[-1])
+        unknown = set(self.routes.values()) - set(self.tiers)
+        if unknown:
+            raise ValueError(f'Unknown model tiers in routes: {sorted(unknown)}')
+        if confidence_threshold is None:
+            confidence_threshold = float(os.environ.get('MODEL_CONFIDENCE_THRESHOLD', 0.7))
+        self.confidence_threshold = confidence_threshold
+        self._lock = threading.Lock()
+        self.usage = {tier: TokenUsage() for tier in self.order}
+        self._latencies = {tier: deque(maxlen=LATENCY_SAMPLES) for tier in self.order}
+        self._counts = {tier: Counter() for tier in self.order}
+        self._reasons = Counter()
+
+    def start_tier(self, request_type: str, framework: Optional[str] = None) -> str:
+        for key in (f'{request_type}:{framework}', framework, request_type):
+            if key in self.routes:
+                return self.routes[key]
+        return self.order[0]
+
+    def next_tier(self, tier: str) -> Optional[str]:
+        position = self.order.index(tier)
+        return self.order[position + 1] if position + 1 < len(self.order) else None
+
+    def model_id(self, tier: str) -> str:
+        return self.tiers[tier]
+
+    def escalation_reason(self, verdict: Optional[Dict]) -> Optional[str]:
+        """Why a parsed response should go to a stronger tier, or None if it stands
+
+        A response without a confidence is taken as confident.
+        """
+        if not isinstance(verdict, dict):
+            return 'unparseable'
+        if verdict.get('status') == 'ERROR':
+            return 'error'
+        try:
+            confidence = float(verdict['confidence'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return 'low_confidence' if confidence < self.confidence_threshold else None
+
+    def _timed(self, tier: str, request_type: str, start: float):
+        with self._lock:
+            self._latencies[tier].append(time.perf_counter() - start)
+            self._counts[tier]['calls'] += 1
+            self._counts[tier][f'{request_type}_calls'] += 1
+
+    def call(self, bedrock, tier: str, request_type: str, prompt: str, usage: Optional[TokenUsage] = None,
+             **kwargs) -> Dict:
+        """invoke_model on a tier's model, timed and token-counted for that tier"""
+        start = time.perf_counter()
+        try:
+            return invoke_model(bedrock, self.tiers[tier], prompt, usage=_TeeUsage(usage, self.usage[tier]),
+                                **kwargs)
+        finally:
+            self._timed(tier, request_type, start)
+
+    def stream(self, bedrock, tier: str, request_type: str, prompt: str, usage: Optional[TokenUsage] = None,
+               **kwargs) -> Iterator[str]:
+        """stream_model on a tier's model; the latency recorded is that of the whole stream"""
+        start = time.perf_counter()
+        try:
+            yield from stream_model(bedrock, self.tiers[tier], prompt, usage=_TeeUsage(usage, self.usage[tier]),
+                                    **kwargs)
+        finally:
+            self._timed(tier, request_type, start)
+
+    def record(self, tier: str, request_type: str, verdicts: int = 1, escalated: Sequence[str] = ()):
+        """Count verdicts judged on a tier and the reasons of those escalated from it"""
+        with self._lock:
+            self._counts[tier]['verdicts'] += verdicts
+            self._counts[tier]['escalated'] += len(escalated)
+            self._reasons.update(escalated)
+        metrics.count('model_verdicts', verdicts, tier=tier, request_type=request_type)
+        for reason in escalated:
+            metrics.count('model_escalations', tier=tier, request_type=request_type, reason=reason)
+
+    def invoke(self, bedrock, request_type: str, framework: Optional[str], prompt: str,
+               parse: Callable[[Dict], Optional[Dict]], usage: Optional[TokenUsage] = None,
+               tier: Optional[str] = None, **kwargs) -> Tuple[Dict, Optional[Dict], str]:
+        """Call the routed tier (or ``tier``), escalating while the parsed response calls for it
+
+        Returns the raw response, its parsed form and the tier that produced
+        them. A failed call escalates too; on the last tier it raises.
+        """
+        tier = tier or self.start_tier(request_type, framework)
+        while True:
+            stronger = self.next_tier(tier)
+            try:
+                result = self.call(bedrock, tier, request_type, prompt, usage=usage, **kwargs)
+            except CancelledError:
+                raise
+            except Exception:
+                if stronger is None:
+                    raise
+                self.record(tier, request_type, escalated=['error'])
+                tier = stronger
+                continue
+            parsed = parse(result)
+            reason = self.escalation_reason(parsed) if stronger is not None else None
+            self.record(tier, request_type, escalated=[reason] if reason else ())
+            if reason is None:
+                return result, parsed, tier
+            tier = stronger
+
+    def summary(self) -> Dict:
+        """Per-tier calls, latency, tokens and escalation rate, plus escalation reasons"""
+        with self._lock:
+            latencies = {tier: sorted(samples) for tier, samples in self._latencies.items()}
+            counts = {tier: dict(counter) for tier, counter in self._counts.items()}
+            reasons = dict(self._reasons)
+        tiers = {}
+        for tier in self.order:
+            samples, tier_counts, usage = latencies[tier], counts[tier], self.usage[tier].summary()
+            verdicts = tier_counts.get('verdicts', 0)
+            tiers[tier] = {
+                'model_id': self.tiers[tier],
+                'calls': tier_counts.get('calls', 0),
+                'calls_by_request_type': {request_type: tier_counts[f'{request_type}_calls']
+                                          for request_type in REQUEST_TYPES if f'{request_type}_calls' in tier_counts},
+                'cached': usage['cached'],
+                'verdicts': verdicts,
+                'escalated': tier_counts.get('escalated', 0),
+                'escalation_rate': round(tier_counts.get('escalated', 0) / verdicts, 4) if verdicts else 0.0,
+                'p50_ms': round(samples[len(samples) // 2] * 1000, 2) if samples else None,
+                'mean_ms': round(sum(samples) / len(samples) * 1000, 2) if samples else None,
+                'input_tokens': usage['input_tokens'],
+                'output_tokens': usage['output_tokens'],
+            }
+        return {'tiers': tiers, 'escalation_reasons': reasons}
+
+    def reset(self):
+        with self._lock:
+            for tier in self.order:
+                self._latencies[tier].clear()
+                self._counts[tier].clear()
+                self.usage[tier].reset()
+            self._reasons.clear()
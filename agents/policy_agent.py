@@ -1,67 +1,184 @@
 """Policy Agent for dynamic rule enforcement"""
-import boto3
-import json
-from typing import Dict, List
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence
+from policies.applicability import INDEX, ApplicabilityIndex
 from policies.frameworks import COMPLIANCE_FRAMEWORKS
+from policies.rules import SEVERITY_ORDER, RuleEngine
+from agents.clients import get_client
+from agents.bedrock_pool import BedrockPool, get_shared_pool
+from agents.bedrock_runtime import BEDROCK_CLIENT_CONFIG, TokenUsage, response_json
+from agents.model_router import ModelRouter
+from agents.remediation import RemediationEngine
+from agents.prompt_builder import PromptBuilder, compact_json
+from agents.response_cache import ResponseCache, get_shared_cache
+
+POLICY_PROMPT = """
+    Evaluate this AWS resource against {framework} policy rules:
+
+    Resource: {resource}
+
+    Framework Rules:
+    {rules}
+
+    Determine:
+    1. Which rules are violated
+    2. Severity of each violation
+    3. Immediate remediation actions
+    4. Automated fixes possible
+    5. Confidence in this evaluation (0.0-1.0)
+
+    Respond with JSON only, in the form:
+    {{"violations": [{{"rule": "...", "severity": "LOW|MEDIUM|HIGH|CRITICAL", "current_state": "...", "required_action": "...", "action_type": "encryption|backup|mfa|manual"}}], "compliance_score": 0-100, "confidence": 0.9}}
+    """
+
+
+def _enforcement_violation(violation) -> Optional[Dict]:
+    if isinstance(violation, str):
+        violation = {'rule': violation}
+    if not isinstance(violation, dict) or not violation.get('rule'):
+        return None
+    severity = str(violation.get('severity') or '').upper()
+    return {
+        "rule": violation['rule'],
+        "severity": severity if severity in SEVERITY_ORDER else 'UNKNOWN',
+        "current_state": violation.get('current_state', ''),
+        "required_action": violation.get('required_action', ''),
+        "action_type": violation.get('action_type') or 'manual'
+    }
+
+
+def parse_enforcement(result: Dict) -> Optional[Dict]:
+    """The model's enforcement result, or None if it has no list of violations
+
+    Violations given as plain rule texts become violation dicts; a missing
+    or out-of-range compliance score is left as None for the caller to derive.
+    """
+    row = response_json(result)
+    if not isinstance(row, dict) or not isinstance(row.get('violations'), list):
+        return None
+    violations = [_enforcement_violation(violation) for violation in row['violations']]
+    if None in violations:
+        return None
+    score = row.get('compliance_score')
+    parsed = {
+        "violations": violations,
+        "compliance_score": int(score) if isinstance(score, (int, float)) and 0 <= score <= 100 else None
+    }
+    if row.get('confidence') is not None:
+        parsed['confidence'] = row['confidence']
+    return parsed
+
+
+def compliance_score(rules: Sequence[str], violations: Sequence[Dict]) -> int:
+    """Share of the rules judged that are not violated; violated rules count even if not in ``rules``"""
+    violated = {violation['rule'] for violation in violations}
+    judged = set(rules) | violated
+    if not judged:
+        return 100
+    return 100 * (len(judged) - len(violated)) // len(judged)
 
 class PolicyAgent:
-    def __init__(self):
-        self.bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
+    def __init__(self, rule_engine: RuleEngine = None, cache: ResponseCache = None, pool: BedrockPool = None,
+                 input_token_budget: int = 4000, router: ModelRouter = None,
+                 remediation: RemediationEngine = None, applicability: ApplicabilityIndex = None):
+        self.bedrock = get_client('bedrock-runtime', 'us-east-1', BEDROCK_CLIENT_CONFIG)
+        self.router = router or ModelRouter()
+        self.rule_engine = rule_engine or RuleEngine()
+        self.cache = cache if cache is not None else get_shared_cache()
+        self.pool = pool or get_shared_pool()
+        self.prompts = PromptBuilder(input_token_budget)
+        self.usage = TokenUsage()
+        self._remediation = remediation
+        self.applicability = applicability or INDEX
     
     def enforce_policy(self, resource: Dict, framework: str) -> Dict:
-        """Enforce policy rules on a resource"""
-        framework_rules = COMPLIANCE_FRAMEWORKS.get(framework, {})
-        
-        prompt = f"""
-        Evaluate this AWS resource against {framework} policy rules:
-        
-        Resource: {json.dumps(resource, indent=2)}
-        
-        Framework Rules:
-        {json.dumps(framework_rules.get('rules', []), indent=2)}
-        
-        Determine:
-        1. Which rules are violated
-        2. Severity of each violation
-        3. Immediate remediation actions
-        4. Automated fixes possible
-        
-        Return JSON with enforcement results.
+        """Enforce policy rules on a resource
+
+        Only the framework rules that apply to the resource's type and
+        attributes go into the prompt; a resource none of them apply to is
+        reported NOT_APPLICABLE without a model call.
         """
+        rules = self.applicability.rules_for(resource, framework)
+        if rules is None:
+            rules = COMPLIANCE_FRAMEWORKS.get(framework, {}).get('rules', [])
         
-        try:
-            response = self.bedrock.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 1000,
-                    "messages": [{"role": "user", "content": prompt}]
-                })
-            )
-            
-            # Simulate policy enforcement result
+        # Deterministic rule failures are definitive; no model call needed
+        verdict = self.rule_engine.check(resource, framework)
+        if verdict is not None:
+            violations = verdict['rule_violations']
             return {
                 "resource_id": resource.get('resource_id', 'unknown'),
                 "framework": framework,
-                "violations": [
-                    {
-                        "rule": "Encryption required",
-                        "severity": "HIGH",
-                        "current_state": "Not encrypted",
-                        "required_action": "Enable encryption"
-                    }
-                ],
-                "compliance_score": 65,
-                "auto_remediation": True,
-                "enforcement_status": "PENDING"
+                "violations": violations,
+                "compliance_score": compliance_score(rules, violations),
+                "auto_remediation": any(v['action_type'] != 'manual' for v in violations),
+                "enforcement_status": "PENDING",
+                "source": "rules"
             }
+        
+        if not rules:
+            return {
+                "resource_id": resource.get('resource_id', 'unknown'),
+                "framework": framework,
+                "violations": [],
+                "compliance_score": 100,
+                "auto_remediation": False,
+                "enforcement_status": "NOT_APPLICABLE",
+                "source": "applicability"
+            }
+        
+        try:
+            prompt = self.prompts.resource_prompt(POLICY_PROMPT, resource, [framework], framework=framework,
+                                                  rules=compact_json(rules))
+            result, parsed, tier = self.router.invoke(self.bedrock, 'enforce', framework, prompt,
+                                                      parse=parse_enforcement, max_tokens=1000, cache=self.cache,
+                                                      pool=self.pool, usage=self.usage)
         except Exception as e:
             return {
                 "resource_id": resource.get('resource_id', 'unknown'),
                 "error": str(e),
                 "enforcement_status": "ERROR"
             }
+        if parsed is None:
+            return {
+                "resource_id": resource.get('resource_id', 'unknown'),
+                "error": "Model response has no valid enforcement result",
+                "enforcement_status": "ERROR",
+                "model_tier": tier
+            }
+        
+        violations = parsed['violations']
+        enforcement = {
+            "resource_id": resource.get('resource_id', 'unknown'),
+            "framework": framework,
+            "violations": violations,
+            "compliance_score": parsed['compliance_score'] if parsed['compliance_score'] is not None
+            else compliance_score(rules, violations),
+            "auto_remediation": any(v['action_type'] != 'manual' for v in violations),
+            "enforcement_status": "PENDING" if violations else "COMPLIANT",
+            "model_tier": tier
+        }
+        if 'confidence' in parsed:
+            enforcement['confidence'] = parsed['confidence']
+        return enforcement
+    
+    def submit_enforcement(self, resource: Dict, framework: str) -> Future:
+        """Schedule enforce_policy on the Bedrock pool and return a cancellable Future"""
+        return self.pool.submit(self.enforce_policy, resource, framework)
+    
+    async def enforce_policy_async(self, resource: Dict, framework: str) -> Dict:
+        """Awaitable enforce_policy, run on the Bedrock pool"""
+        return await self.pool.run(self.enforce_policy, resource, framework)
+    
+    def remediate_batch(self, violations: List[Dict], dry_run: bool = True) -> Dict:
+        """Plan remediation for many violations (or scan results) at once; apply it with ``dry_run=False``
+
+        See ``agents.remediation``: actions are de-duplicated, grouped by
+        service and region and run concurrently under per-service rate limits.
+        """
+        if self._remediation is None:
+            self._remediation = RemediationEngine()
+        return self._remediation.run(violations, dry_run=dry_run)
     
     def auto_remediate(self, violation: Dict) -> Dict:
         """Attempt automatic remediation of policy violations"""
@@ -0,0 +1,75 @@
+"""Token-lean prompt construction shared by the Compliance and Policy agents
+
+Resources are projected down to the attributes the requested frameworks'
+rules can speak to and serialised as compact JSON; templates are dedented
+so indentation does not cost tokens. Every prompt is checked against an
+input token budget before it is sent.
+"""
+import json
+import textwrap
+from typing import Dict, Optional, Sequence, Set
+
+from agents.bedrock_runtime import estimate_tokens
+from policies.frameworks import FRAMEWORK_FIELDS
+from policies.rules import MACHINE_RULES
+
+IDENTITY_FIELDS = ('resource_type', 'resource_id', 'region')
+OMITTED_FIELDS = {'last_scan'}
+
+
+class PromptBudgetExceeded(ValueError):
+    """A prompt cannot be made to fit the input token budget"""
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+def relevant_fields(frameworks: Sequence[str]) -> Optional[Set[str]]:
+    """Attributes any of the frameworks can assess, or None if one of them is not mapped"""
+    fields = set(IDENTITY_FIELDS)
+    for framework in frameworks:
+        if framework not in FRAMEWORK_FIELDS:
+            return None
+        fields.update(FRAMEWORK_FIELDS[framework])
+        fields.update(rule['attribute'] for rule in MACHINE_RULES if framework in rule['frameworks'])
+    return fields
+
+
+def project(resource: Dict, frameworks: Sequence[str]) -> Dict:
+    """The resource restricted to identity fields and the frameworks' relevant attributes"""
+    fields = relevant_fields(frameworks)
+    return {key: value for key, value in resource.items()
+            if key not in OMITTED_FIELDS and (fields is None or key in fields)}
+
+
+class PromptBuilder:
+    """Renders templates into compact prompts within ``input_budget`` tokens"""
+
+    def __init__(self, input_budget: int = 4000):
+        self.input_budget = input_budget
+
+    def render(self, template: str, budget: Optional[int] = None, **fields) -> str:
+        """Dedent the template, fill it and check the result against the budget"""
+        budget = budget or self.input_budget
+        prompt = textwrap.dedent(template).strip().format(**fields)
+        tokens = estimate_tokens(prompt)
+        if tokens > budget:
+            raise PromptBudgetExceeded(f'Prompt needs about {tokens} input tokens, budget is {budget}')
+        return prompt
+
+    def resource_prompt(self, template: str, resource: Dict, frameworks: Sequence[str], **fields) -> str:
+        """Render a template whose ``{resource}`` placeholder gets the projected resource
+
+        If the prompt is over budget, the largest non-identity attributes are
+        dropped one at a time until it fits.
+        """
+        projected = project(resource, frameworks)
+        while True:
+            try:
+                return self.render(template, resource=compact_json(projected), **fields)
+            except PromptBudgetExceeded:
+                droppable = [key for key in projected if key not in IDENTITY_FIELDS]
+                if not droppable:
+                    raise
+                del projected[max(droppable, key=lambda key: len(compact_json(projected[key])))]
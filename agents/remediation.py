@@ -0,0 +1,302 @@
+"""Batch remediation of rule violations across a fleet
+
+Violations (flat, or the ``rule_violations`` of scan results) are mapped to
+concrete remediation actions in ``REMEDIATIONS``, de-duplicated per action
+and target, and grouped by service and region. Actions run concurrently on a
+worker pool under a per-service rate limit, each guarded by an idempotency
+key recorded in a SQLite ledger, so a retried or overlapping batch skips
+what an earlier one already applied. A dry run returns the plan without
+calling AWS. Violations with no automated action are listed as manual.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from botocore.config import Config
+
+from agents import metrics
+from agents.bedrock_pool import error_code
+from agents.clients import get_client
+
+DEFAULT_DB_PATH = os.path.join('/tmp', 'enforce_ai_remediation.db')
+
+# Mutating APIs have far lower rate limits than the describe calls; stay under them
+DEFAULT_RATE_LIMITS = {'ec2': 10.0, 'rds': 5.0, 's3': 25.0}
+REMEDIATION_CLIENT_CONFIG = Config(retries={'mode': 'adaptive', 'max_attempts': 8}, max_pool_connections=32)
+
+
+def _s3_default_encryption(client, target: str, params: Dict):
+    client.put_bucket_encryption(Bucket=target, ServerSideEncryptionConfiguration={'Rules': [
+        {'ApplyServerSideEncryptionByDefault': {'SSEAlgorithm': params['algorithm']}}]})
+
+
+def _rds_backup_retention(client, target: str, params: Dict):
+    client.modify_db_instance(DBInstanceIdentifier=target, BackupRetentionPeriod=params['retention_days'],
+                              ApplyImmediately=True)
+
+
+# (action_type, resource_type) -> automated action. A 'region' scoped action
+# covers every violating resource of the region with one call.
+REMEDIATIONS = {
+    ('encryption', 'S3'): {
+        'action': 's3_default_encryption',
+        'description': 'Enable default bucket encryption (SSE-S3)',
+        'service': 's3',
+        'scope': 'resource',
+        'params': {'algorithm': 'AES256'},
+        'apply': _s3_default_encryption,
+    },
+    ('backup', 'RDS'): {
+        'action': 'rds_backup_retention',
+        'description': 'Set automated backup retention to 7 days',
+        'service': 'rds',
+        'scope': 'resource',
+        'params': {'retention_days': 7},
+        'apply': _rds_backup_retention,
+    },
+}
+
+ACTIONS = {spec['action']: spec for spec in REMEDIATIONS.values()}
+
+# Why the remaining automatable-looking action types still need a person
+MANUAL_REASONS = {
+    ('encryption', 'EC2'): 'Attached EBS volumes must be replaced with copies of encrypted snapshots; '
+                           'encryption by default only covers new volumes',
+    ('encryption', 'RDS'): 'RDS storage encryption requires restoring from an encrypted snapshot copy',
+    ('mfa', 'IAM'): 'MFA devices must be registered by the user',
+}
+
+# Scan result statuses that can carry violations
+REMEDIABLE_STATUSES = ('NON_COMPLIANT', 'PARTIAL')
+
+
+def iter_violations(items: Iterable[Dict]) -> Iterator[Dict]:
+    """Flatten violations and scan results into violations carrying their resource's identity
+
+    Scan results whose status is not NON_COMPLIANT or PARTIAL (compliant,
+    not applicable or errored pairs) have nothing to remediate and are skipped.
+    """
+    for item in items:
+        if 'status' in item and item['status'] not in REMEDIABLE_STATUSES:
+            continue
+        resource = item.get('resource')
+        identity = dict(resource) if isinstance(resource, dict) else {}
+        if 'rule_violations' in item:
+            for violation in item['rule_violations']:
+                yield dict(identity, **violation, framework=item.get('framework'))
+        else:
+            violation = {key: value for key, value in item.items() if key != 'resource'}
+            if isinstance(resource, str):
+                violation.setdefault('resource_id', resource)
+            yield dict(identity, **violation)
+
+
+def idempotency_key(action: str, region: Optional[str], target: str, params: Dict) -> str:
+    material = json.dumps([action, region, target, params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()[:32]
+
+
+class RateLimiter:
+    """Thread-safe token bucket: ``rate`` calls per second with bursts of up to ``burst``"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RemediationLedger:
+    """SQLite record of applied idempotency keys; entries expire after ``ttl`` seconds
+
+    Expiry lets a resource that drifts back out of compliance be remediated
+    again by a later batch.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None):
+        self.path = path or os.environ.get('REMEDIATION_DB_PATH', DEFAULT_DB_PATH)
+        self.ttl = ttl if ttl is not None else float(os.environ.get('REMEDIATION_IDEMPOTENCY_TTL', 86400))
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS applied (
+                    idempotency_key TEXT PRIMARY KEY,
+                    action TEXT NOT NULL,
+                    region TEXT,
+                    target TEXT NOT NULL,
+                    applied_at REAL NOT NULL
+                )
+            ''')
+
+    def applied(self, keys: List[str]) -> set:
+        """The keys among ``keys`` applied within the TTL"""
+        found = set()
+        since = time.time() - self.ttl
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                found.update(key for (key,) in self._conn.execute(
+                    f'SELECT idempotency_key FROM applied WHERE applied_at >= ? '
+                    f'AND idempotency_key IN ({",".join("?" * len(chunk))})', [since] + chunk))
+        return found
+
+    def record(self, key: str, action: str, region: Optional[str], target: str):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO applied VALUES (?, ?, ?, ?, ?)',
+                               (key, action, region, target, time.time()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RemediationEngine:
+    """Plans and executes remediation actions for batches of violations
+
+    ``rate_limits`` (calls per second by service) default from
+    REMEDIATION_RATE_LIMITS, a JSON object overlaid on DEFAULT_RATE_LIMITS.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, rate_limits: Optional[Dict[str, float]] = None,
+                 ledger: Optional[RemediationLedger] = None):
+        self.max_workers = max_workers or int(os.environ.get('REMEDIATION_CONCURRENCY', 16))
+        if rate_limits is None:
+            rate_limits = json.loads(os.environ.get('REMEDIATION_RATE_LIMITS') or '{}')
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS, **rate_limits)
+        self._limiters = {service: RateLimiter(rate) for service, rate in self.rate_limits.items()}
+        self._ledger = ledger
+
+    @property
+    def ledger(self) -> RemediationLedger:
+        if self._ledger is None:
+            self._ledger = RemediationLedger()
+        return self._ledger
+
+    def plan(self, violations: Iterable[Dict]) -> Dict:
+        """De-duplicated actions grouped by service and region, plus the violations needing a person"""
+        actions, manual = {}, []
+        count = 0
+        for violation in iter_violations(violations):
+            count += 1
+            action_type = violation.get('action_type', 'manual')
+            resource_type = violation.get('resource_type')
+            spec = REMEDIATIONS.get((action_type, resource_type))
+            if spec is None:
+                manual.append({
+                    'resource_id': violation.get('resource_id'),
+                    'resource_type': resource_type,
+                    'region': violation.get('region'),
+                    'rule_id': violation.get('rule_id'),
+                    'action_type': action_type,
+                    'reason': MANUAL_REASONS.get((action_type, resource_type), 'No automated remediation'),
+                })
+                continue
+            region = violation.get('region')
+            target = region if spec['scope'] == 'region' else violation.get('resource_id')
+            key = idempotency_key(spec['action'], region, target, spec['params'])
+            action = actions.get(key)
+            if action is None:
+                action = actions[key] = {
+                    'idempotency_key': key,
+                    'action': spec['action'],
+                    'description': spec['description'],
+                    'service': spec['service'],
+                    'region': region,
+                    'target': target,
+                    'params': spec['params'],
+                    'resources': {},
+                    'rules': {},
+                }
+            action['resources'][violation.get('resource_id')] = None
+            if violation.get('rule_id'):
+                action['rules'][violation['rule_id']] = None
+
+        groups = {}
+        for action in actions.values():
+            action['resources'], action['rules'] = list(action['resources']), list(action['rules'])
+            groups.setdefault(f"{action['service']}:{action['region']}", []).append(action)
+        # The slowest service, at its rate limit, bounds the wall time
+        per_service = {}
+        for action in actions.values():
+            per_service[action['service']] = per_service.get(action['service'], 0) + 1
+        estimated = max((n / self.rate_limits.get(service, self.max_workers) for service, n in per_service.items()),
+                        default=0.0)
+        return {
+            'violations': count,
+            'actions': len(actions),
+            'duplicates': count - len(manual) - len(actions),
+            'groups': groups,
+            'manual': manual,
+            'estimated_seconds': round(estimated, 1),
+        }
+
+    def _apply(self, action: Dict) -> Dict:
+        spec = ACTIONS[action['action']]
+        self._limiters.setdefault(action['service'], RateLimiter(self.max_workers)).acquire()
+        outcome = {key: action[key] for key in ('idempotency_key', 'action', 'service', 'region', 'target')}
+        outcome['resources'] = len(action['resources'])
+        try:
+            with metrics.span('remediation.action', action=action['action'], service=action['service']):
+                client = get_client(action['service'], action['region'], REMEDIATION_CLIENT_CONFIG)
+                spec['apply'](client, action['target'], action['params'])
+        except Exception as e:
+            outcome.update(status='FAILED', error=str(e), error_code=error_code(e))
+        else:
+            self.ledger.record(action['idempotency_key'], action['action'], action['region'], action['target'])
+            outcome['status'] = 'REMEDIATED'
+        metrics.count('remediation_actions', action=action['action'], status=outcome['status'])
+        return outcome
+
+    def run(self, violations: Iterable[Dict], dry_run: bool = False) -> Dict:
+        """Plan the batch and, unless ``dry_run``, execute the actions not already applied"""
+        start = time.perf_counter()
+        plan = self.plan(violations)
+        actions = [action for group in plan['groups'].values() for action in group]
+        already = self.ledger.applied([action['idempotency_key'] for action in actions]) if actions else set()
+        for action in actions:
+            action['status'] = 'ALREADY_APPLIED' if action['idempotency_key'] in already else 'PLANNED'
+        plan['already_applied'] = len(already)
+        plan['dry_run'] = dry_run
+        if dry_run:
+            return plan
+
+        by_service = {}
+        for action in actions:
+            if action['status'] == 'PLANNED':
+                by_service.setdefault(action['service'], []).append(action)
+        # Interleave the services so the workers draw on every rate limit from the start
+        pending = [action for action in chain.from_iterable(zip_longest(*by_service.values())) if action]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pending)))) as pool:
+            results = list(pool.map(self._apply, pending))
+        for action, result in zip(pending, results):
+            action['status'] = result['status']
+            if result['status'] == 'FAILED':
+                action['error'] = result['error']
+                action['error_code'] = result['error_code']
+
+        statuses = [action['status'] for action in actions]
+        plan['remediated'] = statuses.count('REMEDIATED')
+        plan['failed'] = statuses.count('FAILED')
+        plan['seconds'] = round(time.perf_counter() - start, 2)
+        return plan
@@ -0,0 +1,273 @@
+"""Compact, column-oriented store of scanned resources
+
+A ResourceTable keeps one array per attribute instead of one dict per
+resource. Low-cardinality fields (type, region, state, engine...) are
+interned into small integer codes, boolean flags take one byte each and
+everything else is kept in a plain list. Rows are materialised as the same
+dicts the agents have always produced, so code that iterates resources is
+unaffected, while bulk consumers convert the table to a DataFrame (cached
+until the table changes) or an Arrow table without going through dicts.
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+CATEGORY_COLUMNS = ('resource_type', 'region', 'state', 'engine', 'versioning', 'encryption_algorithm', 'last_scan')
+FLAG_COLUMNS = ('encrypted', 'multi_az', 'public_access_blocked', 'logging_enabled')
+
+_MISSING = object()
+
+
+class _ObjectColumn:
+    """Any values, one list slot per row"""
+
+    def __init__(self, length: int = 0):
+        self.values = [_MISSING] * length
+
+    def append(self, value) -> bool:
+        self.values.append(value)
+        return True
+
+    def get(self, index: int):
+        return self.values[index]
+
+    def take(self, indices: Sequence[int]) -> '_ObjectColumn':
+        column = _ObjectColumn()
+        column.values = [self.values[i] for i in indices]
+        return column
+
+    def to_list(self, missing=None) -> List:
+        return [missing if value is _MISSING else value for value in self.values]
+
+
+class _CategoryColumn:
+    """Interned values stored as codes into a shared category list; code 0 means missing"""
+
+    def __init__(self, length: int = 0):
+        self.categories = [_MISSING]
+        self.positions = {}
+        self.codes = array('I', bytes(4 * length))
+
+    def append(self, value) -> bool:
+        try:
+            code = self.positions.get(value)
+        except TypeError:
+            return False
+        if code is None:
+            if value is _MISSING:
+                code = 0
+            else:
+                code = self.positions[value] = len(self.categories)
+                self.categories.append(value)
+        self.codes.append(code)
+        return True
+
+    def get(self, index: int):
+        return self.categories[self.codes[index]]
+
+    def take(self, indices: Sequence[int]) -> '_CategoryColumn':
+        column = _CategoryColumn()
+        column.categories = self.categories
+        column.positions = self.positions
+        column.codes = array('I', (self.codes[i] for i in indices))
+        return column
+
+    def to_list(self, missing=None) -> List:
+        categories = [missing] + self.categories[1:]
+        return [categories[code] for code in self.codes]
+
+
+class _FlagColumn:
+    """Booleans (or None) in one signed byte per row: 1, 0, -1 for None, -2 for missing"""
+
+    _DECODE = {1: True, 0: False, -1: None, -2: _MISSING}
+
+    def __init__(self, length: int = 0):
+        self.flags = array('b', [-2]) * length
+
+    def append(self, value) -> bool:
+        if value is _MISSING:
+            self.flags.append(-2)
+        elif value is None:
+            self.flags.append(-1)
+        elif isinstance(value, bool):
+            self.flags.append(int(value))
+        else:
+            return False
+        return True
+
+    def get(self, index: int):
+        return self._DECODE[self.flags[index]]
+
+    def take(self, indices: Sequence[int]) -> '_FlagColumn':
+        column = _FlagColumn()
+        column.flags = array('b', (self.flags[i] for i in indices))
+        return column
+
+    def to_list(self, missing=None) -> List:
+        decode = {1: True, 0: False, -1: None, -2: missing}
+        return [decode[flag] for flag in self.flags]
+
+
+def _new_column(name: str, length: int):
+    if name in CATEGORY_COLUMNS:
+        return _CategoryColumn(length)
+    if name in FLAG_COLUMNS:
+        return _FlagColumn(length)
+    return _ObjectColumn(length)
+
+
+def _promote(column, length: int) -> _ObjectColumn:
+    """Fall back to a plain column when a value does not fit the compact encoding"""
+    promoted = _ObjectColumn()
+    promoted.values = [column.get(i) for i in range(length)]
+    return promoted
+
+
+class ResourceTable:
+    """Column-oriented sequence of resources
+
+    Indexing and iteration yield resource dicts; slicing, ``filter`` and
+    ``without_errors`` yield new tables sharing the interned categories.
+    """
+
+    def __init__(self, records: Optional[Iterable[Dict]] = None):
+        self._columns = {}
+        self._length = 0
+        self._frame = None
+        if records is not None:
+            self.extend(records)
+
+    def append(self, record: Dict):
+        for name in record:
+            if name not in self._columns:
+                self._columns[name] = _new_column(name, self._length)
+        for name, column in self._columns.items():
+            value = record.get(name, _MISSING)
+            if not column.append(value):
+                column = self._columns[name] = _promote(column, self._length)
+                column.append(value)
+        self._length += 1
+        self._frame = None
+
+    def extend(self, records: Iterable[Dict]):
+        for record in records:
+            self.append(record)
+
+    @classmethod
+    def concat(cls, tables: Iterable[Union['ResourceTable', Sequence[Dict]]]) -> 'ResourceTable':
+        combined = cls()
+        for table in tables:
+            combined.extend(table)
+        return combined
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _row(self, index: int) -> Dict:
+        row = {}
+        for name, column in self._columns.items():
+            value = column.get(index)
+            if value is not _MISSING:
+                row[name] = value
+        return row
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(self._length)))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('ResourceTable index out of range')
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(self._length):
+            yield self._row(index)
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __repr__(self) -> str:
+        return f'ResourceTable({self._length} resources, columns={list(self._columns)})'
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def column(self, name: str) -> List:
+        """Values of one attribute, None where a resource does not have it"""
+        if name not in self._columns:
+            return [None] * self._length
+        return self._columns[name].to_list()
+
+    def take(self, indices: Sequence[int]) -> 'ResourceTable':
+        table = ResourceTable()
+        indices = list(indices)
+        for name, column in self._columns.items():
+            table._columns[name] = column.take(indices)
+        table._length = len(indices)
+        # Drop columns no selected row has
+        for name in list(table._columns):
+            if all(table._columns[name].get(i) is _MISSING for i in range(table._length)):
+                del table._columns[name]
+        return table
+
+    def filter(self, predicate) -> 'ResourceTable':
+        return self.take([i for i, row in enumerate(self) if predicate(row)])
+
+    def without_errors(self) -> 'ResourceTable':
+        """Resources whose scan succeeded"""
+        if 'error' not in self._columns:
+            return self
+        errors = self._columns['error']
+        return self.take([i for i in range(self._length) if errors.get(i) is _MISSING])
+
+    def to_records(self) -> List[Dict]:
+        return list(self)
+
+    def to_dataframe(self):
+        """pandas DataFrame with categorical dtypes for interned columns, cached until the table changes
+
+        Absent attributes are NA; an attribute set to None (an unknown flag)
+        stays None outside categorical columns, so it survives ``from_dataframe``.
+        """
+        if self._frame is None:
+            import pandas as pd
+            data = {}
+            for name, column in self._columns.items():
+                values = column.to_list(missing=pd.NA)
+                if isinstance(column, _CategoryColumn):
+                    data[name] = pd.Categorical(values)
+                else:
+                    data[name] = pd.Series(values, dtype=object)
+            self._frame = pd.DataFrame(data, index=pd.RangeIndex(self._length))
+        return self._frame
+
+    @classmethod
+    def from_dataframe(cls, frame) -> 'ResourceTable':
+        """Table from a DataFrame with one row per resource; NaN and NA cells become absent attributes"""
+        import pandas as pd
+
+        def absent(value):
+            return value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value)
+
+        columns = list(frame.columns)
+        rows = frame.astype(object).itertuples(index=False, name=None)
+        return cls({name: value for name, value in zip(columns, row) if not absent(value)} for row in rows)
+
+    def to_arrow(self):
+        """pyarrow Table with dictionary-encoded interned columns (requires pyarrow)"""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError('pyarrow is required for ResourceTable.to_arrow()') from e
+        arrays = {}
+        for name, column in self._columns.items():
+            values = column.to_list()
+            arrays[name] = pa.array(values).dictionary_encode() if isinstance(column, _CategoryColumn) else pa.array(values)
+        return pa.table(arrays)
+
+    @classmethod
+    def from_arrow(cls, table) -> 'ResourceTable':
+        """Table from a pyarrow Table; null cells become absent attributes"""
+        return cls({name: value for name, value in row.items() if value is not None} for row in table.to_pylist())
@@ -0,0 +1,157 @@
+"""Bedrock response cache shared by the Compliance and Policy agents"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def canonical_prompt(prompt: str) -> str:
+    """Collapse whitespace so prompts differing only in indentation share an entry"""
+    return ' '.join(prompt.split())
+
+
+def cache_key(model_id: str, prompt: str, params: Dict) -> str:
+    """Key on model id, canonicalised prompt and inference parameters"""
+    material = json.dumps({
+        'model_id': model_id,
+        'prompt': canonical_prompt(prompt),
+        'params': params,
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier TTL cache of parsed Bedrock responses
+
+    The memory tier is an LRU bounded by ``max_entries`` and ``max_bytes``.
+    The optional disk tier is a SQLite file bounded by ``max_disk_entries``;
+    memory misses fall through to it and promote hits back into memory.
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 path: Optional[str] = None, max_disk_entries: int = 100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self.path = path
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            with self._disk:
+                self._disk.execute('''
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                ''')
+                self._disk.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return json.loads(value)
+                self._drop(key)
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    'SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?', (key, now)
+                ).fetchone()
+                if row is not None:
+                    with self._disk:
+                        self._disk.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+                    self._store(key, row[0], row[1])
+                    self.stats['disk_hits'] += 1
+                    return json.loads(row[0])
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, response: Dict):
+        value = json.dumps(response, separators=(',', ':'))
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._disk is not None:
+                with self._disk:
+                    self._disk.execute(
+                        'INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                        (key, value, expires_at, now),
+                    )
+                    self._disk.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+                    self._disk.execute(
+                        'DELETE FROM responses WHERE key IN ('
+                        'SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                        (self.max_disk_entries,),
+                    )
+
+    def _store(self, key: str, value: str, expires_at: float):
+        if key in self._memory:
+            self._drop(key)
+        size = len(value)
+        self._memory[key] = (expires_at, size, value)
+        self._memory_bytes += size
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            oldest = next(iter(self._memory))
+            self._drop(oldest)
+            self.stats['evictions'] += 1
+
+    def _drop(self, key: str):
+        _, size, _ = self._memory.pop(key)
+        self._memory_bytes -= size
+
+    @property
+    def hit_ratio(self) -> float:
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self._memory), bytes=self._memory_bytes,
+                        hit_ratio=round(self.hit_ratio, 4))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._disk is not None:
+                with self._disk:
+                    self._disk.execute('DELETE FROM responses')
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[ResponseCache]:
+    """Process-wide cache configured from the environment, or None when disabled"""
+    global _shared_cache
+    if os.environ.get('ENABLE_RESPONSE_CACHE', 'true').lower() in ('false', '0', 'no'):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                ttl=float(os.environ.get('CACHE_TTL', 3600)),
+                max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024)),
+                path=os.environ.get('RESPONSE_CACHE_PATH') or None,
+            )
+        return _shared_cache
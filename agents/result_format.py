@@ -0,0 +1,96 @@
+"""Scan result encodings for Lambda responses
+
+``records`` is the original layout: one dict per (resource, framework) pair
+with the resource embedded. ``normalised`` writes each resource once and
+groups verdicts by framework, referencing resources by index and rule
+violations by rule id. ``columnar``
+is the normalised layout with every table stored as a dict of columns, so
+key strings appear once per table instead of once per row.
+"""
+from typing import Dict, List, Sequence
+
+from agents.fingerprint_store import resource_key
+
+RESULT_FORMATS = ('records', 'normalised', 'columnar')
+
+
+def _columns(rows: Sequence[Dict]) -> Dict[str, List]:
+    names = {}
+    for row in rows:
+        for name in row:
+            names.setdefault(name, None)
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+def _rows(columns: Dict[str, List]) -> List[Dict]:
+    names = list(columns)
+    length = len(columns[names[0]]) if names else 0
+    return [{name: columns[name][i] for name in names if columns[name][i] is not None} for i in range(length)]
+
+
+def normalise(compliance_results: Sequence[Dict]) -> Dict:
+    """Resource table, rule table and per-framework verdicts that reference them"""
+    resources = []
+    positions = {}
+    rules = {}
+    verdicts = {}
+    for result in compliance_results:
+        resource = result.get('resource', {})
+        # Results that went through JSON (e.g. merged shards) no longer share one dict
+        identity = resource_key(resource) if resource.get('resource_id') else id(resource)
+        index = positions.get(identity)
+        if index is None:
+            index = positions[identity] = len(resources)
+            resources.append(resource)
+        verdict = {'resource_index': index}
+        verdict.update((key, value) for key, value in result.items() if key not in ('resource', 'framework'))
+        if 'rule_violations' in verdict:
+            for violation in verdict['rule_violations']:
+                rules.setdefault(violation['rule_id'], violation)
+            verdict['rule_violations'] = [violation['rule_id'] for violation in verdict['rule_violations']]
+        verdicts.setdefault(result.get('framework'), []).append(verdict)
+    return {'resources': resources, 'rules': rules, 'verdicts': verdicts}
+
+
+def to_columnar(normalised: Dict) -> Dict:
+    """Store the resource table and each framework's verdicts as columns"""
+    return {
+        'resources': _columns(normalised['resources']),
+        'rules': normalised['rules'],
+        'verdicts': {framework: _columns(rows) for framework, rows in normalised['verdicts'].items()}
+    }
+
+
+def expand(payload: Dict, result_format: str) -> List[Dict]:
+    """Rebuild records-format results from a normalised or columnar payload
+
+    Columnar cells holding None are treated as absent keys.
+    """
+    if result_format == 'columnar':
+        payload = {
+            'resources': _rows(payload['resources']),
+            'rules': payload['rules'],
+            'verdicts': {framework: _rows(columns) for framework, columns in payload['verdicts'].items()}
+        }
+    results = []
+    for framework, rows in payload['verdicts'].items():
+        for row in rows:
+            result = {key: value for key, value in row.items() if key != 'resource_index'}
+            if 'rule_violations' in result:
+                result['rule_violations'] = [payload['rules'][rule_id] for rule_id in result['rule_violations']]
+            result['resource'] = payload['resources'][row['resource_index']]
+            result['framework'] = framework
+            results.append(result)
+    return results
+
+
+def format_results(compliance_results: Sequence[Dict], result_format: str = 'records') -> Dict:
+    """Response body fields carrying the results in the requested format"""
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"Unknown result format '{result_format}', expected one of {', '.join(RESULT_FORMATS)}")
+    if result_format == 'records':
+        return {'compliance_results': list(compliance_results)}
+    payload = normalise(compliance_results)
+    if result_format == 'columnar':
+        payload = to_columnar(payload)
+    return dict(payload, result_format=result_format)
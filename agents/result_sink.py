@@ -0,0 +1,172 @@
+"""Result sinks that stream scan results to object storage as gzip-compressed NDJSON
+
+Records are compressed as they are written and flushed in bounded parts (S3
+multipart upload parts, or a local file standing in for S3), so memory use
+does not grow with the number of results. Closing a sink yields a pointer
+that the Lambda response carries instead of the results themselves.
+"""
+import gzip
+import io
+import json
+import os
+from collections import defaultdict
+from typing import Dict
+
+from agents.clients import get_client
+
+# S3 requires every part but the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class _MultipartWriter(io.RawIOBase):
+    """Binary file object that uploads its contents as S3 multipart parts"""
+
+    def __init__(self, s3, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+        if len(self._buffer) >= self.part_size:
+            self._upload_part()
+        return len(data)
+
+    def _upload_part(self):
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType='application/x-ndjson', ContentEncoding='gzip'
+            )['UploadId']
+        number = len(self._parts) + 1
+        response = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                       PartNumber=number, Body=bytes(self._buffer))
+        self._parts.append({'PartNumber': number, 'ETag': response['ETag']})
+        self._buffer.clear()
+
+    def finish(self):
+        """Upload what is buffered and complete the object"""
+        if self._upload_id is None:
+            # Small results fit in a single request
+            self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer),
+                               ContentType='application/x-ndjson', ContentEncoding='gzip')
+        else:
+            if self._buffer:
+                self._upload_part()
+            self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                              MultipartUpload={'Parts': self._parts})
+        self._buffer.clear()
+
+    def abort(self):
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+        self._buffer.clear()
+
+
+class _FileWriter(io.FileIO):
+    """Local file standing in for an S3 object"""
+
+    @property
+    def bytes_written(self) -> int:
+        return self.tell()
+
+    def finish(self):
+        self.flush()
+
+    def abort(self):
+        self.close()
+        os.remove(self.name)
+
+
+class ResultSink:
+    """Writes records as gzip-compressed NDJSON and keeps per-framework status counts
+
+    Use as a context manager: a clean exit completes the object and sets
+    ``pointer``; an exception aborts the upload (or removes the local file).
+    """
+
+    def __init__(self, writer, uri: str, compresslevel: int = 6):
+        self.uri = uri
+        self.records = 0
+        self.summary = defaultdict(lambda: defaultdict(int))
+        self.pointer = None
+        self._writer = writer
+        self._gzip = gzip.GzipFile(fileobj=writer, mode='wb', compresslevel=compresslevel)
+
+    def write(self, record: Dict):
+        self._gzip.write(json.dumps(record, separators=(',', ':'), default=str).encode('utf-8'))
+        self._gzip.write(b'\n')
+        self.records += 1
+        self.summary[record.get('framework', 'unknown')][record.get('status', 'UNKNOWN')] += 1
+
+    def close(self) -> Dict:
+        """Complete the object and return a pointer to it"""
+        if self.pointer is None:
+            self._gzip.close()
+            self._writer.finish()
+            self.pointer = {
+                'uri': self.uri,
+                'format': 'ndjson+gzip',
+                'records': self.records,
+                'bytes': self._writer.bytes_written
+            }
+            self._writer.close()
+        return self.pointer
+
+    def abort(self):
+        self._gzip.close()
+        self._writer.abort()
+
+    def counts(self) -> Dict:
+        """Status counts per framework as plain dicts"""
+        return {framework: dict(statuses) for framework, statuses in self.summary.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def open_result_sink(location: str, name: str, s3=None, part_size: int = DEFAULT_PART_SIZE) -> ResultSink:
+    """Sink for ``<location>/<name>.ndjson.gz``
+
+    ``location`` is ``s3://bucket/prefix`` or a local directory.
+    """
+    filename = f'{name}.ndjson.gz'
+    if location.startswith('s3://'):
+        bucket, _, prefix = location[len('s3://'):].partition('/')
+        key = f"{prefix.strip('/')}/{filename}" if prefix.strip('/') else filename
+        writer = _MultipartWriter(s3 or get_client('s3'), bucket, key, part_size)
+        return ResultSink(writer, f's3://{bucket}/{key}')
+
+    os.makedirs(location, exist_ok=True)
+    path = os.path.join(location, filename)
+    return ResultSink(_FileWriter(path, 'wb'), path)
+
+
+def read_results(uri: str, s3=None):
+    """Iterate the records of a result object written by a ResultSink"""
+    if uri.startswith('s3://'):
+        bucket, _, key = uri[len('s3://'):].partition('/')
+        body = (s3 or get_client('s3')).get_object(Bucket=bucket, Key=key)['Body']
+        stream = gzip.GzipFile(fileobj=body, mode='rb')
+    else:
+        stream = gzip.open(uri, 'rb')
+    with stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,137 @@
+"""Per-bucket S3 configuration probes used by the Audit Agent"""
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+ACCESS_DENIED = 'ACCESS_DENIED'
+NOT_CONFIGURED = 'NOT_CONFIGURED'
+THROTTLED = 'THROTTLED'
+ERROR = 'ERROR'
+
+ACCESS_DENIED_CODES = {'AccessDenied', 'AccessDeniedException', 'AllAccessDisabled', 'UnauthorizedOperation'}
+THROTTLED_CODES = {'Throttling', 'ThrottlingException', 'SlowDown', 'RequestLimitExceeded',
+                   'TooManyRequestsException', 'RequestThrottled'}
+NOT_CONFIGURED_CODES = {'ServerSideEncryptionConfigurationNotFoundError',
+                        'NoSuchPublicAccessBlockConfiguration', 'NoSuchConfiguration',
+                        'NoSuchBucketPolicy', 'NoSuchLifecycleConfiguration', 'ReplicationConfigurationNotFoundError'}
+
+
+def classify_error(error: Exception) -> str:
+    """Map a probe exception to ACCESS_DENIED, NOT_CONFIGURED, THROTTLED or ERROR"""
+    if not isinstance(error, ClientError):
+        return ERROR
+    code = error.response.get('Error', {}).get('Code', '')
+    if code in ACCESS_DENIED_CODES:
+        return ACCESS_DENIED
+    if code in THROTTLED_CODES:
+        return THROTTLED
+    if code in NOT_CONFIGURED_CODES:
+        return NOT_CONFIGURED
+    return ERROR
+
+
+def probe_encryption(s3, bucket: str) -> Dict:
+    try:
+        response = s3.get_bucket_encryption(Bucket=bucket)
+    except ClientError as e:
+        if classify_error(e) == NOT_CONFIGURED:
+            return {'encrypted': False}
+        raise
+    rules = response['ServerSideEncryptionConfiguration'].get('Rules', [])
+    algorithm = rules[0].get('ApplyServerSideEncryptionByDefault', {}).get('SSEAlgorithm') if rules else None
+    return {'encrypted': True, 'encryption_algorithm': algorithm}
+
+
+def probe_public_access_block(s3, bucket: str) -> Dict:
+    try:
+        response = s3.get_public_access_block(Bucket=bucket)
+    except ClientError as e:
+        if classify_error(e) == NOT_CONFIGURED:
+            return {'public_access_blocked': False}
+        raise
+    settings = response['PublicAccessBlockConfiguration']
+    return {'public_access_blocked': all(settings.get(key, False) for key in (
+        'BlockPublicAcls', 'IgnorePublicAcls', 'BlockPublicPolicy', 'RestrictPublicBuckets'))}
+
+
+def probe_versioning(s3, bucket: str) -> Dict:
+    response = s3.get_bucket_versioning(Bucket=bucket)
+    return {'versioning': response.get('Status', 'Disabled')}
+
+
+def probe_logging(s3, bucket: str) -> Dict:
+    response = s3.get_bucket_logging(Bucket=bucket)
+    return {'logging_enabled': 'LoggingEnabled' in response}
+
+
+# Probe name -> (probe function, attributes reported as None when the probe fails
+# for any reason other than the configuration being absent).
+S3_PROBES: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {
+    'encryption': (probe_encryption, ('encrypted',)),
+    'public_access_block': (probe_public_access_block, ('public_access_blocked',)),
+    'versioning': (probe_versioning, ('versioning',)),
+    'logging': (probe_logging, ('logging_enabled',)),
+}
+
+
+def run_probe(name: str, s3, bucket: str) -> Tuple[Dict, Optional[str]]:
+    """Run one registered probe, returning its attributes and an error class if it failed"""
+    probe, attributes = S3_PROBES[name]
+    try:
+        return probe(s3, bucket), None
+    except Exception as e:
+        return {attribute: None for attribute in attributes}, classify_error(e)
+
+
+def bucket_region(s3, bucket: Dict) -> str:
+    """Resolve a bucket's home region, preferring the value returned by ListBuckets"""
+    region = bucket.get('BucketRegion')
+    if region:
+        return region
+    location = s3.get_bucket_location(Bucket=bucket['Name']).get('LocationConstraint')
+    if location == 'EU':
+        return 'eu-west-1'
+    return location or 'us-east-1'
+
+
+class BucketProbeCache:
+    """Thread-safe TTL cache of probe results, keyed by bucket name
+
+    An entry is only reused while it is younger than ``ttl`` seconds and the
+    bucket's identity (creation date and region) is unchanged, so recreated
+    buckets are always probed again.
+    """
+
+    def __init__(self, ttl: float = 3600):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, bucket: str, identity: Tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(bucket)
+            if entry is None:
+                return None
+            cached_identity, expires_at, attributes = entry
+            if cached_identity != identity or expires_at < time.monotonic():
+                del self._entries[bucket]
+                return None
+            return dict(attributes)
+
+    def put(self, bucket: str, identity: Tuple, attributes: Dict):
+        with self._lock:
+            self._entries[bucket] = (identity, time.monotonic() + self.ttl, dict(attributes))
+
+    def invalidate(self, bucket: str):
+        with self._lock:
+            self._entries.pop(bucket, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
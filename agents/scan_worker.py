@@ -0,0 +1,98 @@
+"""Background execution of resource scans for interactive front ends
+
+A ScanWorker runs scans on its own threads and keeps the jobs it started,
+so a page can start a multi-minute scan, return immediately and poll the
+job's progress on later reruns.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+PENDING = 'PENDING'
+RUNNING = 'RUNNING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+
+
+class ScanJob:
+    """State of one background scan; read it through ``snapshot``"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.status = PENDING
+        self.completed = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def _update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def on_progress(self, completed: int, total: int):
+        self._update(completed=completed, total=total)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = round((self.finished_at or time.time()) - self.started_at, 1)
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'progress': self.completed / self.total if self.total else 0.0,
+                'completed': self.completed,
+                'total': self.total,
+                'elapsed_seconds': elapsed,
+                'error': self.error
+            }
+
+
+class ScanWorker:
+    """Runs scans on a small thread pool and remembers the most recent jobs"""
+
+    def __init__(self, max_workers: int = 1, max_jobs: int = 20):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scan')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def submit(self, scan: Callable[[Callable[[int, int], None]], object]) -> ScanJob:
+        """Start ``scan(progress)`` in the background; ``progress(completed, total)`` feeds the job"""
+        job = ScanJob(uuid.uuid4().hex)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs))
+                if not self._jobs[oldest].finished:
+                    break
+                del self._jobs[oldest]
+        self._executor.submit(self._run, job, scan)
+        return job
+
+    def _run(self, job: ScanJob, scan: Callable):
+        job._update(status=RUNNING, started_at=time.time())
+        try:
+            result = scan(job.on_progress)
+        except Exception as e:
+            job._update(status=FAILED, error=str(e), finished_at=time.time())
+        else:
+            job._update(status=DONE, result=result, finished_at=time.time())
+
+    def job(self, job_id: Optional[str]) -> Optional[ScanJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def running(self) -> bool:
+        with self._lock:
+            return any(not job.finished for job in self._jobs.values())
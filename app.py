@@ -3,13 +3,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
 import json
 
 # Import agents
 from agents.compliance_agent import ComplianceAgent
 from agents.audit_agent import AuditAgent
 from agents.policy_agent import PolicyAgent
+from agents.history_store import HistoryStore
+from agents.scan_worker import DONE, FAILED, ScanWorker
 from policies.frameworks import COMPLIANCE_FRAMEWORKS, POLICY_VIOLATIONS
 
 # Page config
@@ -19,11 +20,64 @@ st.set_page_config(
     layout="wide"
 )
 
+# Agents and the scan worker are built once per server process and shared by
+# every session, so reruns and button presses reuse their clients and caches
+@st.cache_resource
+def get_audit_agent():
+    return AuditAgent()
+
+@st.cache_resource
+def get_compliance_agent():
+    return ComplianceAgent()
+
+@st.cache_resource
+def get_policy_agent():
+    return PolicyAgent()
+
+@st.cache_resource
+def get_scan_worker():
+    return ScanWorker()
+
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+# Framework and scan data are converted once and reused across reruns until
+# explicitly cleared (sidebar "Reload data", or a new scan)
+@st.cache_data
+def load_frameworks():
+    return COMPLIANCE_FRAMEWORKS
+
+@st.cache_data(max_entries=4)
+def scan_frame(job_id):
+    job = get_scan_worker().job(job_id)
+    if job is None or job.result is None:
+        return pd.DataFrame()
+    return job.result.to_dataframe()
+
+# Trend windows per rollup granularity: (label, granularity, days)
+TREND_WINDOWS = {
+    "Hourly": ("48-Hour", 'hour', 2),
+    "Daily": ("30-Day", 'day', 30),
+    "Weekly": ("26-Week", 'week', 182),
+}
+
+# Dashboard figures are read from the history store's rollups, so each is
+# O(buckets) however many verdicts are stored; refreshed at most once a minute
+@st.cache_data(ttl=60)
+def dashboard_data(granularity='day', days=30):
+    history = get_history_store()
+    return {
+        'scans': history.latest_scans(limit=2),
+        'current': history.current_summary(),
+        'trend': history.score_trend(days=days, granularity=granularity),
+        'frameworks': history.current_scores('framework'),
+        'violations': history.recent_violations(limit=20)
+    }
+
 # Initialize session state
-if 'scan_results' not in st.session_state:
-    st.session_state.scan_results = []
-if 'compliance_score' not in st.session_state:
-    st.session_state.compliance_score = 75
+if 'scan_job_id' not in st.session_state:
+    st.session_state.scan_job_id = None
 
 def main():
     st.title("🛡️ EnforceAI - Multi-Agent Governance Platform")
@@ -39,6 +93,11 @@ def main():
         "Reports"
     ])
     
+    if st.sidebar.button("🔃 Reload data"):
+        load_frameworks.clear()
+        scan_frame.clear()
+        dashboard_data.clear()
+    
     if page == "Dashboard":
         show_dashboard()
     elif page == "Compliance Monitoring":
@@ -53,46 +112,59 @@ def main():
 def show_dashboard():
     st.header("📊 Compliance Dashboard")
     
+    window = st.radio("Trend granularity", list(TREND_WINDOWS), index=1, horizontal=True)
+    label, granularity, days = TREND_WINDOWS[window]
+    data = dashboard_data(granularity, days)
+    if not data['scans']:
+        st.info("No scans recorded yet. Scans record their results when SCAN_HISTORY_DB_PATH is set.")
+    latest = data['scans'][0] if data['scans'] else {}
+    previous = data['scans'][1] if len(data['scans']) > 1 else {}
+    
+    def delta(field):
+        if latest.get(field) is None or previous.get(field) is None:
+            return None
+        return round(latest[field] - previous[field], 1)
+    
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Compliance Score", f"{st.session_state.compliance_score}%", "↑ 5%")
+        score = data['current']['compliance_score']
+        st.metric("Compliance Score", f"{score}%" if score is not None else "—", delta('compliance_score'))
     
     with col2:
-        st.metric("Active Policies", "12", "↑ 2")
+        st.metric("Active Policies", sum(len(details['rules']) for details in load_frameworks().values()))
     
     with col3:
-        st.metric("Resources Monitored", "156", "↑ 8")
+        st.metric("Resources Monitored", latest.get('resources', 0), delta('resources'))
     
     with col4:
-        st.metric("Critical Violations", "3", "↓ 2")
+        st.metric("Critical Violations", data['current']['critical_violations'], delta('critical_violations'),
+                  delta_color="inverse")
     
     # Compliance score chart
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Compliance Score Trend")
-        dates = pd.date_range(start=datetime.now() - timedelta(days=30), end=datetime.now(), freq='D')
-        scores = [70 + (i % 10) + (i // 5) for i in range(len(dates))]
+        trend = pd.DataFrame(data['trend'], columns=['bucket_start', 'compliance_score'])
+        trend['bucket_start'] = pd.to_datetime(trend['bucket_start'], unit='s')
         
-        fig = px.line(x=dates, y=scores, title="30-Day Compliance Trend")
+        fig = px.line(trend, x='bucket_start', y='compliance_score', title=f"{label} Compliance Trend")
         fig.update_layout(xaxis_title="Date", yaxis_title="Compliance Score (%)")
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("Framework Compliance")
-        frameworks = list(COMPLIANCE_FRAMEWORKS.keys())
-        scores = [85, 72, 68, 90]
+        frameworks = data['frameworks']
         
-        fig = px.bar(x=frameworks, y=scores, title="Compliance by Framework")
+        fig = px.bar(x=list(frameworks), y=list(frameworks.values()), title="Compliance by Framework")
         fig.update_layout(xaxis_title="Framework", yaxis_title="Compliance Score (%)")
         st.plotly_chart(fig, use_container_width=True)
     
     # Recent violations
     st.subheader("🚨 Recent Policy Violations")
-    violations_df = pd.DataFrame(POLICY_VIOLATIONS)
-    st.dataframe(violations_df, use_container_width=True)
+    st.dataframe(pd.DataFrame(data['violations']), use_container_width=True)
 
 def show_compliance_monitoring():
     st.header("🔍 Compliance Monitoring")
@@ -103,28 +175,33 @@ def show_compliance_monitoring():
     with col1:
         st.subheader("AWS Resource Scanning")
         
-        if st.button("🔄 Start Compliance Scan", type="primary"):
-            with st.spinner("Scanning AWS resources..."):
-                audit_agent = AuditAgent()
-                compliance_agent = ComplianceAgent()
-                
-                # Get resources
-                resources = audit_agent.get_all_resources()
-                st.session_state.scan_results = resources
-                
-                st.success(f"Scanned {len(resources)} resources")
+        worker = get_scan_worker()
+        job = worker.job(st.session_state.scan_job_id)
+        scanning = job is not None and not job.finished
         
-        # Display scan results
-        if st.session_state.scan_results:
+        if st.button("🔄 Start Compliance Scan", type="primary", disabled=scanning):
+            # The scan runs on the worker's thread; this rerun returns immediately
+            job = worker.submit(get_audit_agent().get_all_resources)
+            st.session_state.scan_job_id = job.job_id
+            scanning = True
+        
+        if scanning:
+            show_scan_progress(job.job_id)
+        elif job is not None and job.status == FAILED:
+            st.error(f"Scan failed: {job.error}")
+        elif job is not None and job.status == DONE:
+            status = job.snapshot()
+            st.success(f"Scanned {len(job.result)} resources in {status['elapsed_seconds']}s")
+            
+            # Display scan results
             st.subheader("Scan Results")
-            results_df = pd.DataFrame(st.session_state.scan_results)
-            st.dataframe(results_df, use_container_width=True)
+            st.dataframe(scan_frame(job.job_id), use_container_width=True)
     
     with col2:
         st.subheader("Framework Selection")
         selected_frameworks = st.multiselect(
             "Select compliance frameworks:",
-            list(COMPLIANCE_FRAMEWORKS.keys()),
+            list(load_frameworks().keys()),
             default=["GDPR", "FISMA"]
         )
         
@@ -134,13 +211,28 @@ def show_compliance_monitoring():
     
     # Framework details
     st.subheader("📋 Compliance Frameworks")
-    for framework, details in COMPLIANCE_FRAMEWORKS.items():
+    for framework, details in load_frameworks().items():
         with st.expander(f"{framework} - {details['name']}"):
             st.write(f"**Risk Level:** {details['risk_level']}")
             st.write("**Rules:**")
             for rule in details['rules']:
                 st.write(f"• {rule}")
 
+@st.fragment(run_every=1.0)
+def show_scan_progress(job_id):
+    """Poll a running scan; only this fragment reruns until the scan finishes"""
+    job = get_scan_worker().job(job_id)
+    if job is None:
+        return
+    if job.finished:
+        # Rerun the whole page once to render the results
+        st.rerun()
+    status = job.snapshot()
+    st.progress(status['progress'], text=(
+        f"Scanning AWS resources... {status['completed']}/{status['total']} scan units "
+        f"({status['elapsed_seconds'] or 0}s)"
+    ))
+
 def show_policy_management():
     st.header("⚙️ Policy Management")
     
@@ -150,7 +242,7 @@ def show_policy_management():
         st.subheader("Create New Policy")
         
         policy_name = st.text_input("Policy Name")
-        policy_framework = st.selectbox("Framework", list(COMPLIANCE_FRAMEWORKS.keys()))
+        policy_framework = st.selectbox("Framework", list(load_frameworks().keys()))
         policy_description = st.text_area("Description")
         policy_rules = st.text_area("Rules (one per line)")
         
@@ -163,7 +255,7 @@ def show_policy_management():
         # Simulate policy enforcement
         if st.button("🚀 Run Policy Enforcement"):
             with st.spinner("Enforcing policies..."):
-                policy_agent = PolicyAgent()
+                policy_agent = get_policy_agent()
                 
                 # Mock resource for demo
                 mock_resource = {
@@ -213,7 +305,7 @@ def show_ai_assistant():
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
                 # Simulate AI response using Bedrock
-                compliance_agent = ComplianceAgent()
+                compliance_agent = get_compliance_agent()
                 
                 if "gdpr" in prompt.lower():
                     response = "GDPR requires encryption of personal data at rest and in transit. I can help you scan your AWS resources for GDPR compliance. Would you like me to run a compliance check?"
@@ -244,40 +336,16 @@ def show_reports():
         
         report_framework = st.multiselect(
             "Frameworks",
-            list(COMPLIANCE_FRAMEWORKS.keys()),
+            list(load_frameworks().keys()),
             default=["GDPR", "FISMA"]
         )
         
         if st.button("📊 Generate Report", type="primary"):
-            with st.spinner("Generating compliance report..."):
-                compliance_agent = ComplianceAgent()
-                
-                # Generate report using Bedrock
-                report = compliance_agent.generate_compliance_report(POLICY_VIOLATIONS)
-                
-                st.subheader("Generated Report")
-                st.markdown("""
-                ## Executive Compliance Summary
-                
-                **Overall Compliance Score:** 75%
-                
-                ### Key Findings:
-                - 4 critical violations identified across GDPR and FISMA frameworks
-                - 12 resources require immediate attention
-                - Auto-remediation available for 8 violations
-                
-                ### Priority Actions:
-                1. Enable encryption on RDS databases (GDPR)
-                2. Configure MFA for EC2 instances (FISMA)
-                3. Implement bias testing for ML models (EU AI Act)
-                4. Update AI documentation (ISO 42001)
-                
-                ### Compliance Scores by Framework:
-                - GDPR: 72% (Needs Improvement)
-                - FISMA: 68% (Critical)
-                - EU AI Act: 85% (Good)
-                - ISO 42001: 90% (Excellent)
-                """)
+            compliance_agent = get_compliance_agent()
+            
+            # Stream the report from Bedrock, rendering chunks as they arrive
+            st.subheader("Generated Report")
+            st.write_stream(compliance_agent.generate_compliance_report_stream(POLICY_VIOLATIONS))
     
     with col2:
         st.subheader("Report History")
@@ -0,0 +1,67 @@
+"""Benchmark batched multi-resource, multi-framework evaluation against per-pair calls
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batching --resources 500 --latency 0.05
+"""
+import argparse
+import json
+import time
+
+from agents.audit_agent import AuditAgent
+from agents.compliance_agent import ComplianceAgent
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from benchmarks.synthetic_account import SyntheticAccount
+from policies.rules import RuleEngine
+
+FRAMEWORKS = ['GDPR', 'FISMA', 'EU_AI_ACT']
+
+
+def make_agent(latency: float, **kwargs) -> ComplianceAgent:
+    # Rules, shape de-duplication and the response cache are disabled so every pair costs a model evaluation
+    agent = ComplianceAgent(rule_engine=RuleEngine(rules=[]), cache=ResponseCache(max_entries=0),
+                            dedupe_shapes=False, **kwargs)
+    agent.bedrock = StubBedrock(latency=latency, responder=verdict_responder)
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05, help='Stubbed Bedrock seconds per call')
+    parser.add_argument('--input-tokens', type=int, default=8000, help='Per-batch input token budget')
+    parser.add_argument('--output-tokens', type=int, default=4000, help='Per-batch output token budget')
+    args = parser.parse_args()
+
+    account = SyntheticAccount(regions=['us-east-1'], ec2_per_region=args.resources, rds_per_region=0, buckets=0)
+    resources = AuditAgent(regions=account.regions, services=['ec2'], session=account.session()).get_all_resources()
+    items = [(resource, FRAMEWORKS) for resource in resources]
+    pairs = len(items) * len(FRAMEWORKS)
+
+    single = make_agent(args.latency)
+    start = time.perf_counter()
+    for resource, frameworks in items:
+        for framework in frameworks:
+            single.analyze_compliance(resource, framework)
+    single_seconds = time.perf_counter() - start
+
+    batched = make_agent(args.latency, batch_input_tokens=args.input_tokens, batch_output_tokens=args.output_tokens)
+    start = time.perf_counter()
+    results = batched.analyze_compliance_batch(items)
+    batch_seconds = time.perf_counter() - start
+    evaluated = sum(len(result) for result in results)
+
+    single_calls = single.bedrock.calls['invoke_model']
+    batch_calls = batched.bedrock.calls['invoke_model']
+    print(json.dumps({
+        'resources': len(items),
+        'pairs': pairs,
+        'per_pair': {'round_trips': single_calls, 'seconds': round(single_seconds, 3)},
+        'batched': {'round_trips': batch_calls, 'seconds': round(batch_seconds, 3), 'verdicts': evaluated},
+        'round_trip_reduction': round(single_calls / max(batch_calls, 1), 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark event-driven targeted rescans against a full scan
+
+Replays a JSON change-event fixture (``fixtures/change_events.json`` by
+default) through lambda_handler against the synthetic account with a stubbed
+Bedrock, after a full scan has populated the fingerprint store. Event times
+are restamped to end at the moment of the replay (their spacing compressed
+600x) so ``max_change_to_verdict_seconds`` measures this pipeline. The
+synthetic resources do not actually change, so rescanned pairs reuse their
+stored verdicts. The fixture is replayed a second time, stamped a minute
+earlier, to show that events covered by the first rescan are dropped.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_change_events --regions 2 --ec2 2000 --rds 500 --buckets 1000 --api-latency 0.02
+"""
+import argparse
+import copy
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import boto3
+
+from agents.audit_agent import AuditAgent
+from agents.compliance_agent import ComplianceAgent
+from agents.fingerprint_store import FingerprintStore
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from benchmarks.synthetic_account import SyntheticAccount
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'change_events.json')
+
+
+def restamp(payload, at: float):
+    """Copy of the fixture with the latest event at ``at`` and the others just before it, in order"""
+    payload = copy.deepcopy(payload)
+    events = payload['events']
+    times = [datetime.fromisoformat(event['time'].replace('Z', '+00:00')).timestamp() for event in events]
+    latest = max(times)
+    for event, event_time in zip(events, times):
+        stamp = datetime.fromtimestamp(at - (latest - event_time) / 600, timezone.utc).isoformat()
+        event['time'] = stamp
+        if 'eventTime' in event['detail']:
+            event['detail']['eventTime'] = stamp
+    return payload
+
+
+def invoke(lambda_function, account, event):
+    calls_before = sum(account.calls.values())
+    start = time.perf_counter()
+    response = lambda_function.lambda_handler(event, None)
+    seconds = time.perf_counter() - start
+    body = json.loads(response['body'])
+    return body, round(seconds, 3), sum(account.calls.values()) - calls_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixture', default=FIXTURE)
+    parser.add_argument('--regions', type=int, default=2)
+    parser.add_argument('--ec2', type=int, default=2000, help='EC2 instances per region')
+    parser.add_argument('--rds', type=int, default=500, help='RDS instances per region')
+    parser.add_argument('--buckets', type=int, default=1000)
+    parser.add_argument('--api-latency', type=float, default=0.02, help='Synthetic AWS API seconds per call')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stubbed Bedrock seconds per call')
+    args = parser.parse_args()
+
+    account = SyntheticAccount(
+        regions=['us-east-1', 'eu-west-1', 'us-west-2', 'ap-southeast-1'][:args.regions],
+        ec2_per_region=args.ec2,
+        rds_per_region=args.rds,
+        buckets=args.buckets,
+        latency=args.api_latency,
+    )
+    boto3.DEFAULT_SESSION = account.session()
+    import lambda_function
+
+    compliance_agent = ComplianceAgent()
+    compliance_agent.bedrock = StubBedrock(latency=args.latency, responder=verdict_responder)
+    lambda_function._instances.update({
+        'audit': AuditAgent(regions=account.regions, s3_concurrency=32),
+        'compliance': compliance_agent,
+        'fingerprints': FingerprintStore(os.path.join(tempfile.mkdtemp(), 'fingerprints.db')),
+    })
+    with open(args.fixture) as f:
+        fixture = json.load(f)
+
+    full, full_seconds, full_calls = invoke(lambda_function, account, {'request_type': 'scan'})
+    rescan, rescan_seconds, rescan_calls = invoke(lambda_function, account, restamp(fixture, time.time()))
+    # Replaying the same (older) events again: every target was rescanned after them
+    replay, replay_seconds, replay_calls = invoke(lambda_function, account, restamp(fixture, time.time() - 60))
+
+    summary_keys = ('events', 'ignored', 'coalesced', 'covered', 'resources_rescanned', 'not_found',
+                    'max_change_to_verdict_seconds', 'cache_hits', 'cache_misses')
+    print(json.dumps({
+        'full_scan': {'resources_scanned': full['resources_scanned'], 'seconds': full_seconds,
+                      'aws_api_calls': full_calls},
+        'targeted_rescan': dict({key: rescan.get(key) for key in summary_keys},
+                                seconds=rescan_seconds, aws_api_calls=rescan_calls),
+        'replayed_rescan': dict({key: replay.get(key) for key in summary_keys},
+                                seconds=replay_seconds, aws_api_calls=replay_calls),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
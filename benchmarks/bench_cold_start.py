@@ -0,0 +1,72 @@
+"""Benchmark Lambda import time and first/warm invocation latency per request type
+
+Each request type runs in a fresh interpreter, so the first invocation pays
+the same client construction and lazy imports a cold execution environment
+would. AWS and Bedrock are served by the synthetic account. ``import_ms`` is
+the cost of importing lambda_function itself, on top of ``boto3_import_ms``;
+warm invocations may be served by the response cache.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cold_start
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+EVENTS = {
+    'scan': {'request_type': 'scan'},
+    'enforce': {'request_type': 'enforce', 'framework': 'GDPR',
+                'resource': {'resource_type': 'EC2', 'resource_id': 'i-0123456789abcdef0', 'encrypted': True}},
+    'report': {'request_type': 'report', 'violations': [{'framework': 'GDPR', 'violation': 'Unencrypted data'}]},
+}
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import boto3
+boto3_import_ms = (time.perf_counter() - start) * 1000
+from benchmarks.synthetic_account import SyntheticAccount
+account = SyntheticAccount(regions=['us-east-1'], ec2_per_region=50, rds_per_region=20, buckets=20)
+boto3.DEFAULT_SESSION = account.session()
+
+start = time.perf_counter()
+import lambda_function
+import_ms = (time.perf_counter() - start) * 1000
+
+event = json.loads(sys.argv[1])
+timings = []
+for _ in range(2):
+    start = time.perf_counter()
+    response = lambda_function.lambda_handler(event, None)
+    timings.append((time.perf_counter() - start) * 1000)
+    assert response['statusCode'] == 200, response
+
+print(json.dumps({
+    'boto3_import_ms': round(boto3_import_ms, 1),
+    'import_ms': round(import_ms, 1),
+    'first_invocation_ms': round(timings[0], 1),
+    'warm_invocation_ms': round(timings[1], 1),
+    'modules_loaded': len(sys.modules),
+    'pandas_loaded': 'pandas' in sys.modules,
+}))
+'''
+
+
+def main():
+    results = {}
+    for request_type, event in EVENTS.items():
+        with tempfile.TemporaryDirectory() as state_dir:
+            env = dict(os.environ,
+                       FINGERPRINT_DB_PATH=os.path.join(state_dir, 'fingerprints.db'),
+                       AWS_DEFAULT_REGION='us-east-1')
+            output = subprocess.run([sys.executable, '-c', CHILD, json.dumps(event)], env=env,
+                                    capture_output=True, text=True, check=True).stdout
+        results[request_type] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
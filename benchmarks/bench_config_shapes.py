@@ -0,0 +1,81 @@
+"""Benchmark configuration-shape de-duplication of batched evaluations
+
+Scans a synthetic account and evaluates every resource against four
+frameworks with the rule engine and response cache off, once per resource
+and once per configuration shape with the verdict fanned back out. The
+synthetic fleet has a few attribute combinations per resource type, as a
+fleet launched from a handful of templates would, so model calls follow
+the number of shapes rather than the number of resources.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_config_shapes --ec2 2000 --rds 400 --buckets 600 --latency 0.05
+"""
+import argparse
+import json
+import time
+
+from agents.audit_agent import AuditAgent
+from agents.compliance_agent import ComplianceAgent
+from agents.config_shapes import group_shapes
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from benchmarks.synthetic_account import SyntheticAccount
+from policies.rules import RuleEngine
+
+FRAMEWORKS = ['GDPR', 'FISMA', 'EU_AI_ACT', 'ISO_42001']
+
+
+def run(items, latency: float, dedupe_shapes: bool) -> dict:
+    agent = ComplianceAgent(rule_engine=RuleEngine(rules=[]), cache=ResponseCache(max_entries=0),
+                            dedupe_shapes=dedupe_shapes)
+    agent.bedrock = StubBedrock(latency=latency, responder=verdict_responder)
+    start = time.perf_counter()
+    results = agent.analyze_compliance_batch(items)
+    seconds = time.perf_counter() - start
+    return {
+        'seconds': round(seconds, 3),
+        'round_trips': agent.bedrock.calls['invoke_model'],
+        'input_tokens': agent.bedrock.tokens['input_tokens'],
+        'output_tokens': agent.bedrock.tokens['output_tokens'],
+        'verdicts': sum(len(result) for result in results),
+        'fanned_out': sum(1 for result in results for verdict in result.values() if 'evaluated_as' in verdict),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=1)
+    parser.add_argument('--ec2', type=int, default=2000, help='EC2 instances per region')
+    parser.add_argument('--rds', type=int, default=400, help='RDS instances per region')
+    parser.add_argument('--buckets', type=int, default=600)
+    parser.add_argument('--latency', type=float, default=0.05, help='Stubbed Bedrock seconds per call')
+    args = parser.parse_args()
+
+    regions = ['us-east-1', 'eu-west-1', 'us-west-2', 'ap-southeast-1'][:args.regions]
+    account = SyntheticAccount(regions=regions, ec2_per_region=args.ec2, rds_per_region=args.rds,
+                               buckets=args.buckets)
+    resources = AuditAgent(regions=regions, session=account.session()).get_all_resources().without_errors()
+    items = [(resource, FRAMEWORKS) for resource in resources]
+
+    start = time.perf_counter()
+    shapes = group_shapes(items)
+    grouping_ms = (time.perf_counter() - start) * 1000
+
+    per_resource = run(items, args.latency, dedupe_shapes=False)
+    per_shape = run(items, args.latency, dedupe_shapes=True)
+    print(json.dumps({
+        'resources': len(items),
+        'pairs': sum(len(frameworks) for _, frameworks in items),
+        'shapes': len(shapes),
+        'grouping_ms': round(grouping_ms, 1),
+        'per_resource': per_resource,
+        'per_shape': per_shape,
+        'round_trip_reduction': round(per_resource['round_trips'] / max(per_shape['round_trips'], 1), 1),
+        'input_token_reduction': round(per_resource['input_tokens'] / max(per_shape['input_tokens'], 1), 1),
+        'speedup': round(per_resource['seconds'] / per_shape['seconds'], 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
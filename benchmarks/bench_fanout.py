@@ -0,0 +1,99 @@
+"""Benchmark the sharded coordinate/scan_shard pipeline against a single scan invocation
+
+Both modes run through lambda_handler against the synthetic account with a
+stubbed Bedrock. Shards run on the in-process executor; ``longest_shard_seconds``
+is the duration a real worker invocation would need, which is what has to stay
+inside the Lambda time limit.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_fanout --regions 2 --ec2 1000 --rds 200 --buckets 200 --shard-size 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import boto3
+
+from agents.audit_agent import AuditAgent
+from agents.compliance_agent import ComplianceAgent
+from agents.fingerprint_store import FingerprintStore
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from benchmarks.synthetic_account import SyntheticAccount
+from policies.rules import RuleEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=2)
+    parser.add_argument('--ec2', type=int, default=1000, help='EC2 instances per region')
+    parser.add_argument('--rds', type=int, default=200, help='RDS instances per region')
+    parser.add_argument('--buckets', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='Stubbed Bedrock seconds per call')
+    parser.add_argument('--shard-size', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4, help='Shards evaluated concurrently')
+    args = parser.parse_args()
+
+    account = SyntheticAccount(
+        regions=['us-east-1', 'eu-west-1', 'us-west-2', 'ap-southeast-1'][:args.regions],
+        ec2_per_region=args.ec2,
+        rds_per_region=args.rds,
+        buckets=args.buckets,
+    )
+    boto3.DEFAULT_SESSION = account.session()
+    import lambda_function
+
+    # Rules and the response cache are disabled so every pair costs a model evaluation
+    compliance_agent = ComplianceAgent(rule_engine=RuleEngine(rules=[]), cache=ResponseCache(max_entries=0))
+    compliance_agent.bedrock = StubBedrock(latency=args.latency, responder=verdict_responder)
+    lambda_function._instances.update({
+        'audit': AuditAgent(regions=account.regions, s3_concurrency=32),
+        'compliance': compliance_agent,
+        'fingerprints': FingerprintStore(os.path.join(tempfile.mkdtemp(), 'fingerprints.db')),
+    })
+
+    start = time.perf_counter()
+    response = lambda_function.lambda_handler({'request_type': 'scan', 'incremental': False}, None)
+    scan_seconds = time.perf_counter() - start
+    scan = json.loads(response['body'])
+
+    shard_seconds = []
+    handler = lambda_function.handle_request
+
+    def timed_handler(event, context):
+        start = time.perf_counter()
+        try:
+            return handler(event, context)
+        finally:
+            shard_seconds.append(time.perf_counter() - start)
+
+    lambda_function.handle_request = timed_handler
+    event = {'request_type': 'coordinate', 'incremental': False,
+             'shard_size': args.shard_size, 'max_workers': args.workers}
+    start = time.perf_counter()
+    response = handler(event, None)
+    fanout_seconds = time.perf_counter() - start
+    lambda_function.handle_request = handler
+    fanout = json.loads(response['body'])
+
+    print(json.dumps({
+        'resources': scan['resources_scanned'],
+        'single_scan': {
+            'seconds': round(scan_seconds, 3),
+            'verdicts': len(scan['compliance_results']),
+        },
+        'fan_out': {
+            'seconds': round(fanout_seconds, 3),
+            'shards': fanout['shards'],
+            'failed_shards': len(fanout['failed_shards']),
+            'verdicts': len(fanout['compliance_results']),
+            'longest_shard_seconds': round(max(shard_seconds, default=0.0), 3),
+        },
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark the dashboard queries of the scan history store over a year of daily scans
+
+The most recent ``--live-days`` scans are recorded through HistoryStore with
+a small daily churn of verdicts; older days are backfilled in SQL by copying
+those scans' per-scan totals and change-log rows to earlier dates, so the
+tables the dashboard reads hold a full year of history without a year of
+writes; the rollup buckets are then rebuilt from those totals. Query timings
+are for a freshly opened store (cold) and the mean of repeated calls (warm);
+``recompute_from_verdicts`` is the framework-score query the rollups replace.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_history_store --resources 100000 --days 365
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from agents.history_store import HistoryStore
+
+FRAMEWORKS = ['GDPR', 'FISMA', 'EU_AI_ACT']
+RESOURCE_TYPES = ['EC2', 'RDS', 'S3']
+RISK_LEVELS = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+CHUNK_SIZE = 1500
+
+
+def scan_results(resources, day, churn, rng):
+    """Records-format results for one day; ``churn`` of the pairs get a random verdict"""
+    for index, resource in enumerate(resources):
+        for framework in FRAMEWORKS:
+            if rng.random() < churn:
+                status = rng.choice(['COMPLIANT', 'PARTIAL', 'NON_COMPLIANT'])
+            else:
+                status = 'NON_COMPLIANT' if (index + len(framework)) % 10 == 0 else 'COMPLIANT'
+            yield {
+                'resource': resource,
+                'framework': framework,
+                'status': status,
+                'risk_level': RISK_LEVELS[index % len(RISK_LEVELS)],
+                'violations': [] if status == 'COMPLIANT' else [f'{framework} control failed on day {day}']
+            }
+
+
+def backfill(path, days, live_days):
+    """Copy the live scans' totals and change log back over the rest of the year
+
+    The first scan's change log is the initial inventory, so only the later
+    live scans (daily churn) are used as templates.
+    """
+    conn = sqlite3.connect(path)
+    with conn:
+        live = conn.execute('SELECT scan_id, started_at, finished_at, resources FROM scans ORDER BY started_at').fetchall()
+        live = live[1:] or live
+        for day in range(live_days, days):
+            scan_id, started_at, finished_at, resources = live[day % len(live)]
+            shift = (day // len(live)) * len(live) * 86400
+            new_id = conn.execute('INSERT INTO scans (source, started_at, finished_at, resources) VALUES (?, ?, ?, ?)',
+                                  ('backfill', started_at - shift, finished_at - shift, resources)).lastrowid
+            conn.execute('''
+                INSERT INTO scan_stats SELECT ?, framework, resource_type, risk_level, verdicts, compliant, partial,
+                                              non_compliant
+                FROM scan_stats WHERE scan_id = ?
+            ''', (new_id, scan_id))
+            conn.execute('''
+                INSERT INTO verdict_changes SELECT resource_key, framework, resource_type, status, risk_level, ?,
+                                                   changed_at - ?
+                FROM verdict_changes WHERE scan_id = ?
+            ''', (new_id, shift, scan_id))
+    conn.close()
+
+
+def timed(call, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return round((time.perf_counter() - start) / repeat * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--live-days', type=int, default=3, help='Days recorded through HistoryStore')
+    parser.add_argument('--churn', type=float, default=0.01, help='Fraction of verdicts re-rolled each day')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    resources = [{'resource_type': RESOURCE_TYPES[i % len(RESOURCE_TYPES)], 'resource_id': f'res-{i:07d}',
+                  'region': 'us-east-1'} for i in range(args.resources)]
+    directory = tempfile.mkdtemp(prefix='enforce-ai-history-')
+    path = os.path.join(directory, 'history.db')
+
+    store = HistoryStore(path)
+    now = time.time()
+    write_seconds = []
+    for day in range(args.live_days):
+        started_at = now - (args.live_days - 1 - day) * 86400
+        start = time.perf_counter()
+        scan_id = store.start_scan('bench', started_at)
+        chunk = []
+        for result in scan_results(resources, day, args.churn, rng):
+            chunk.append(result)
+            if len(chunk) == CHUNK_SIZE:
+                store.add_results(scan_id, chunk, started_at)
+                chunk = []
+        store.add_results(scan_id, chunk, started_at)
+        store.finish_scan(scan_id, len(resources), started_at + 60)
+        write_seconds.append(time.perf_counter() - start)
+    store.close()
+    backfill(path, args.days, args.live_days)
+    store = HistoryStore(path)
+    store.rebuild_rollups()
+    store.close()
+
+    queries = {
+        'latest_scans': lambda store: store.latest_scans(limit=2),
+        'current_summary': lambda store: store.current_summary(),
+        'score_trend_48h_hourly': lambda store: store.score_trend(days=2, granularity='hour'),
+        'score_trend_30d_daily': lambda store: store.score_trend(days=30),
+        'score_trend_26w_weekly': lambda store: store.score_trend(days=182, granularity='week'),
+        'framework_scores': lambda store: store.framework_scores(),
+        'recent_violations': lambda store: store.recent_violations(limit=20),
+        'recent_critical_gdpr': lambda store: store.recent_violations(limit=20, framework='GDPR', severity='CRITICAL'),
+    }
+    store = HistoryStore(path)
+    start = time.perf_counter()
+    for query in queries.values():
+        query(store)
+    cold_ms = round((time.perf_counter() - start) * 1000, 2)
+    warm_ms = {name: timed(lambda: query(store), args.repeat) for name, query in queries.items()}
+    store.close()
+    conn = sqlite3.connect(path)
+    recompute_ms = timed(lambda: conn.execute('''
+        SELECT framework, SUM(status = 'COMPLIANT'), SUM(status = 'PARTIAL'), COUNT(*) FROM verdicts GROUP BY framework
+    ''').fetchall(), args.repeat)
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('scans', 'scan_stats', 'verdicts', 'verdict_changes', 'resources', 'verdict_totals',
+                            'score_buckets')}
+    conn.close()
+    database_mb = round(os.path.getsize(path) / 2 ** 20, 1)
+    shutil.rmtree(directory)
+
+    print(json.dumps({
+        'resources': args.resources,
+        'days': args.days,
+        'rows': counts,
+        'database_mb': database_mb,
+        'record_scan_seconds': round(sum(write_seconds) / len(write_seconds), 2),
+        'dashboard_cold_ms': cold_ms,
+        'dashboard_warm_ms': dict(warm_ms, total=round(sum(warm_ms.values()), 2)),
+        'recompute_from_verdicts_ms': recompute_ms,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
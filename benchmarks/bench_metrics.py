@@ -0,0 +1,117 @@
+"""Benchmark the cost of agents.metrics instrumentation, disabled and enabled
+
+Times an empty span and counter in a tight loop in both states, then runs
+the Lambda ``scan`` and ``enforce`` requests through the suite's harness
+(synthetic account, stubbed Bedrock) alternating recording off and on, and
+reports the median latency of each with the relative overhead. Enabled
+runs include writing both sinks, and the Prometheus file is rewritten with
+the process-wide totals after every invocation. The last recorded scan's
+per-invocation summary is printed along with the size of the sink output.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_metrics --iterations 7 --ec2 500 --rds 100 --buckets 200
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from agents import metrics
+from benchmarks.suite import ENFORCE_RESOURCE, Harness
+
+
+def loop_ns(body, repeat: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(repeat):
+        body()
+    return (time.perf_counter_ns() - start) / repeat
+
+
+def micro(repeat: int) -> dict:
+    def empty():
+        pass
+
+    def timed_block():
+        with metrics.span('bench.empty'):
+            pass
+
+    def counter():
+        metrics.count('bench_counter')
+
+    results = {'empty_call_ns': round(loop_ns(empty, repeat), 1)}
+    for state in (False, True):
+        metrics.enable(state)
+        label = 'enabled' if state else 'disabled'
+        results[f'span_{label}_ns'] = round(loop_ns(timed_block, repeat), 1)
+        results[f'count_{label}_ns'] = round(loop_ns(counter, repeat), 1)
+    metrics.enable(False)
+    metrics.registry.reset()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=7, help='Timed requests per state')
+    parser.add_argument('--repeat', type=int, default=200000, help='Loop iterations of the span/counter timing')
+    parser.add_argument('--regions', type=int, default=2)
+    parser.add_argument('--ec2', type=int, default=500, help='EC2 instances per region')
+    parser.add_argument('--rds', type=int, default=100, help='RDS instances per region')
+    parser.add_argument('--buckets', type=int, default=200)
+    parser.add_argument('--api-latency', type=float, default=0.0, help='Synthetic AWS API seconds per call')
+    parser.add_argument('--latency', type=float, default=0.005, help='Stubbed Bedrock seconds per call')
+    args = parser.parse_args()
+    args.throttle_rate, args.violations = 0.0, 0
+
+    overhead = micro(args.repeat)
+    harness = Harness(args)
+    directory = tempfile.mkdtemp(prefix='enforce-ai-metrics-')
+    os.environ['METRICS_JSONL_PATH'] = os.path.join(directory, 'metrics.jsonl')
+    os.environ['METRICS_PROMETHEUS_FILE'] = os.path.join(directory, 'metrics.prom')
+
+    requests = {
+        'lambda_scan': {'request_type': 'scan', 'incremental': False},
+        'lambda_enforce': {'request_type': 'enforce', 'resource': ENFORCE_RESOURCE, 'framework': 'GDPR'},
+    }
+    latency, summary = {}, None
+    for name, event in requests.items():
+        harness.invoke(event)  # warm-up
+        samples = {False: [], True: []}
+        for _ in range(args.iterations):
+            for state in (False, True):
+                metrics.enable(state)
+                start = time.perf_counter()
+                body = harness.invoke(event)
+                samples[state].append(time.perf_counter() - start)
+                if state and name == 'lambda_scan':
+                    summary = body['metrics']
+        metrics.enable(False)
+        disabled, enabled = statistics.median(samples[False]), statistics.median(samples[True])
+        latency[name] = {'disabled_p50_ms': round(disabled * 1000, 2), 'enabled_p50_ms': round(enabled * 1000, 2),
+                         'enabled_overhead': round(enabled / disabled - 1, 4)}
+
+    with open(os.environ['METRICS_JSONL_PATH']) as f:
+        jsonl_lines = sum(1 for _ in f)
+    with open(os.environ['METRICS_PROMETHEUS_FILE']) as f:
+        prometheus_lines = sum(1 for _ in f)
+    shutil.rmtree(directory)
+
+    print(json.dumps({
+        'micro': overhead,
+        'requests': latency,
+        'scan_summary': {
+            'phases': {name: span for name, span in summary['spans'].items() if name.startswith('lambda.')},
+            'aws_calls': sum(span['count'] for name, span in summary['spans'].items() if name.startswith('aws.call')),
+            'bedrock_calls': sum(span['count'] for name, span in summary['spans'].items()
+                                 if name.startswith('bedrock.invoke')),
+            'counters': summary['counters'],
+        },
+        'sinks': {'jsonl_lines': jsonl_lines, 'prometheus_lines': prometheus_lines},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Benchmark tiered model routing against sending every call to the strong model
+
+A stubbed Bedrock answers per model: the fast model with a fraction of the
+latency, and with a configurable share of low-confidence verdicts and of
+unparseable batch responses, which the router escalates to the strong model.
+Two workloads run both ways, with the response cache off:
+
+- ``enforce``: PolicyAgent.enforce_policy requests, one model call each
+- ``evaluate``: ComplianceAgent.analyze_compliance_batch over resources the
+  rule engine cannot decide
+
+Cost uses list prices per million input/output tokens of Claude 3 Haiku and
+Sonnet. By default the tiered run keeps the router's default routes: FISMA
+pairs (CRITICAL risk) start on the strong tier.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_model_routing --requests 150 --resources 600 --latency 0.2 --fast-latency 0.05
+"""
+import argparse
+import hashlib
+import io
+import json
+import statistics
+import time
+
+from agents.bedrock_pool import BedrockPool
+from agents.compliance_agent import ComplianceAgent
+from agents.bedrock_runtime import DEFAULT_MODEL_ID
+from agents.model_router import FAST_MODEL_ID, ModelRouter
+from agents.policy_agent import PolicyAgent
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, request_prompt, verdict_responder
+from policies.applicability import ApplicabilityIndex
+
+FRAMEWORKS = ['GDPR', 'EU_AI_ACT', 'FISMA']
+# USD per million input and output tokens
+PRICES = {FAST_MODEL_ID: (0.25, 1.25), DEFAULT_MODEL_ID: (3.0, 15.0)}
+
+
+def unit(*parts) -> float:
+    """Deterministic value in [0, 1) for a tuple of parts"""
+    digest = hashlib.sha256('|'.join(map(str, parts)).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+class TieredStub(StubBedrock):
+    """StubBedrock whose latency and answer quality depend on the model"""
+
+    def __init__(self, latencies, low_confidence_rate: float, unparseable_rate: float):
+        super().__init__()
+        self.latencies = latencies
+        self.low_confidence_rate = low_confidence_rate
+        self.unparseable_rate = unparseable_rate
+        self.by_model = {model_id: {'calls': 0, 'input_tokens': 0, 'output_tokens': 0} for model_id in latencies}
+
+    def respond(self, model_id: str, request):
+        prompt = request_prompt(request)
+        fast = model_id == FAST_MODEL_ID
+        if fast and '"index"' in prompt and unit('batch', prompt) < self.unparseable_rate:
+            return 'I could not assess these resources.'
+        answer = json.loads(verdict_responder(request))
+        verdicts = answer['results'] if 'results' in answer else [answer]
+        for verdict in verdicts:
+            uncertain = fast and unit(prompt if 'index' not in verdict else verdict['index'],
+                                      verdict.get('framework'), prompt[:200]) < self.low_confidence_rate
+            verdict['confidence'] = 0.4 if uncertain else 0.9
+        return json.dumps(answer)
+
+    def invoke_model(self, modelId: str, body: str, **kwargs):
+        self._enter()
+        text = self.respond(modelId, json.loads(body))
+        try:
+            time.sleep(self.latencies[modelId])
+        finally:
+            self._exit()
+        usage = {'input_tokens': len(body) // 4, 'output_tokens': len(text) // 4}
+        with self._lock:
+            stats = self.by_model[modelId]
+            stats['calls'] += 1
+            stats['input_tokens'] += usage['input_tokens']
+            stats['output_tokens'] += usage['output_tokens']
+        payload = {'content': [{'type': 'text', 'text': text}], 'usage': usage}
+        return {'body': io.BytesIO(json.dumps(payload).encode('utf-8'))}
+
+
+def cost(by_model) -> float:
+    return round(sum(stats['input_tokens'] / 1e6 * PRICES[model_id][0] +
+                     stats['output_tokens'] / 1e6 * PRICES[model_id][1]
+                     for model_id, stats in by_model.items()), 4)
+
+
+def resources(count: int):
+    # Encrypted, backed up and multi-AZ, so the rule engine passes them on to the model
+    return [{'resource_type': 'RDS', 'resource_id': f'db-{index:05d}', 'region': 'us-east-1',
+             'engine': 'postgres', 'encrypted': True, 'backup_retention': 7 + index % 20, 'multi_az': True}
+            for index in range(count)]
+
+
+def run(args, routes):
+    stub = TieredStub({FAST_MODEL_ID: args.fast_latency, DEFAULT_MODEL_ID: args.latency},
+                      args.low_confidence_rate, args.unparseable_rate)
+    router = ModelRouter(tiers={'fast': FAST_MODEL_ID, 'strong': DEFAULT_MODEL_ID}, routes=routes)
+    # Every framework rule applies, so each enforce request needs the model
+    policy_agent = PolicyAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool(), router=router,
+                               applicability=ApplicabilityIndex(scopes={}))
+    policy_agent.bedrock = stub
+    compliance_agent = ComplianceAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool(), router=router,
+                                       dedupe_shapes=False)
+    compliance_agent.bedrock = stub
+
+    samples = []
+    for index, resource in enumerate(resources(args.requests)):
+        start = time.perf_counter()
+        policy_agent.enforce_policy(resource, FRAMEWORKS[index % len(FRAMEWORKS)])
+        samples.append(time.perf_counter() - start)
+    enforce_costs = {model_id: dict(stats) for model_id, stats in stub.by_model.items()}
+
+    items = [(resource, FRAMEWORKS) for resource in resources(args.resources)]
+    start = time.perf_counter()
+    results = compliance_agent.analyze_compliance_batch(items)
+    evaluate_seconds = time.perf_counter() - start
+    evaluate_costs = {model_id: {key: stub.by_model[model_id][key] - enforce_costs[model_id][key]
+                                 for key in stats} for model_id, stats in stub.by_model.items()}
+
+    samples.sort()
+    return {
+        'enforce': {
+            'p50_ms': round(statistics.median(samples) * 1000, 1),
+            'p99_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 1),
+            'calls_by_model': {model_id: stats['calls'] for model_id, stats in enforce_costs.items()},
+            'cost_usd': cost(enforce_costs),
+        },
+        'evaluate': {
+            'pairs': sum(len(result) for result in results),
+            'seconds': round(evaluate_seconds, 2),
+            'calls_by_model': {model_id: stats['calls'] for model_id, stats in evaluate_costs.items()},
+            'cost_usd': cost(evaluate_costs),
+        },
+        'router': router.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=150, help='Enforce requests')
+    parser.add_argument('--resources', type=int, default=600, help='Resources evaluated in batches')
+    parser.add_argument('--latency', type=float, default=0.2, help='Strong model seconds per call')
+    parser.add_argument('--fast-latency', type=float, default=0.05, help='Fast model seconds per call')
+    parser.add_argument('--low-confidence-rate', type=float, default=0.1,
+                        help='Share of fast-model verdicts below the confidence threshold')
+    parser.add_argument('--unparseable-rate', type=float, default=0.05,
+                        help='Share of fast-model batch responses that are not JSON')
+    parser.add_argument('--routes', type=json.loads, default={'report': 'strong', 'FISMA': 'strong'},
+                        help='Routes of the tiered run, as JSON')
+    args = parser.parse_args()
+
+    strong_only = run(args, {'evaluate': 'strong', 'enforce': 'strong', 'report': 'strong'})
+    tiered = run(args, args.routes)
+    print(json.dumps({
+        'strong_only': {name: strong_only[name] for name in ('enforce', 'evaluate')},
+        'tiered': tiered,
+        'enforce_p50_speedup': round(strong_only['enforce']['p50_ms'] / tiered['enforce']['p50_ms'], 2),
+        'enforce_cost_ratio': round(strong_only['enforce']['cost_usd'] / tiered['enforce']['cost_usd'], 2),
+        'evaluate_speedup': round(strong_only['evaluate']['seconds'] / tiered['evaluate']['seconds'], 2),
+        'evaluate_cost_ratio': round(strong_only['evaluate']['cost_usd'] / tiered['evaluate']['cost_usd'], 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark the adaptive Bedrock pool against serial calls under an emulated quota
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pool --pairs 600 --latency 0.05 --quota 12
+"""
+import argparse
+import json
+import time
+
+from agents.bedrock_pool import BedrockPool
+from agents.compliance_agent import ComplianceAgent
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from policies.rules import RuleEngine
+
+FRAMEWORKS = ['GDPR', 'FISMA', 'EU_AI_ACT']
+
+
+def make_agent(latency: float, quota: int, pool: BedrockPool) -> ComplianceAgent:
+    agent = ComplianceAgent(rule_engine=RuleEngine(rules=[]), cache=ResponseCache(max_entries=0), pool=pool)
+    agent.bedrock = StubBedrock(latency=latency, responder=verdict_responder, quota=quota)
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=600)
+    parser.add_argument('--latency', type=float, default=0.05, help='Stubbed Bedrock seconds per call')
+    parser.add_argument('--quota', type=int, default=12, help='Concurrent calls allowed before throttling')
+    parser.add_argument('--max-concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    pairs = [({'resource_type': 'EC2', 'resource_id': f'i-{i:08x}'}, FRAMEWORKS[i % len(FRAMEWORKS)])
+             for i in range(args.pairs)]
+
+    serial = make_agent(args.latency, args.quota, BedrockPool(max_concurrency=1, initial_concurrency=1))
+    start = time.perf_counter()
+    for resource, framework in pairs:
+        serial.analyze_compliance(resource, framework)
+    serial_seconds = time.perf_counter() - start
+
+    pool = BedrockPool(max_concurrency=args.max_concurrency)
+    pooled = make_agent(args.latency, args.quota, pool)
+    start = time.perf_counter()
+    futures = [pooled.submit_analysis(resource, framework) for resource, framework in pairs]
+    results = [future.result() for future in futures]
+    pooled_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'pairs': args.pairs,
+        'quota': args.quota,
+        'serial': {'seconds': round(serial_seconds, 3),
+                   'calls_per_second': round(args.pairs / serial_seconds, 1)},
+        'pooled': {'seconds': round(pooled_seconds, 3),
+                   'calls_per_second': round(args.pairs / pooled_seconds, 1),
+                   'errors': sum(1 for r in results if r.get('status') == 'ERROR'),
+                   'throttled_calls': pooled.bedrock.calls['throttled'],
+                   'peak_in_flight': pooled.bedrock.peak_in_flight,
+                   'pool': pool.summary()},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
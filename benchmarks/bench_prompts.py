@@ -0,0 +1,81 @@
+"""Benchmark input tokens of the lean prompt builder against the original prompt layout
+
+The original layout embedded ``json.dumps(resource, indent=2)`` of the whole
+resource in an indented template. Token counts are the usage the stubbed
+Bedrock reports for every call.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_prompts --resources 300
+"""
+import argparse
+import json
+
+from agents.audit_agent import AuditAgent
+from agents.bedrock_runtime import DEFAULT_MODEL_ID, TokenUsage, invoke_model
+from agents.compliance_agent import ComplianceAgent
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from benchmarks.synthetic_account import SyntheticAccount
+from policies.rules import RuleEngine
+
+FRAMEWORKS = ['GDPR', 'FISMA', 'EU_AI_ACT']
+
+
+def original_prompt(resource, framework):
+    return f"""
+        Analyze the following AWS resource for {framework} compliance:
+        Resource: {json.dumps(resource, indent=2)}
+
+        Provide a compliance assessment with:
+        1. Compliance status (COMPLIANT/NON_COMPLIANT/PARTIAL)
+        2. Specific violations found
+        3. Remediation recommendations
+        4. Risk level (LOW/MEDIUM/HIGH/CRITICAL)
+
+        Respond in JSON format.
+        """
+
+
+def make_agent() -> ComplianceAgent:
+    # Rules and the response cache are disabled so every pair costs a model evaluation
+    agent = ComplianceAgent(rule_engine=RuleEngine(rules=[]), cache=ResponseCache(max_entries=0))
+    agent.bedrock = StubBedrock(responder=verdict_responder)
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=300)
+    args = parser.parse_args()
+
+    per_service = max(1, args.resources // 3)
+    account = SyntheticAccount(regions=['us-east-1'], ec2_per_region=per_service,
+                               rds_per_region=per_service, buckets=per_service)
+    resources = AuditAgent(regions=account.regions, session=account.session()).get_all_resources().without_errors()
+
+    original = TokenUsage()
+    bedrock = StubBedrock(responder=verdict_responder)
+    for resource in resources:
+        for framework in FRAMEWORKS:
+            invoke_model(bedrock, DEFAULT_MODEL_ID, original_prompt(resource, framework), usage=original)
+
+    lean = make_agent()
+    for resource in resources:
+        for framework in FRAMEWORKS:
+            lean.analyze_compliance(resource, framework)
+
+    batched = make_agent()
+    batched.analyze_compliance_batch([(resource, FRAMEWORKS) for resource in resources])
+
+    original_tokens = original.summary()['input_tokens']
+    report = {'resources': len(resources), 'pairs': len(resources) * len(FRAMEWORKS)}
+    for name, usage in (('original', original.summary()), ('lean', lean.usage.summary()),
+                        ('lean_batched', batched.usage.summary())):
+        report[name] = dict(usage, input_tokens_per_pair=round(usage['input_tokens'] / report['pairs'], 1),
+                            input_token_reduction=round(original_tokens / max(usage['input_tokens'], 1), 1))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark report latency of single-prompt vs. map-reduce generation as violations grow
+
+The stubbed Bedrock charges ``--input-delay`` seconds per thousand input
+tokens on top of ``--latency``, so one huge prompt costs what it would in
+prefill. Violations draw their text from ``--distinct`` findings per
+framework and severity, each against a different resource.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_report_mapreduce --sizes 200 2000 20000 --latency 0.2 --input-delay 0.05
+"""
+import argparse
+import json
+import time
+
+from agents.compliance_agent import ComplianceAgent
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock
+from policies.frameworks import COMPLIANCE_FRAMEWORKS
+from policies.rules import SEVERITY_ORDER
+
+
+def make_violations(count: int, distinct: int):
+    frameworks = list(COMPLIANCE_FRAMEWORKS)
+    violations = []
+    for i in range(count):
+        framework = frameworks[i % len(frameworks)]
+        rules = COMPLIANCE_FRAMEWORKS[framework]['rules']
+        finding = (i // len(frameworks)) % distinct
+        violations.append({
+            'framework': framework,
+            'resource': f'arn:aws:ec2:us-east-1:123456789012:instance/i-{i:017x}',
+            'violation': f'{rules[finding % len(rules)]} (finding {finding})',
+            'severity': SEVERITY_ORDER[finding % len(SEVERITY_ORDER)],
+        })
+    return violations
+
+
+def timed_report(args, violations, mode: str) -> dict:
+    # A huge budget lets the single-prompt mode run at any size instead of failing
+    agent = ComplianceAgent(cache=ResponseCache(max_entries=0),
+                            report_input_tokens=10 ** 9 if mode == 'single' else 8000)
+    agent.bedrock = StubBedrock(latency=args.latency, input_delay=args.input_delay,
+                                text='## Executive Summary\nFindings and priorities.')
+    start = time.perf_counter()
+    agent.generate_compliance_report(violations, mode)
+    usage = agent.usage.summary()
+    return {
+        'seconds': round(time.perf_counter() - start, 3),
+        'calls': usage['calls'],
+        'input_tokens': usage['input_tokens'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 2000, 20000])
+    parser.add_argument('--distinct', type=int, default=40, help='Distinct findings per framework')
+    parser.add_argument('--latency', type=float, default=0.2, help='Stubbed seconds per call')
+    parser.add_argument('--input-delay', type=float, default=0.05, help='Stubbed seconds per 1k input tokens')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        violations = make_violations(size, args.distinct)
+        results.append({
+            'violations': size,
+            'single': timed_report(args, violations, 'single'),
+            'map_reduce': timed_report(args, violations, 'map_reduce'),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
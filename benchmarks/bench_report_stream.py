@@ -0,0 +1,56 @@
+"""Benchmark time-to-first-token of streamed reports against blocking generation
+
+Run from the repository root:
+
+    python -m benchmarks.bench_report_stream --latency 0.4 --chunk-delay 0.02 --report-chars 6000
+"""
+import argparse
+import json
+import time
+
+from agents.compliance_agent import ComplianceAgent
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock
+from policies.frameworks import POLICY_VIOLATIONS
+
+
+def make_agent(args) -> ComplianceAgent:
+    agent = ComplianceAgent(cache=ResponseCache(max_entries=0))
+    agent.bedrock = StubBedrock(latency=args.latency, chunk_delay=args.chunk_delay,
+                                text='## Executive Summary\n' + 'x' * args.report_chars)
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.4, help='Stubbed time to first token')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='Stubbed seconds per streamed chunk')
+    parser.add_argument('--report-chars', type=int, default=6000)
+    args = parser.parse_args()
+
+    agent = make_agent(args)
+    start = time.perf_counter()
+    agent.generate_compliance_report(POLICY_VIOLATIONS)
+    blocking_seconds = time.perf_counter() - start
+
+    agent = make_agent(args)
+    start = time.perf_counter()
+    first_token = None
+    chunks = 0
+    for _ in agent.generate_compliance_report_stream(POLICY_VIOLATIONS):
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        chunks += 1
+    streaming_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'blocking': {'time_to_first_token_ms': round(blocking_seconds * 1000, 1),
+                     'total_ms': round(blocking_seconds * 1000, 1)},
+        'streaming': {'time_to_first_token_ms': round(first_token * 1000, 1),
+                      'total_ms': round(streaming_seconds * 1000, 1),
+                      'chunks': chunks},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
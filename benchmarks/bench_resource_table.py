@@ -0,0 +1,74 @@
+"""Benchmark ResourceTable memory and DataFrame conversion against a list of resource dicts
+
+``*_bytes_per_resource`` is measured with tracemalloc while rebuilding each
+representation from deep copies of the scanned records. Immutable strings are
+shared by the copies, so the figures compare container overhead.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_resource_table --ec2 40000 --rds 10000
+"""
+import argparse
+import copy
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from agents.audit_agent import AuditAgent
+from agents.resource_table import ResourceTable
+from benchmarks.synthetic_account import SyntheticAccount
+
+
+def traced(build):
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ec2', type=int, default=40000, help='EC2 instances')
+    parser.add_argument('--rds', type=int, default=10000, help='RDS instances')
+    parser.add_argument('--reruns', type=int, default=20, help='Simulated Streamlit reruns')
+    args = parser.parse_args()
+
+    account = SyntheticAccount(regions=['us-east-1'], ec2_per_region=args.ec2, rds_per_region=args.rds, buckets=0)
+    scanned = AuditAgent(regions=account.regions, services=['ec2', 'rds'],
+                         session=account.session()).get_all_resources()
+    records = scanned.to_records()
+
+    dicts, dict_bytes = traced(lambda: copy.deepcopy(records))
+    table, table_bytes = traced(lambda: ResourceTable(copy.deepcopy(records)))
+
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        pd.DataFrame(dicts)
+    dict_rerun_seconds = (time.perf_counter() - start) / args.reruns
+
+    start = time.perf_counter()
+    table.to_dataframe()
+    first_frame_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        table.to_dataframe()
+    table_rerun_seconds = (time.perf_counter() - start) / args.reruns
+
+    print(json.dumps({
+        'resources': len(records),
+        'dict_bytes_per_resource': round(dict_bytes / len(records)),
+        'table_bytes_per_resource': round(table_bytes / len(records)),
+        'memory_reduction': round(dict_bytes / table_bytes, 1),
+        'dataframe_per_rerun_seconds': {
+            'list_of_dicts': round(dict_rerun_seconds, 4),
+            'resource_table_first': round(first_frame_seconds, 4),
+            'resource_table_cached': round(table_rerun_seconds, 6),
+        },
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
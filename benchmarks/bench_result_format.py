@@ -0,0 +1,67 @@
+"""Benchmark payload size and serialisation time of the scan result formats
+
+Resources come from the synthetic account. Verdicts are built in the shape the
+scan produces: rule verdicts where the rule engine decides, and the model's
+batched verdict shape for every other pair.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_result_format --ec2 40000 --rds 10000
+"""
+import argparse
+import gzip
+import json
+import time
+
+from agents.audit_agent import AuditAgent
+from agents.result_format import RESULT_FORMATS, expand, format_results
+from benchmarks.synthetic_account import SyntheticAccount
+from policies.rules import RuleEngine
+
+FRAMEWORKS = ['GDPR', 'FISMA', 'EU_AI_ACT']
+MODEL_VERDICT = {
+    'status': 'PARTIAL',
+    'violations': ['Access controls not documented'],
+    'recommendations': ['Document access controls'],
+    'risk_level': 'MEDIUM',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ec2', type=int, default=40000, help='EC2 instances')
+    parser.add_argument('--rds', type=int, default=10000, help='RDS instances')
+    args = parser.parse_args()
+
+    account = SyntheticAccount(regions=['us-east-1'], ec2_per_region=args.ec2, rds_per_region=args.rds, buckets=0)
+    resources = AuditAgent(regions=account.regions, services=['ec2', 'rds'],
+                           session=account.session()).get_all_resources()
+    decided = RuleEngine().evaluate(resources, FRAMEWORKS)
+    compliance_results = []
+    for index, resource in enumerate(resources):
+        for framework in FRAMEWORKS:
+            result = dict(decided.get((index, framework), MODEL_VERDICT))
+            result['resource'] = resource
+            result['framework'] = framework
+            compliance_results.append(result)
+
+    report = {'resources': len(resources), 'verdicts': len(compliance_results)}
+    for result_format in RESULT_FORMATS:
+        start = time.perf_counter()
+        body = json.dumps(format_results(compliance_results, result_format))
+        seconds = time.perf_counter() - start
+        report[result_format] = {
+            'bytes': len(body),
+            'gzip_bytes': len(gzip.compress(body.encode('utf-8'), 6)),
+            'serialise_seconds': round(seconds, 3),
+        }
+        if result_format != 'records':
+            assert len(expand(json.loads(body), result_format)) == len(compliance_results)
+    for result_format in RESULT_FORMATS[1:]:
+        report[result_format]['size_reduction'] = round(report['records']['bytes'] / report[result_format]['bytes'], 1)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark peak memory and response size of inline scan results vs. the NDJSON result sink
+
+Each account size runs the ``scan`` request twice through lambda_handler
+(stubbed Bedrock, local directory standing in for S3): once returning every
+result inline, once streaming them to the sink. ``peak_mb`` is the
+tracemalloc peak during the invocation and includes the discovered
+resources themselves, which both modes hold.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_result_sink --sizes 1000 4000 16000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import boto3
+
+from agents.audit_agent import AuditAgent
+from agents.compliance_agent import ComplianceAgent
+from agents.fingerprint_store import FingerprintStore
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from benchmarks.synthetic_account import SyntheticAccount
+
+
+def measure(lambda_function, event):
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = lambda_function.lambda_handler(event, None)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response['statusCode'] == 200, response
+    return {
+        'seconds': round(seconds, 3),
+        'peak_mb': round(peak / 1e6, 1),
+        'response_bytes': len(response['body']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 4000, 16000], help='EC2 instances scanned')
+    args = parser.parse_args()
+
+    output = tempfile.mkdtemp()
+    import lambda_function
+
+    results = []
+    # The first size is run once untimed so lazy imports do not count towards its peak
+    for size in [args.sizes[0]] + args.sizes:
+        account = SyntheticAccount(regions=['us-east-1'], ec2_per_region=size, rds_per_region=0, buckets=0)
+        boto3.DEFAULT_SESSION = account.session()
+        compliance_agent = ComplianceAgent(cache=ResponseCache(max_entries=0))
+        compliance_agent.bedrock = StubBedrock(responder=verdict_responder)
+        lambda_function._instances.update({
+            'audit': AuditAgent(regions=account.regions, services=['ec2'], session=account.session()),
+            'compliance': compliance_agent,
+            'fingerprints': FingerprintStore(os.path.join(tempfile.mkdtemp(), 'fingerprints.db')),
+        })
+
+        inline = measure(lambda_function, {'request_type': 'scan', 'incremental': False})
+        sink = measure(lambda_function, {'request_type': 'scan', 'incremental': False,
+                                         'result_sink': output, 'scan_id': f'bench-{size}'})
+        sink['object_bytes'] = os.path.getsize(os.path.join(output, f'bench-{size}.ndjson.gz'))
+        results.append({'resources': size, 'inline': inline, 'sink': sink})
+
+    print(json.dumps(results[1:], indent=2))
+
+
+if __name__ == '__main__':
+    main()
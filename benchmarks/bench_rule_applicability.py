@@ -0,0 +1,88 @@
+"""Benchmark the rule applicability index on enforce requests
+
+Enforces every framework on a mix of EC2, RDS, S3, IAM and SageMaker
+resources that pass the deterministic rules, so each pair would otherwise
+need the model. The baseline sends every framework rule in every prompt;
+with the index, prompts carry only the rules that apply to the resource
+and pairs with none are answered NOT_APPLICABLE without a call. The
+per-lookup cost of the index is timed separately.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rule_applicability --resources 200 --latency 0.02
+"""
+import argparse
+import json
+import statistics
+import time
+
+from agents.bedrock_pool import BedrockPool
+from agents.policy_agent import PolicyAgent
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from policies.applicability import INDEX, ApplicabilityIndex
+from policies.frameworks import COMPLIANCE_FRAMEWORKS
+
+# Configurations the rule engine passes
+TEMPLATES = [
+    {'resource_type': 'EC2', 'state': 'running', 'encrypted': True, 'security_groups': ['sg-0a1b2c']},
+    {'resource_type': 'RDS', 'engine': 'postgres', 'encrypted': True, 'backup_retention': 14, 'multi_az': True},
+    {'resource_type': 'S3', 'encrypted': True, 'encryption_algorithm': 'aws:kms', 'public_access_blocked': True,
+     'versioning': 'Enabled', 'logging_enabled': True},
+    {'resource_type': 'IAM', 'mfa_enabled': True},
+    {'resource_type': 'SageMaker', 'state': 'InService', 'encrypted': True},
+]
+
+
+def resources(count: int):
+    return [dict(TEMPLATES[index % len(TEMPLATES)], resource_id=f'res-{index:05d}', region='us-east-1')
+            for index in range(count)]
+
+
+def run(items, latency: float, applicability: ApplicabilityIndex) -> dict:
+    agent = PolicyAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool(), applicability=applicability)
+    agent.bedrock = StubBedrock(latency=latency, responder=verdict_responder)
+    samples, statuses = [], {}
+    for resource, framework in items:
+        start = time.perf_counter()
+        result = agent.enforce_policy(resource, framework)
+        samples.append(time.perf_counter() - start)
+        statuses[result['enforcement_status']] = statuses.get(result['enforcement_status'], 0) + 1
+    return {
+        'seconds': round(sum(samples), 3),
+        'p50_ms': round(statistics.median(samples) * 1000, 3),
+        'model_calls': agent.bedrock.calls['invoke_model'],
+        'input_tokens': agent.bedrock.tokens['input_tokens'],
+        'statuses': statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02, help='Stubbed Bedrock seconds per call')
+    parser.add_argument('--repeat', type=int, default=100000, help='Index lookups timed')
+    args = parser.parse_args()
+
+    items = [(resource, framework) for resource in resources(args.resources) for framework in COMPLIANCE_FRAMEWORKS]
+    start = time.perf_counter_ns()
+    for position in range(args.repeat):
+        resource, framework = items[position % len(items)]
+        INDEX.rules_for(resource, framework)
+    lookup_ns = (time.perf_counter_ns() - start) / args.repeat
+
+    all_rules = run(items, args.latency, ApplicabilityIndex(scopes={}))
+    indexed = run(items, args.latency, INDEX)
+    print(json.dumps({
+        'pairs': len(items),
+        'lookup_ns': round(lookup_ns, 1),
+        'all_rules': all_rules,
+        'indexed': indexed,
+        'model_calls_saved': all_rules['model_calls'] - indexed['model_calls'],
+        'input_token_reduction': round(1 - indexed['input_tokens'] / all_rules['input_tokens'], 3),
+        'speedup': round(all_rules['seconds'] / indexed['seconds'], 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark the deterministic rule engine against the per-pair Bedrock path
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rules --regions 2 --ec2 2000 --rds 500 --buckets 1000 --latency 0.2
+"""
+import argparse
+import json
+import time
+
+from agents.audit_agent import AuditAgent
+from agents.compliance_agent import ComplianceAgent
+from benchmarks.stub_bedrock import StubBedrock
+from benchmarks.synthetic_account import SyntheticAccount
+from policies.rules import RuleEngine
+
+FRAMEWORKS = ['GDPR', 'FISMA', 'EU_AI_ACT']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=2)
+    parser.add_argument('--ec2', type=int, default=2000, help='EC2 instances per region')
+    parser.add_argument('--rds', type=int, default=500, help='RDS instances per region')
+    parser.add_argument('--buckets', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.2, help='Stubbed Bedrock seconds per call')
+    parser.add_argument('--sample', type=int, default=20, help='Bedrock calls timed to estimate the LLM path')
+    args = parser.parse_args()
+
+    account = SyntheticAccount(
+        regions=['us-east-1', 'eu-west-1', 'us-west-2', 'ap-southeast-1'][:args.regions],
+        ec2_per_region=args.ec2,
+        rds_per_region=args.rds,
+        buckets=args.buckets,
+    )
+    resources = AuditAgent(regions=account.regions, s3_concurrency=32, session=account.session()).get_all_resources()
+    resources = [r for r in resources if 'error' not in r]
+    pairs = len(resources) * len(FRAMEWORKS)
+
+    engine = RuleEngine()
+    start = time.perf_counter()
+    decided = engine.evaluate(resources, FRAMEWORKS)
+    rules_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for resource in resources:
+        for framework in FRAMEWORKS:
+            engine.check(resource, framework)
+    scalar_seconds = time.perf_counter() - start
+
+    # The LLM path, with rules disabled, timed on a sample and extrapolated
+    agent = ComplianceAgent(rule_engine=RuleEngine(rules=[]))
+    agent.bedrock = StubBedrock(latency=args.latency)
+    start = time.perf_counter()
+    for i in range(args.sample):
+        agent.analyze_compliance(resources[i % len(resources)], FRAMEWORKS[i % len(FRAMEWORKS)])
+    llm_seconds_per_pair = (time.perf_counter() - start) / args.sample
+
+    print(json.dumps({
+        'resources': len(resources),
+        'pairs': pairs,
+        'rules': {
+            'seconds': round(rules_seconds, 4),
+            'microseconds_per_pair': round(rules_seconds / pairs * 1e6, 3),
+            'pairs_per_second': round(pairs / rules_seconds),
+            'decided': len(decided),
+            'scalar_microseconds_per_pair': round(scalar_seconds / pairs * 1e6, 3),
+        },
+        'llm': {
+            'seconds_per_pair': round(llm_seconds_per_pair, 4),
+            'pairs_per_second': round(1 / llm_seconds_per_pair, 2),
+        },
+        'bedrock_calls_avoided': len(decided),
+        'bedrock_calls_avoided_pct': round(100 * len(decided) / pairs, 1),
+        'estimated_llm_seconds_saved': round(len(decided) * llm_seconds_per_pair, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
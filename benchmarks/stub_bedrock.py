@@ -0,0 +1,137 @@
+"""Stand-in for the bedrock-runtime client with configurable latency"""
+import io
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+
+def request_prompt(request: Dict) -> str:
+    return ''.join(message['content'] for message in request.get('messages', []) if message['role'] == 'user')
+
+
+def verdict_responder(request: Dict) -> str:
+    """Answer batched compliance prompts with a verdict per listed pair, others with one verdict"""
+    results = []
+    for line in request_prompt(request).splitlines():
+        line = line.strip()
+        if not line.startswith('{"index":'):
+            continue
+        item = json.loads(line)
+        for framework in item['frameworks']:
+            results.append({
+                'index': item['index'],
+                'framework': framework,
+                'status': 'PARTIAL',
+                'violations': ['Access controls not documented'],
+                'recommendations': ['Document access controls'],
+                'risk_level': 'MEDIUM',
+            })
+    if results:
+        return json.dumps({'results': results})
+    return json.dumps({'status': 'PARTIAL', 'violations': [], 'recommendations': [], 'risk_level': 'MEDIUM'})
+
+
+class StubBedrock:
+    """Fake bedrock-runtime client
+
+    ``latency`` is the time to first token and ``chunk_delay`` the time per
+    streamed chunk of ``chunk_size`` characters; a non-streaming call waits for
+    both. ``quota`` emulates an account concurrency quota: a call arriving while
+    ``quota`` calls are already in flight fails with ThrottlingException.
+    ``input_delay`` adds prompt processing time per thousand input tokens.
+    ``throttle_rate`` is the fraction of calls failed with ThrottlingException
+    regardless of load (seeded, so runs are repeatable). ``tokens`` counts the
+    input and output tokens of every answered call.
+    """
+
+    def __init__(self, latency: float = 0.0, text: str = '{"status": "COMPLIANT"}',
+                 responder: Optional[Callable[[Dict], str]] = None, quota: int = 0,
+                 chunk_delay: float = 0.0, chunk_size: int = 16, input_delay: float = 0.0,
+                 throttle_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.input_delay = input_delay
+        self.text = text
+        self.responder = responder
+        self.quota = quota
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self.calls = Counter()
+        self.tokens = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.calls['invoke_model'] += 1
+            if self.quota and self.in_flight >= self.quota or \
+                    self.throttle_rate and self._random.random() < self.throttle_rate:
+                self.calls['throttled'] += 1
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Too many requests'}},
+                                  'InvokeModel')
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _count_tokens(self, body: str, text: str):
+        with self._lock:
+            self.tokens['input_tokens'] += len(body) // 4
+            self.tokens['output_tokens'] += len(text) // 4
+
+    def _prefill(self, body: str) -> float:
+        return self.latency + self.input_delay * len(body) / 4000
+
+    def _chunks(self, text: str):
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or ['']
+
+    def invoke_model(self, modelId: str, body: str, **kwargs):
+        self._enter()
+        text = self.responder(json.loads(body)) if self.responder else self.text
+        try:
+            delay = self._prefill(body) + self.chunk_delay * len(self._chunks(text))
+            if delay:
+                time.sleep(delay)
+        finally:
+            self._exit()
+        self._count_tokens(body, text)
+        payload = {
+            'content': [{'type': 'text', 'text': text}],
+            'usage': {'input_tokens': len(body) // 4, 'output_tokens': len(text) // 4},
+        }
+        return {'body': io.BytesIO(json.dumps(payload).encode('utf-8'))}
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs):
+        self._enter()
+        text = self.responder(json.loads(body)) if self.responder else self.text
+
+        def events():
+            try:
+                delay = self._prefill(body)
+                if delay:
+                    time.sleep(delay)
+                yield self._event({'type': 'message_start',
+                                   'message': {'usage': {'input_tokens': len(body) // 4}}})
+                for chunk in self._chunks(text):
+                    yield self._event({'type': 'content_block_delta', 'index': 0,
+                                       'delta': {'type': 'text_delta', 'text': chunk}})
+                    if self.chunk_delay:
+                        time.sleep(self.chunk_delay)
+                yield self._event({'type': 'message_delta', 'usage': {'output_tokens': len(text) // 4}})
+                self._count_tokens(body, text)
+            finally:
+                self._exit()
+
+        return {'body': events()}
+
+    def _event(self, payload: Dict) -> Dict:
+        return {'chunk': {'bytes': json.dumps(payload).encode('utf-8')}}
@@ -0,0 +1,263 @@
+"""Offline benchmark suite with machine-readable results for run-to-run comparison
+
+Every scenario runs against a synthetic AWS account (``synthetic_account.py``,
+served through botocore's before-call hook like Stubber) and a stubbed
+Bedrock with configurable latency, throttling rate and token accounting:
+
+- ``audit_get_all_resources``: AuditAgent discovery with a cold bucket cache
+- ``lambda_scan``: the ``scan`` request, non-incremental, response cache off
+- ``lambda_enforce``: ``enforce`` requests the rule engine cannot decide
+- ``lambda_report``: the ``report`` request
+- ``report_generator``: ComplianceAgent map-reduce report generation
+
+Each scenario records throughput, p50/p99/mean latency, AWS API calls per
+operation, Bedrock calls, throttles and tokens over its timed iterations,
+plus the peak traced memory of one extra untimed iteration. Results go to
+``--output`` as JSON; with ``--baseline`` the run is compared against an
+earlier results file and regressions beyond ``--tolerance`` are listed
+(and fail the run with ``--fail-on-regression``).
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output bench-results.json --baseline previous-results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+import boto3
+
+from agents.audit_agent import AuditAgent
+from agents.bedrock_pool import BedrockPool
+from agents.compliance_agent import ComplianceAgent
+from agents.fingerprint_store import FingerprintStore
+from agents.policy_agent import PolicyAgent
+from agents.response_cache import ResponseCache
+from agents.s3_probes import BucketProbeCache
+from benchmarks.bench_report_mapreduce import make_violations
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from benchmarks.synthetic_account import SyntheticAccount
+
+RESULTS_VERSION = 1
+REGIONS = ['us-east-1', 'eu-west-1', 'us-west-2', 'ap-southeast-1']
+
+# Metrics compared against a baseline, and whether higher values are better
+COMPARED_METRICS = {
+    'p50_ms': False,
+    'p99_ms': False,
+    'throughput_per_second': True,
+    'peak_memory_mb': False,
+    'aws_api_calls': False,
+    'bedrock_calls': False,
+    'input_tokens': False,
+}
+
+# A resource the rule engine passes, so enforcement always needs the model
+ENFORCE_RESOURCE = {
+    'resource_type': 'RDS',
+    'resource_id': 'db-benchmark',
+    'region': 'us-east-1',
+    'engine': 'postgres',
+    'encrypted': True,
+    'backup_retention': 14,
+    'multi_az': True,
+}
+
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile of ``samples``"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Harness:
+    """Synthetic account, stubbed Bedrock and Lambda module wired together"""
+
+    def __init__(self, args):
+        self.args = args
+        self.account = SyntheticAccount(regions=REGIONS[:args.regions], ec2_per_region=args.ec2,
+                                        rds_per_region=args.rds, buckets=args.buckets, latency=args.api_latency)
+        boto3.DEFAULT_SESSION = self.account.session()
+        self.bedrock = StubBedrock(latency=args.latency, responder=verdict_responder,
+                                   throttle_rate=args.throttle_rate)
+        import lambda_function
+        self.lambda_function = lambda_function
+
+        # Response caches are off and every agent gets its own pool, so runs repeat the same work
+        def compliance_agent():
+            agent = ComplianceAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool())
+            agent.bedrock = self.bedrock
+            return agent
+
+        policy_agent = PolicyAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool())
+        policy_agent.bedrock = self.bedrock
+        self.report_agent = compliance_agent()
+        lambda_function._instances.update({
+            'audit': self.audit_agent(),
+            'compliance': compliance_agent(),
+            'policy': policy_agent,
+            'fingerprints': FingerprintStore(os.path.join(tempfile.mkdtemp(), 'fingerprints.db')),
+        })
+        self.violations = make_violations(args.violations, distinct=40)
+
+    def audit_agent(self) -> AuditAgent:
+        # A zero TTL keeps every bucket probe cold
+        return AuditAgent(regions=self.account.regions, bucket_cache=BucketProbeCache(ttl=0))
+
+    def counters(self):
+        return Counter(self.account.calls), Counter(self.bedrock.calls), Counter(self.bedrock.tokens)
+
+    def invoke(self, event):
+        response = self.lambda_function.lambda_handler(dict(event, record_history=False), None)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"{event['request_type']} failed: {response['body']}")
+        return json.loads(response['body'])
+
+    def scenarios(self):
+        """name -> (callable returning the units of work it did, timed iterations)"""
+        args = self.args
+        audit = self.audit_agent()
+        return {
+            'audit_get_all_resources': (lambda: len(audit.get_all_resources()), args.iterations),
+            'lambda_scan': (lambda: self.invoke({'request_type': 'scan', 'incremental': False})['resources_scanned'],
+                            args.iterations),
+            'lambda_enforce': (lambda: self.invoke({'request_type': 'enforce', 'resource': ENFORCE_RESOURCE,
+                                                    'framework': 'GDPR'}) and 1, args.requests),
+            'lambda_report': (lambda: self.invoke({'request_type': 'report', 'violations': self.violations})
+                              and len(self.violations), args.iterations),
+            'report_generator': (lambda: self.report_agent.generate_compliance_report(self.violations, 'map_reduce')
+                                 and len(self.violations), args.iterations),
+        }
+
+    def measure(self, run, iterations: int) -> dict:
+        run()  # warm-up: clients, imports and lazily built agents
+        aws_before, bedrock_before, tokens_before = self.counters()
+        samples, units = [], 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            units += run()
+            samples.append(time.perf_counter() - start)
+        aws_after, bedrock_after, tokens_after = self.counters()
+
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        aws_calls = aws_after - aws_before
+        bedrock = bedrock_after - bedrock_before
+        tokens = tokens_after - tokens_before
+        return {
+            'iterations': iterations,
+            'units': units,
+            'throughput_per_second': round(units / sum(samples), 2),
+            'p50_ms': round(percentile(samples, 50) * 1000, 2),
+            'p99_ms': round(percentile(samples, 99) * 1000, 2),
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 2),
+            'peak_memory_mb': round(peak / 2 ** 20, 2),
+            'aws_api_calls': sum(aws_calls.values()),
+            'aws_api_calls_by_operation': dict(sorted(aws_calls.items())),
+            'bedrock_calls': bedrock['invoke_model'] - bedrock['throttled'],
+            'bedrock_throttled': bedrock['throttled'],
+            'input_tokens': tokens['input_tokens'],
+            'output_tokens': tokens['output_tokens'],
+        }
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Relative change of each compared metric; a regression is a change for the worse beyond ``tolerance``"""
+    changes, regressions = {}, []
+    for name, metrics in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = previous.get(metric), metrics.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            changes[f'{name}.{metric}'] = round(change, 3)
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append({'metric': f'{name}.{metric}', 'baseline': before, 'current': after,
+                                    'change': round(change, 3)})
+    return changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench-results.json', help='Results file to write')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative change for the worse')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--scenarios', nargs='+', help='Run only these scenarios')
+    parser.add_argument('--regions', type=int, default=2)
+    parser.add_argument('--ec2', type=int, default=500, help='EC2 instances per region')
+    parser.add_argument('--rds', type=int, default=100, help='RDS instances per region')
+    parser.add_argument('--buckets', type=int, default=200)
+    parser.add_argument('--api-latency', type=float, default=0.0, help='Synthetic AWS API seconds per call')
+    parser.add_argument('--latency', type=float, default=0.02, help='Stubbed Bedrock seconds per call')
+    parser.add_argument('--throttle-rate', type=float, default=0.02, help='Fraction of Bedrock calls throttled')
+    parser.add_argument('--violations', type=int, default=2000, help='Violations per report')
+    parser.add_argument('--iterations', type=int, default=5, help='Timed iterations per scenario')
+    parser.add_argument('--requests', type=int, default=50, help='Timed enforce requests')
+    args = parser.parse_args()
+
+    harness = Harness(args)
+    scenarios = harness.scenarios()
+    unknown = set(args.scenarios or ()) - set(scenarios)
+    if unknown:
+        parser.error(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+
+    results = {
+        'version': RESULTS_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': vars(args),
+        'scenarios': {},
+    }
+    for name, (run, iterations) in scenarios.items():
+        if args.scenarios and name not in args.scenarios:
+            continue
+        results['scenarios'][name] = harness.measure(run, iterations)
+        print(f"{name}: p50 {results['scenarios'][name]['p50_ms']} ms, "
+              f"{results['scenarios'][name]['throughput_per_second']}/s", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        changes, regressions = compare(results, baseline, args.tolerance)
+        results['comparison'] = {'baseline': args.baseline, 'baseline_commit': baseline.get('git_commit'),
+                                 'tolerance': args.tolerance, 'changes': changes, 'regressions': regressions}
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps({name: {key: metrics[key] for key in ('throughput_per_second', 'p50_ms', 'p99_ms',
+                                                             'peak_memory_mb', 'aws_api_calls', 'bedrock_calls',
+                                                             'bedrock_throttled', 'input_tokens')}
+                      for name, metrics in results['scenarios'].items()}, indent=2))
+    if args.baseline:
+        print(json.dumps({'regressions': results['comparison']['regressions']}, indent=2))
+        if args.fail_on_regression and results['comparison']['regressions']:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""Synthetic AWS account served through botocore's before-call hook
+
+botocore's Stubber answers calls from a strict FIFO queue, which cannot serve
+paginated scans running concurrently across regions. This fixture hooks the
+same ``before-call`` event Stubber uses, but synthesises each response from a
+deterministic in-memory account, so any number of regional clients can page
+through thousands of resources in any order without touching the network.
+"""
+import io
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+from benchmarks.stub_bedrock import verdict_responder
+
+
+class SyntheticAccount:
+    def __init__(self, regions: Sequence[str] = ('us-east-1', 'eu-west-1'),
+                 ec2_per_region: int = 2000,
+                 rds_per_region: int = 500,
+                 buckets: int = 1000,
+                 page_size: int = 100,
+                 latency: float = 0.0,
+                 region_latency: Optional[Dict[str, float]] = None,
+                 access_denied_every: int = 50):
+        self.regions = list(regions)
+        self.ec2_per_region = ec2_per_region
+        self.rds_per_region = rds_per_region
+        self.bucket_count = buckets
+        self.page_size = page_size
+        self.latency = latency
+        self.region_latency = dict(region_latency or {})
+        self.access_denied_every = access_denied_every
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def session(self) -> boto3.Session:
+        """Return a boto3 session whose clients are all served by this account"""
+        session = boto3.Session(
+            aws_access_key_id='testing',
+            aws_secret_access_key='testing',
+            region_name=self.regions[0],
+        )
+        session.events.register('before-parameter-build', self._capture_params)
+        session.events.register('before-call', self._respond)
+        return session
+
+    @property
+    def expected_resources(self) -> int:
+        return len(self.regions) * (self.ec2_per_region + self.rds_per_region) + self.bucket_count
+
+    def _capture_params(self, params, context, **kwargs):
+        context['synthetic_params'] = dict(params)
+
+    def _respond(self, model, context, **kwargs):
+        service = model.service_model.service_name
+        region = context.get('client_region')
+        params = context.get('synthetic_params', {})
+        with self._lock:
+            self.calls[f'{service}:{model.name}'] += 1
+
+        delay = self.region_latency.get(region, self.latency)
+        if delay:
+            time.sleep(delay)
+
+        handler = getattr(self, f"_{service.replace('-', '_')}_{model.name}", None)
+        if handler is None:
+            return self._error('InvalidAction', f'{service}:{model.name} is not synthesised')
+        return handler(region, params)
+
+    def _ok(self, parsed: Dict):
+        parsed.setdefault('ResponseMetadata', {'HTTPStatusCode': 200})
+        return AWSResponse(None, 200, {}, None), parsed
+
+    def _error(self, code: str, message: str = '', status: int = 400):
+        parsed = {
+            'Error': {'Code': code, 'Message': message or code},
+            'ResponseMetadata': {'HTTPStatusCode': status},
+        }
+        return AWSResponse(None, status, {}, None), parsed
+
+    def _page(self, total: int, token: Optional[str], limit: Optional[int] = None):
+        start = int(token or 0)
+        end = min(total, start + (limit or self.page_size))
+        next_token = str(end) if end < total else None
+        return range(start, end), next_token
+
+    def _filtered(self, params, name: str, prefix: str, count: int):
+        """Indexes selected by a describe_* id filter (None if unfiltered); unknown ids are ignored"""
+        for entry in params.get('Filters', []):
+            if entry['Name'] == name:
+                indexes = []
+                for value in entry['Values']:
+                    if value.startswith(prefix) and value[len(prefix):].isalnum():
+                        index = int(value[len(prefix):], 16 if name.endswith('instance-id') else 10)
+                        if index < count:
+                            indexes.append(index)
+                return sorted(set(indexes))
+        return None
+
+    def instance_id(self, region: str, i: int) -> str:
+        return f'i-{self.regions.index(region):04x}{i:013x}'
+
+    def _ec2_DescribeInstances(self, region, params):
+        selected = self._filtered(params, 'instance-id', f'i-{self.regions.index(region):04x}', self.ec2_per_region)
+        if selected is not None:
+            indexes, next_token = selected, None
+        else:
+            indexes, next_token = self._page(self.ec2_per_region, params.get('NextToken'), params.get('MaxResults'))
+        reservations = [{
+            'ReservationId': f'r-{region}-{i:08x}',
+            'Instances': [{
+                'InstanceId': self.instance_id(region, i),
+                'State': {'Name': 'running' if i % 7 else 'stopped'},
+                'SecurityGroups': [{'GroupId': f'sg-{i % 25:08x}', 'GroupName': 'default'}],
+                'EbsOptimized': i % 2 == 0,
+                'BlockDeviceMappings': [{'DeviceName': '/dev/xvda',
+                                         'Ebs': {'VolumeId': f'vol-{self.regions.index(region):04x}{i:013x}'}}],
+            }],
+        } for i in indexes]
+        response = {'Reservations': reservations}
+        if next_token:
+            response['NextToken'] = next_token
+        return self._ok(response)
+
+    def _ec2_DescribeVolumes(self, region, params):
+        """One root volume per instance; every third is encrypted"""
+        selected = self._filtered(params, 'attachment.instance-id', f'i-{self.regions.index(region):04x}',
+                                  self.ec2_per_region)
+        if selected is not None:
+            indexes, next_token = selected, None
+        else:
+            indexes, next_token = self._page(self.ec2_per_region, params.get('NextToken'), params.get('MaxResults'))
+        volumes = [{
+            'VolumeId': f'vol-{self.regions.index(region):04x}{i:013x}',
+            'Encrypted': i % 3 == 0,
+            'Attachments': [{'InstanceId': self.instance_id(region, i), 'Device': '/dev/xvda'}],
+        } for i in indexes]
+        response = {'Volumes': volumes}
+        if next_token:
+            response['NextToken'] = next_token
+        return self._ok(response)
+
+    def _rds_DescribeDBInstances(self, region, params):
+        selected = self._filtered(params, 'db-instance-id', f'db-{region}-', self.rds_per_region)
+        if selected is not None:
+            indexes, next_token = selected, None
+        else:
+            indexes, next_token = self._page(self.rds_per_region, params.get('Marker'), params.get('MaxRecords'))
+        instances = [{
+            'DBInstanceIdentifier': f'db-{region}-{i:05d}',
+            'Engine': ('postgres', 'mysql', 'aurora-postgresql')[i % 3],
+            'StorageEncrypted': i % 4 != 0,
+            'BackupRetentionPeriod': (0, 1, 7, 14)[i % 4],
+            'MultiAZ': i % 2 == 0,
+        } for i in indexes]
+        response = {'DBInstances': instances}
+        if next_token:
+            response['Marker'] = next_token
+        return self._ok(response)
+
+    def bucket_name(self, i: int) -> str:
+        return f'synthetic-bucket-{i:06d}'
+
+    def bucket_region(self, i: int) -> str:
+        return self.regions[i % len(self.regions)]
+
+    def _s3_ListBuckets(self, region, params):
+        if params.get('Prefix'):
+            # Real listings filter by prefix before paging; prefix lookups here fit on one page
+            indexes = [i for i in range(self.bucket_count) if self.bucket_name(i).startswith(params['Prefix'])]
+            next_token = None
+        else:
+            indexes, next_token = self._page(self.bucket_count, params.get('ContinuationToken'),
+                                             params.get('MaxBuckets'))
+        buckets = [{
+            'Name': self.bucket_name(i),
+            'CreationDate': self._created,
+            'BucketRegion': self.bucket_region(i),
+        } for i in indexes]
+        response = {'Buckets': buckets, 'Owner': {'ID': 'synthetic'}}
+        if next_token:
+            response['ContinuationToken'] = next_token
+        return self._ok(response)
+
+    def _bucket_index(self, params) -> int:
+        return int(params['Bucket'].rsplit('-', 1)[1])
+
+    def _s3_GetBucketLocation(self, region, params):
+        location = self.bucket_region(self._bucket_index(params))
+        return self._ok({'LocationConstraint': None if location == 'us-east-1' else location})
+
+    def _s3_GetBucketEncryption(self, region, params):
+        i = self._bucket_index(params)
+        if i % 5 == 0:
+            return self._error('ServerSideEncryptionConfigurationNotFoundError', status=404)
+        return self._ok({'ServerSideEncryptionConfiguration': {'Rules': [{
+            'ApplyServerSideEncryptionByDefault': {'SSEAlgorithm': 'AES256'},
+        }]}})
+
+    def _s3_GetPublicAccessBlock(self, region, params):
+        i = self._bucket_index(params)
+        if self.access_denied_every and i % self.access_denied_every == 0:
+            return self._error('AccessDenied', status=403)
+        if i % 3 == 0:
+            return self._error('NoSuchPublicAccessBlockConfiguration', status=404)
+        return self._ok({'PublicAccessBlockConfiguration': {
+            'BlockPublicAcls': True,
+            'IgnorePublicAcls': True,
+            'BlockPublicPolicy': True,
+            'RestrictPublicBuckets': True,
+        }})
+
+    def _s3_GetBucketVersioning(self, region, params):
+        i = self._bucket_index(params)
+        return self._ok({'Status': 'Enabled'} if i % 2 else {})
+
+    def _s3_GetBucketLogging(self, region, params):
+        i = self._bucket_index(params)
+        if i % 4:
+            return self._ok({})
+        return self._ok({'LoggingEnabled': {'TargetBucket': self.bucket_name(0), 'TargetPrefix': 'logs/'}})
+
+    # Remediation calls are acknowledged without changing the synthetic account
+
+    def _s3_PutBucketEncryption(self, region, params):
+        self._bucket_index(params)
+        return self._ok({})
+
+    def _rds_ModifyDBInstance(self, region, params):
+        return self._ok({'DBInstance': {'DBInstanceIdentifier': params['DBInstanceIdentifier'],
+                                        'BackupRetentionPeriod': params.get('BackupRetentionPeriod', 0)}})
+
+    def _bedrock_runtime_InvokeModel(self, region, params):
+        text = verdict_responder(json.loads(params['body']))
+        payload = json.dumps({
+            'content': [{'type': 'text', 'text': text}],
+            'usage': {'input_tokens': len(params['body']) // 4, 'output_tokens': len(text) // 4},
+        }).encode('utf-8')
+        return self._ok({'body': StreamingBody(io.BytesIO(payload), len(payload)), 'contentType': 'application/json'})
@@ -1,52 +1,454 @@
 """AWS Lambda function for serverless compliance monitoring"""
 import json
-import boto3
-from agents.audit_agent import AuditAgent
-from agents.compliance_agent import ComplianceAgent
-from agents.policy_agent import PolicyAgent
+import os
+import threading
+import time
+
+from agents import metrics
+
+SCAN_FRAMEWORKS = ['GDPR', 'FISMA', 'EU_AI_ACT']
+SHARD_OPTIONS = ('incremental', 'batch')
+
+# Agents (and the boto3 clients they share) live for the whole execution
+# environment. Each is imported and built on first use by a request type that
+# needs it, so an 'enforce' request never pays for the audit agent's clients.
+# Creation is locked: in-process shard workers can ask for the same agent at once.
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_audit_agent():
+    if 'audit' not in _instances:
+        with _instances_lock:
+            if 'audit' not in _instances:
+                from agents.audit_agent import AuditAgent
+                _instances['audit'] = AuditAgent()
+    return _instances['audit']
+
+
+def get_compliance_agent():
+    if 'compliance' not in _instances:
+        with _instances_lock:
+            if 'compliance' not in _instances:
+                from agents.compliance_agent import ComplianceAgent
+                _instances['compliance'] = ComplianceAgent()
+    return _instances['compliance']
+
+
+def get_policy_agent():
+    if 'policy' not in _instances:
+        with _instances_lock:
+            if 'policy' not in _instances:
+                from agents.policy_agent import PolicyAgent
+                _instances['policy'] = PolicyAgent()
+    return _instances['policy']
+
+
+def get_fingerprint_store():
+    if 'fingerprints' not in _instances:
+        with _instances_lock:
+            if 'fingerprints' not in _instances:
+                from agents.fingerprint_store import FingerprintStore
+                _instances['fingerprints'] = FingerprintStore()
+    return _instances['fingerprints']
+
+
+def get_history_store(event):
+    """The scan history store, or None when the request does not record history
+
+    Recording defaults to on when SCAN_HISTORY_DB_PATH is set; a Lambda's /tmp
+    does not outlive its execution environment, so point it at shared storage.
+    """
+    if not event.get('record_history', bool(os.environ.get('SCAN_HISTORY_DB_PATH'))):
+        return None
+    if 'history' not in _instances:
+        with _instances_lock:
+            if 'history' not in _instances:
+                from agents.history_store import HistoryStore
+                _instances['history'] = HistoryStore()
+    return _instances['history']
+
+
+def get_rescan_ledger():
+    if 'rescans' not in _instances:
+        with _instances_lock:
+            if 'rescans' not in _instances:
+                from agents.change_events import RescanLedger
+                _instances['rescans'] = RescanLedger()
+    return _instances['rescans']
+
+
+def record_history(event, compliance_results, resources_scanned, source):
+    history = get_history_store(event)
+    if history is not None:
+        with metrics.span('lambda.phase', phase='history'):
+            history.record_scan(compliance_results, resources_scanned, source)
+
+
+def evaluate_resources(resources, event):
+    """Evaluate resources against SCAN_FRAMEWORKS
+
+    The rule engine decides first, pairs none of the framework's rules apply
+    to are NOT_APPLICABLE, stored verdicts cover unchanged resources and
+    Bedrock evaluates whatever is left. Returns the per-pair compliance
+    results and the counters reported in scan responses.
+    """
+    from agents.compliance_agent import not_applicable_verdict
+    from agents.fingerprint_store import fingerprint, resource_key
+    compliance_agent = get_compliance_agent()
+    
+    # Decide what the deterministic rules can in one vectorised pass
+    with metrics.span('lambda.phase', phase='rules'):
+        if hasattr(resources, 'without_errors'):
+            candidates = resources.without_errors()
+        else:
+            candidates = [resource for resource in resources if 'error' not in resource]
+        rule_verdicts = compliance_agent.rule_engine.evaluate(candidates, SCAN_FRAMEWORKS)
+    
+    # Reuse stored verdicts for resources whose configuration has not changed
+    incremental = event.get('incremental', True)
+    store = get_fingerprint_store()
+    verdicts = {}
+    pending = []
+    cache_hits = not_applicable = 0
+    with metrics.span('lambda.phase', phase='fingerprints'):
+        for index, resource in enumerate(candidates):
+            key = resource_key(resource)
+            resource_fingerprint = fingerprint(resource)
+            stored = store.get_verdicts(key, resource_fingerprint) if incremental else {}
+            missing = []
+            for framework in SCAN_FRAMEWORKS:
+                if (index, framework) in rule_verdicts:
+                    verdicts[(index, framework)] = dict(rule_verdicts[(index, framework)])
+                elif compliance_agent.applicability.rules_for(resource, framework) == []:
+                    not_applicable += 1
+                    verdicts[(index, framework)] = not_applicable_verdict()
+                elif framework in stored:
+                    cache_hits += 1
+                    verdicts[(index, framework)] = stored[framework]
+                else:
+                    missing.append(framework)
+            if missing:
+                pending.append((index, missing, key, resource_fingerprint))
+    cache_misses = sum(len(missing) for _, missing, _, _ in pending)
+    
+    # Evaluate the remaining pairs, packed into batched prompts by default
+    items = [(candidates[index], missing) for index, missing, _, _ in pending]
+    with metrics.span('lambda.phase', phase='model'):
+        if event.get('batch', True):
+            evaluated = compliance_agent.analyze_compliance_batch(items)
+        else:
+            futures = [{framework: compliance_agent.submit_analysis(resource, framework)
+                        for framework in missing} for resource, missing in items]
+            evaluated = [{framework: future.result() for framework, future in item_futures.items()}
+                         for item_futures in futures]
+    
+    new_verdicts = []
+    for (index, _, key, resource_fingerprint), results in zip(pending, evaluated):
+        for framework, result in results.items():
+            verdicts[(index, framework)] = result
+            if result.get('status') != 'ERROR':
+                new_verdicts.append((key, framework, resource_fingerprint, dict(result)))
+    
+    compliance_results = []
+    for index, resource in enumerate(candidates):
+        for framework in SCAN_FRAMEWORKS:
+            result = verdicts[(index, framework)]
+            result['resource'] = resource
+            result['framework'] = framework
+            compliance_results.append(result)
+    with metrics.span('lambda.phase', phase='store'):
+        store.put_verdicts(new_verdicts)
+    
+    return compliance_results, {
+        'rule_verdicts': len(rule_verdicts),
+        'not_applicable': not_applicable,
+        'cache_hits': cache_hits,
+        'cache_misses': cache_misses
+    }
+
+
+def new_scan_id():
+    return time.strftime('scan-%Y%m%dT%H%M%SZ', time.gmtime()) + f'-{os.getpid()}'
+
+
+def bounded_response(body, limit):
+    """A 200 response carrying body, or a 413 when it would exceed limit bytes"""
+    payload = json.dumps(body)
+    if len(payload) > limit:
+        return {
+            'statusCode': 413,
+            'body': json.dumps({
+                'error': f'Response of {len(payload)} bytes exceeds the {limit}-byte payload limit; '
+                         'set result_sink or RESULT_SINK_URI to write results to storage'
+            })
+        }
+    return {'statusCode': 200, 'body': payload}
+
+
+def record_shard_history(event, merged, source):
+    """Record a fanned-out scan from its merged results and the shard objects in a result sink
+
+    A scan with failed shards did not see every resource, so it is closed as
+    failed instead of retiring the verdicts of the resources in those shards.
+    """
+    history = get_history_store(event)
+    if history is None:
+        return
+    from agents.result_sink import read_results
+    with metrics.span('lambda.phase', phase='history'):
+        history_scan_id = history.start_scan(source)
+        completed = False
+        try:
+            history.add_results(history_scan_id, merged['compliance_results'])
+            for part in merged.get('result_parts', []):
+                history.add_results(history_scan_id, read_results(part['uri']))
+            completed = not merged['failed_shards']
+        finally:
+            history.finish_scan(history_scan_id, merged['resources_scanned'],
+                                status='completed' if completed else 'failed')
+
+
+def shard_scan_response(event, merged, source):
+    """Record and return merged shard results; results in a sink are returned as their pointers"""
+    from agents.fanout import RESPONSE_PAYLOAD_LIMIT
+    from agents.result_format import format_results
+    record_shard_history(event, merged, source)
+    compliance_results = merged.pop('compliance_results')
+    if 'result_parts' not in merged:
+        with metrics.span('lambda.phase', phase='format'):
+            merged.update(format_results(compliance_results, event.get('result_format', 'records')))
+    return bounded_response(dict({'message': 'Compliance scan completed'}, **merged), RESPONSE_PAYLOAD_LIMIT)
+
+
+def scan_to_sink(resources, event, location):
+    """Evaluate resources chunk by chunk, streaming results to a result sink
+
+    Only one chunk of results is held at a time; the response carries counts,
+    a per-framework summary and a pointer to the gzip-compressed NDJSON object.
+    """
+    from agents.result_sink import open_result_sink
+    scan_id = event.get('scan_id') or new_scan_id()
+    chunk_size = int(os.environ.get('RESULT_SINK_CHUNK_SIZE', 500))
+    stats = {'rule_verdicts': 0, 'not_applicable': 0, 'cache_hits': 0, 'cache_misses': 0}
+    history = get_history_store(event)
+    history_scan_id = history.start_scan('scan') if history is not None else None
+    
+    # A scan that fails part way is closed as failed so it never becomes the latest scan
+    evaluated, completed = 0, False
+    try:
+        with open_result_sink(location, scan_id) as sink:
+            for start in range(0, len(resources), chunk_size):
+                chunk = resources[start:start + chunk_size]
+                compliance_results, chunk_stats = evaluate_resources(chunk, event)
+                for key, value in chunk_stats.items():
+                    stats[key] += value
+                with metrics.span('lambda.phase', phase='sink'):
+                    for result in compliance_results:
+                        sink.write(result)
+                if history is not None:
+                    with metrics.span('lambda.phase', phase='history'):
+                        history.add_results(history_scan_id, compliance_results)
+                evaluated += len(chunk)
+        completed = True
+    finally:
+        if history is not None:
+            history.finish_scan(history_scan_id, evaluated, status='completed' if completed else 'failed')
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Compliance scan completed',
+            'resources_scanned': len(resources),
+            **stats,
+            'summary': sink.counts(),
+            'results': sink.pointer
+        })
+    }
+
+
+def resolve_request_type(event):
+    """The event's request type; EventBridge, CloudTrail and SQS payloads invoke 'rescan' directly"""
+    request_type = event.get('request_type')
+    if request_type is None:
+        from agents.change_events import is_change_event
+        request_type = 'rescan' if is_change_event(event) else 'scan'
+    return request_type
+
 
 def lambda_handler(event, context):
-    """Main Lambda handler for compliance monitoring"""
+    """Main Lambda handler for compliance monitoring
+
+    While agents.metrics is recording (ENABLE_METRICS), the response body
+    carries the invocation's spans and counters under 'metrics', and the same
+    summary goes to the JSON-lines and Prometheus sinks that are configured.
+    """
+    if not metrics.enabled():
+        return handle_request(event, context)
     
+    request_type = resolve_request_type(event)
+    with metrics.collect() as invocation:
+        with metrics.span('lambda.invocation', request_type=request_type):
+            response = handle_request(event, context)
+        metrics.count('lambda_invocations', request_type=request_type, status=response['statusCode'])
+    summary = invocation.summary()
     try:
-        # Initialize agents
-        audit_agent = AuditAgent()
-        compliance_agent = ComplianceAgent()
-        policy_agent = PolicyAgent()
-        
-        # Get request type
-        request_type = event.get('request_type', 'scan')
+        metrics.export(summary, request_type=request_type, request_id=getattr(context, 'aws_request_id', None))
+    except OSError as e:
+        summary['export_error'] = str(e)
+    
+    body = json.loads(response['body'])
+    body['metrics'] = summary
+    response['body'] = json.dumps(body)
+    return response
+
+
+def handle_request(event, context):
+    """Dispatch one request by type"""
+    
+    try:
+        request_type = resolve_request_type(event)
         
         if request_type == 'scan':
             # Scan AWS resources
-            resources = audit_agent.get_all_resources()
+            with metrics.span('lambda.phase', phase='discover'):
+                resources = get_audit_agent().get_all_resources()
             
-            # Analyze compliance for each resource
-            compliance_results = []
-            for resource in resources:
-                if 'error' not in resource:
-                    # Check against multiple frameworks
-                    for framework in ['GDPR', 'FISMA', 'EU_AI_ACT']:
-                        result = compliance_agent.analyze_compliance(resource, framework)
-                        result['resource'] = resource
-                        result['framework'] = framework
-                        compliance_results.append(result)
+            sink_location = event.get('result_sink', os.environ.get('RESULT_SINK_URI'))
+            if sink_location:
+                return scan_to_sink(resources, event, sink_location)
             
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'message': 'Compliance scan completed',
+            from agents.result_format import format_results
+            compliance_results, stats = evaluate_resources(resources, event)
+            record_history(event, compliance_results, len(resources), 'scan')
+            
+            with metrics.span('lambda.phase', phase='format'):
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({
+                        'message': 'Compliance scan completed',
+                        'resources_scanned': len(resources),
+                        **stats,
+                        **format_results(compliance_results, event.get('result_format', 'records'))
+                    })
+                }
+        
+        elif request_type == 'coordinate':
+            # Discover resources, then fan evaluation out as scan_shard payloads
+            from agents.fanout import (STATE_PAYLOAD_LIMIT, LambdaExecutor, LocalExecutor, aggregate, plan_shards,
+                                       shard_object_name)
+            with metrics.span('lambda.phase', phase='discover'):
+                resources = get_audit_agent().get_all_resources()
+            shard_size = int(event.get('shard_size', os.environ.get('SCAN_SHARD_SIZE', 200)))
+            options = {key: event[key] for key in SHARD_OPTIONS if key in event}
+            # With a result sink, workers write their results there and return pointers
+            sink_location = event.get('result_sink', os.environ.get('RESULT_SINK_URI'))
+            if sink_location:
+                options.update(result_sink=sink_location, scan_id=event.get('scan_id') or new_scan_id())
+            shards = plan_shards(resources, shard_size, **options)
+            
+            dispatch = event.get('dispatch', 'local')
+            if dispatch == 'plan':
+                # Shard payloads for a Step Functions Map state; its results go to 'aggregate'
+                if sink_location:
+                    from agents.result_sink import open_result_sink
+                    for shard in shards:
+                        name = shard_object_name(shard['scan_id'], shard['shard_id'], 'resources')
+                        with open_result_sink(sink_location, name) as sink:
+                            for resource in shard.pop('resources'):
+                                sink.write(resource)
+                        shard['resources_uri'] = sink.pointer['uri']
+                return bounded_response({
+                    'message': 'Scan shards planned',
                     'resources_scanned': len(resources),
-                    'compliance_results': compliance_results
-                })
-            }
+                    'shards': shards
+                }, STATE_PAYLOAD_LIMIT)
+            
+            max_workers = int(event.get('max_workers', os.environ.get('SCAN_SHARD_CONCURRENCY', 4)))
+            if dispatch == 'lambda':
+                executor = LambdaExecutor(max_workers=max_workers)
+            else:
+                # In-process shards report into this invocation's metrics
+                executor = LocalExecutor(handle_request, max_workers=max_workers)
+            with metrics.span('lambda.phase', phase='shards'):
+                merged = aggregate(executor.map(shards))
+            merged['resources_scanned'] = len(resources)
+            return shard_scan_response(event, merged, 'coordinate')
+        
+        elif request_type == 'scan_shard':
+            # Worker: evaluate one shard planned by the coordinator
+            from agents.fanout import RESPONSE_PAYLOAD_LIMIT, shard_object_name
+            if 'resources_uri' in event:
+                from agents.result_sink import read_results
+                resources = list(read_results(event['resources_uri']))
+            else:
+                resources = event.get('resources', [])
+            compliance_results, stats = evaluate_resources(resources, event)
+            body = {'shard_id': event.get('shard_id'), 'resources_scanned': len(resources), **stats}
+            
+            if event.get('result_sink'):
+                from agents.result_sink import open_result_sink
+                name = shard_object_name(event.get('scan_id') or new_scan_id(), event.get('shard_id') or 'shard')
+                with metrics.span('lambda.phase', phase='sink'):
+                    with open_result_sink(event['result_sink'], name) as sink:
+                        for result in compliance_results:
+                            sink.write(result)
+                body.update(summary=sink.counts(), results=sink.pointer)
+            else:
+                body['compliance_results'] = compliance_results
+            return bounded_response(body, RESPONSE_PAYLOAD_LIMIT)
+        
+        elif request_type == 'aggregate':
+            # Merge scan_shard results collected by a Step Functions Map state
+            from agents.fanout import aggregate
+            partials = [json.loads(partial['body']) if 'body' in partial else partial
+                        for partial in event.get('partials', [])]
+            return shard_scan_response(event, aggregate(partials), 'aggregate')
+        
+        elif request_type == 'rescan':
+            # Rescan and re-evaluate only the resources named by change events
+            from agents.change_events import coalesce
+            from agents.result_format import format_results
+            ledger = get_rescan_ledger()
+            targets, event_stats = coalesce(event, ledger)
+            
+            rescanned_at = time.time()
+            with metrics.span('lambda.phase', phase='discover'):
+                resources = get_audit_agent().scan_targets(targets)
+            compliance_results, stats = evaluate_resources(resources, event)
+            ledger.mark(targets, rescanned_at)
+            if targets:
+                record_history(event, compliance_results, len(resources), 'rescan')
+            
+            # Latency from the oldest change in the batch to its verdict
+            change_to_verdict = round(time.time() - min(targets.values()), 3) if targets else None
+            # Targets a rescan could not find were deleted (or are not visible to this role)
+            found = {(resource['resource_type'].lower(), resource['resource_id'])
+                     for resource in resources.without_errors()}
+            not_found = [f'{service}:{region}:{resource_id}' for service, region, resource_id in targets
+                         if (service, resource_id) not in found]
+            
+            with metrics.span('lambda.phase', phase='format'):
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({
+                        'message': 'Targeted rescan completed',
+                        **event_stats,
+                        'resources_rescanned': len(resources),
+                        'not_found': not_found,
+                        'max_change_to_verdict_seconds': change_to_verdict,
+                        **stats,
+                        **format_results(compliance_results, event.get('result_format', 'records'))
+                    })
+                }
         
         elif request_type == 'enforce':
             # Enforce policies
             resource = event.get('resource', {})
             framework = event.get('framework', 'GDPR')
             
-            enforcement_result = policy_agent.enforce_policy(resource, framework)
+            with metrics.span('lambda.phase', phase='enforce'):
+                enforcement_result = get_policy_agent().enforce_policy(resource, framework)
             
             return {
                 'statusCode': 200,
@@ -56,10 +458,52 @@ def lambda_handler(event, context):
                 })
             }
         
+        elif request_type == 'remediate':
+            # Plan (the default, a dry run) or apply remediation for violations or scan results
+            violations = event.get('violations') or event.get('results', [])
+            dry_run = event.get('dry_run', True)
+            with metrics.span('lambda.phase', phase='remediate'):
+                outcome = get_policy_agent().remediate_batch(violations, dry_run=dry_run)
+            
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Remediation planned' if dry_run else 'Remediation completed',
+                    **outcome
+                })
+            }
+        
         elif request_type == 'report':
             # Generate compliance report
             violations = event.get('violations', [])
-            report = compliance_agent.generate_compliance_report(violations)
+            mode = event.get('report_mode', 'auto')
+            compliance_agent = get_compliance_agent()
+            
+            if event.get('stream', False):
+                # Python Lambda responses cannot be streamed, so return the
+                # chunks in arrival order along with time-to-first-token
+                start = time.perf_counter()
+                chunks = []
+                first_token_ms = None
+                with metrics.span('lambda.phase', phase='report'):
+                    for chunk in compliance_agent.generate_compliance_report_stream(violations, mode):
+                        if first_token_ms is None:
+                            first_token_ms = round((time.perf_counter() - start) * 1000, 1)
+                        chunks.append(chunk)
+                
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({
+                        'message': 'Compliance report generated',
+                        'report': ''.join(chunks),
+                        'chunks': chunks,
+                        'time_to_first_token_ms': first_token_ms,
+                        'total_ms': round((time.perf_counter() - start) * 1000, 1)
+                    })
+                }
+            
+            with metrics.span('lambda.phase', phase='report'):
+                report = compliance_agent.generate_compliance_report(violations, mode)
             
             return {
                 'statusCode': 200,
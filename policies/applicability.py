@@ -0,0 +1,45 @@
+"""Index of which framework rules can apply to a resource
+
+Built once from ``COMPLIANCE_FRAMEWORKS`` and ``RULE_SCOPES``: per framework,
+the rules relevant to each resource type in framework order, with any
+attribute conditions. Lookups are a dict access plus the attribute checks,
+so prompts carry only the rules a resource can be judged on, and a
+resource/framework pair with none needs no model call at all.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from policies.frameworks import COMPLIANCE_FRAMEWORKS, RULE_SCOPES
+
+ANY_TYPE = '*'
+
+
+class ApplicabilityIndex:
+    """Applicable rules by framework and resource type"""
+
+    def __init__(self, frameworks: Dict[str, Dict] = COMPLIANCE_FRAMEWORKS,
+                 scopes: Dict[str, Dict[str, Dict]] = RULE_SCOPES):
+        self._index: Dict[str, Dict[str, List[Tuple[str, Tuple[str, ...]]]]] = {}
+        for framework, definition in frameworks.items():
+            framework_scopes = scopes.get(framework, {})
+            rules = [(rule, framework_scopes.get(rule, {})) for rule in definition.get('rules', [])]
+            types = {resource_type for _, scope in rules for resource_type in scope.get('resource_types') or []}
+            by_type = {}
+            for resource_type in types | {ANY_TYPE}:
+                by_type[resource_type] = [
+                    (rule, tuple(scope.get('attributes') or ()))
+                    for rule, scope in rules
+                    if scope.get('resource_types') is None or resource_type in scope['resource_types']
+                ]
+            self._index[framework] = by_type
+
+    def rules_for(self, resource: Dict, framework: str) -> Optional[List[str]]:
+        """The framework's rules that apply to the resource, or None if the framework is not indexed"""
+        by_type = self._index.get(framework)
+        if by_type is None:
+            return None
+        candidates = by_type.get(resource.get('resource_type'), by_type[ANY_TYPE])
+        return [rule for rule, attributes in candidates
+                if not attributes or any(resource.get(attribute) is not None for attribute in attributes)]
+
+
+INDEX = ApplicabilityIndex()
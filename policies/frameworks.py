@@ -52,4 +52,53 @@ POLICY_VIOLATIONS = [
     {"framework": "FISMA", "resource": "EC2 Instance", "violation": "Missing MFA", "severity": "CRITICAL"},
     {"framework": "EU_AI_ACT", "resource": "SageMaker Model", "violation": "No bias testing", "severity": "HIGH"},
     {"framework": "ISO_42001", "resource": "Lambda Function", "violation": "Missing AI documentation", "severity": "MEDIUM"}
-]
\ No newline at end of file
+]
+
+# Scanned resource attributes each framework's rules can speak to; prompts
+# project resources down to these (plus identity fields) to save input tokens
+FRAMEWORK_FIELDS = {
+    "GDPR": ["encrypted", "encryption_algorithm", "backup_retention", "public_access_blocked",
+             "versioning", "logging_enabled"],
+    "FISMA": ["state", "encrypted", "mfa_enabled", "multi_az", "backup_retention", "security_groups",
+              "public_access_blocked", "logging_enabled"],
+    "EU_AI_ACT": ["state", "engine", "encrypted", "logging_enabled"],
+    "ISO_42001": ["state", "engine", "versioning", "logging_enabled"]
+}
+
+# Resource types that are AI systems in the sense of the EU AI Act and ISO/IEC 42001
+AI_RESOURCE_TYPES = ["SageMaker", "Bedrock"]
+
+# Where each framework rule can apply: the resource types it concerns (None
+# for any type; an empty list for organisational rules no resource's
+# configuration can evidence) and, optionally, attributes of which the
+# resource must report at least one. Rules without an entry apply everywhere.
+RULE_SCOPES = {
+    "GDPR": {
+        "Personal data must be encrypted at rest and in transit": {"resource_types": ["EC2", "RDS", "S3"]},
+        "Data retention policies must be defined and enforced": {"resource_types": ["RDS", "S3"]},
+        "User consent must be obtained for data processing": {"resource_types": []},
+        "Data breach notifications within 72 hours": {"resource_types": None, "attributes": ["logging_enabled"]},
+        "Right to be forgotten must be implemented": {"resource_types": ["RDS", "S3"]}
+    },
+    "FISMA": {
+        "Multi-factor authentication required": {"resource_types": ["IAM"]},
+        "Regular security assessments mandatory": {"resource_types": None},
+        "Incident response procedures documented": {"resource_types": []},
+        "Access controls based on least privilege": {"resource_types": ["IAM", "S3", "EC2"]},
+        "Continuous monitoring implemented": {"resource_types": None}
+    },
+    "EU_AI_ACT": {
+        "High-risk AI systems require conformity assessment": {"resource_types": AI_RESOURCE_TYPES},
+        "AI system documentation and transparency required": {"resource_types": AI_RESOURCE_TYPES},
+        "Human oversight for automated decision-making": {"resource_types": AI_RESOURCE_TYPES},
+        "Bias testing and mitigation implemented": {"resource_types": AI_RESOURCE_TYPES},
+        "AI system registration in EU database": {"resource_types": AI_RESOURCE_TYPES}
+    },
+    "ISO_42001": {
+        "AI governance framework established": {"resource_types": AI_RESOURCE_TYPES},
+        "Risk management for AI systems": {"resource_types": AI_RESOURCE_TYPES},
+        "AI system lifecycle management": {"resource_types": AI_RESOURCE_TYPES},
+        "Stakeholder engagement documented": {"resource_types": []},
+        "Continuous improvement processes": {"resource_types": []}
+    }
+}
@@ -0,0 +1,165 @@
+"""Deterministic, machine-checkable compliance rules
+
+The rules in ``COMPLIANCE_FRAMEWORKS`` are free text and need a model to
+interpret. The attribute-based subset (encryption, backup retention,
+multi-AZ, MFA) can be checked directly against scanned resource attributes;
+a failed check is a definitive violation, so those resource/framework pairs
+never need a Bedrock call.
+"""
+import operator
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from policies.frameworks import COMPLIANCE_FRAMEWORKS
+
+SEVERITY_ORDER = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+
+OPERATORS = {
+    'eq': operator.eq,
+    'ge': operator.ge,
+}
+
+MACHINE_RULES = [
+    {
+        "id": "encryption_at_rest",
+        "frameworks": ["GDPR"],
+        "rule": "Personal data must be encrypted at rest and in transit",
+        "resource_types": ["EC2", "RDS", "S3"],
+        "attribute": "encrypted",
+        "check": ("eq", True),
+        "severity": "HIGH",
+        "current_state": "Not encrypted",
+        "required_action": "Enable encryption",
+        "action_type": "encryption"
+    },
+    {
+        "id": "backup_retention",
+        "frameworks": ["GDPR", "FISMA"],
+        "rule": "Automated backups retained for at least 7 days",
+        "resource_types": ["RDS"],
+        "attribute": "backup_retention",
+        "check": ("ge", 7),
+        "severity": "MEDIUM",
+        "current_state": "Backup retention below 7 days",
+        "required_action": "Set backup retention to at least 7 days",
+        "action_type": "backup"
+    },
+    {
+        "id": "multi_az",
+        "frameworks": ["FISMA"],
+        "rule": "Production databases deployed across multiple availability zones",
+        "resource_types": ["RDS"],
+        "attribute": "multi_az",
+        "check": ("eq", True),
+        "severity": "MEDIUM",
+        "current_state": "Single-AZ deployment",
+        "required_action": "Enable Multi-AZ deployment",
+        "action_type": "manual"
+    },
+    {
+        "id": "mfa_required",
+        "frameworks": ["FISMA"],
+        "rule": "Multi-factor authentication required",
+        "resource_types": ["IAM"],
+        "attribute": "mfa_enabled",
+        "check": ("eq", True),
+        "severity": "CRITICAL",
+        "current_state": "MFA not enabled",
+        "required_action": "Configure MFA",
+        "action_type": "mfa"
+    }
+]
+
+
+def _passes(rule: Dict, value) -> bool:
+    op, expected = rule['check']
+    return bool(OPERATORS[op](value, expected))
+
+
+def _violation(rule: Dict) -> Dict:
+    return {
+        "rule_id": rule['id'],
+        "rule": rule['rule'],
+        "severity": rule['severity'],
+        "current_state": rule['current_state'],
+        "required_action": rule['required_action'],
+        "action_type": rule['action_type']
+    }
+
+
+def _verdict(framework: str, violations: List[Dict]) -> Dict:
+    """Build a NON_COMPLIANT assessment in the shape ComplianceAgent returns"""
+    risk_levels = [v['severity'] for v in violations]
+    risk_levels.append(COMPLIANCE_FRAMEWORKS.get(framework, {}).get('risk_level', 'LOW'))
+    return {
+        "status": "NON_COMPLIANT",
+        "violations": [v['rule'] for v in violations],
+        "recommendations": [v['required_action'] for v in violations],
+        "risk_level": max(risk_levels, key=SEVERITY_ORDER.index),
+        "rule_violations": violations,
+        "source": "rules"
+    }
+
+
+class RuleEngine:
+    """Evaluates MACHINE_RULES, in bulk over a resource table or for a single resource
+
+    Only failed checks produce a verdict. Resources that pass every applicable
+    check, or whose attributes are unknown, are left undecided because the
+    framework's free-text rules still need a model to assess them.
+    """
+
+    def __init__(self, rules: Sequence[Dict] = MACHINE_RULES):
+        self.rules = list(rules)
+
+    def _rules_for(self, framework: str) -> List[Dict]:
+        return [rule for rule in self.rules if framework in rule['frameworks']]
+
+    def check(self, resource: Dict, framework: str) -> Optional[Dict]:
+        """Verdict for one resource, or None if the rules cannot decide it"""
+        violations = []
+        for rule in self._rules_for(framework):
+            if resource.get('resource_type') not in rule['resource_types']:
+                continue
+            value = resource.get(rule['attribute'])
+            if value is not None and not _passes(rule, value):
+                violations.append(_violation(rule))
+        return _verdict(framework, violations) if violations else None
+
+    def evaluate(self, resources, frameworks: Sequence[str]) -> Dict[Tuple[int, str], Dict]:
+        """Decide every (resource index, framework) pair the rules can, vectorised over a DataFrame
+
+        ``resources`` is a list of resource dicts, a ResourceTable or a DataFrame
+        with one row per resource. Pairs missing from the result must go to the model.
+        """
+        # Imported here so request paths that never bulk-evaluate skip loading pandas
+        import pandas as pd
+        
+        if hasattr(resources, 'to_dataframe'):
+            table = resources.to_dataframe()
+        else:
+            table = resources if isinstance(resources, pd.DataFrame) else pd.DataFrame(list(resources))
+        if table.empty or 'resource_type' not in table:
+            return {}
+        table = table.reset_index(drop=True)
+
+        failures = {}
+        for rule in self.rules:
+            if rule['attribute'] not in table:
+                continue
+            column = table[rule['attribute']]
+            op, expected = rule['check']
+            known = column.notna() & table['resource_type'].isin(rule['resource_types'])
+            if not known.any():
+                continue
+            failed = known & ~OPERATORS[op](column[known], expected).astype(bool).reindex(table.index, fill_value=True)
+            failures[rule['id']] = failed.to_numpy().nonzero()[0]
+
+        decided = {}
+        for framework in frameworks:
+            violations_by_index = {}
+            for rule in self._rules_for(framework):
+                for index in failures.get(rule['id'], ()):
+                    violations_by_index.setdefault(int(index), []).append(_violation(rule))
+            for index, violations in violations_by_index.items():
+                decided[(index, framework)] = _verdict(framework, violations)
+        return decided
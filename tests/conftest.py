@@ -0,0 +1,115 @@
+"""Shared fixtures: a synthetic AWS account and an isolated environment per test
+
+``SyntheticAccount`` (see ``benchmarks/synthetic_account.py``) answers every
+boto3 call from a deterministic in-memory account through botocore's
+before-call hook, so scans page through thousands of resources per region
+without credentials or network access.
+"""
+import json
+
+import boto3
+import pytest
+
+from agents.audit_agent import AuditAgent
+from agents.bedrock_pool import BedrockPool
+from agents.clients import reset_clients
+from agents.compliance_agent import ComplianceAgent
+from agents.fingerprint_store import FingerprintStore
+from agents.history_store import HistoryStore
+from agents.policy_agent import PolicyAgent
+from agents.response_cache import ResponseCache
+from agents.s3_probes import BucketProbeCache
+from benchmarks.stub_bedrock import StubBedrock, verdict_responder
+from benchmarks.synthetic_account import SyntheticAccount
+
+REGIONS = ('us-east-1', 'eu-west-1', 'us-west-2')
+
+# Environment the agents read that must not leak in from the host
+ISOLATED_VARIABLES = ('ENFORCE_AI_REGIONS', 'MODEL_ROUTES', 'RESULT_SINK_URI', 'SCAN_HISTORY_DB_PATH',
+                      'RESPONSE_CACHE_PATH', 'REMEDIATION_RATE_LIMITS', 'METRICS_JSONL_PATH',
+                      'METRICS_PROMETHEUS_FILE', 'WORKER_FUNCTION_NAME')
+
+
+@pytest.fixture(autouse=True)
+def aws_environment(monkeypatch, tmp_path):
+    """Fake credentials, a default region and per-test SQLite stores"""
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('FINGERPRINT_DB_PATH', str(tmp_path / 'fingerprints.db'))
+    monkeypatch.setenv('REMEDIATION_DB_PATH', str(tmp_path / 'remediation.db'))
+    monkeypatch.setenv('ENABLE_RESPONSE_CACHE', 'false')
+    for name in ISOLATED_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(boto3, 'DEFAULT_SESSION', None)
+    reset_clients()
+    yield
+    reset_clients()
+
+
+@pytest.fixture
+def synthetic_account():
+    """Three regions of 2000 EC2 and 500 RDS instances each, and 1000 buckets spread over them"""
+    return SyntheticAccount(regions=REGIONS, ec2_per_region=2000, rds_per_region=500, buckets=1000)
+
+
+@pytest.fixture
+def account_session(synthetic_account, monkeypatch):
+    """Make the synthetic account boto3's default session, so shared clients are served by it"""
+    session = synthetic_account.session()
+    monkeypatch.setattr(boto3, 'DEFAULT_SESSION', session)
+    reset_clients()
+    return session
+
+
+class ModelStub(StubBedrock):
+    """Answers with a fixed text per model id and records which models were called"""
+
+    def __init__(self, texts):
+        super().__init__()
+        self.texts = texts
+        self.models = []
+
+    def invoke_model(self, modelId, body, **kwargs):
+        self.models.append(modelId)
+        self.text = self.texts[modelId]
+        return super().invoke_model(modelId, body, **kwargs)
+
+
+@pytest.fixture
+def small_account(monkeypatch):
+    """A small synthetic account, made boto3's default session, for end-to-end Lambda requests"""
+    account = SyntheticAccount(regions=REGIONS[:2], ec2_per_region=40, rds_per_region=12, buckets=20)
+    monkeypatch.setattr(boto3, 'DEFAULT_SESSION', account.session())
+    reset_clients()
+    return account
+
+
+@pytest.fixture
+def bedrock():
+    return StubBedrock(responder=verdict_responder)
+
+
+@pytest.fixture
+def lambda_module(small_account, bedrock, tmp_path, monkeypatch):
+    """lambda_function with its agents served by ``small_account`` and ``bedrock``, and per-test stores"""
+    import lambda_function
+
+    compliance_agent = ComplianceAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool())
+    compliance_agent.bedrock = bedrock
+    policy_agent = PolicyAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool())
+    policy_agent.bedrock = bedrock
+    monkeypatch.setattr(lambda_function, '_instances', {
+        'audit': AuditAgent(regions=small_account.regions, bucket_cache=BucketProbeCache(ttl=0)),
+        'compliance': compliance_agent,
+        'policy': policy_agent,
+        'fingerprints': FingerprintStore(str(tmp_path / 'fingerprints.db')),
+        'history': HistoryStore(str(tmp_path / 'history.db')),
+    })
+    return lambda_function
+
+
+def invoke(lambda_module, event):
+    """Call the Lambda handler and return the status code and decoded body"""
+    response = lambda_module.lambda_handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
@@ -0,0 +1,72 @@
+"""AuditAgent scans against the synthetic account"""
+import math
+from collections import Counter
+
+from agents.audit_agent import AuditAgent
+from agents.s3_probes import BucketProbeCache
+from policies.rules import RuleEngine
+
+
+def scan(account, session=None):
+    agent = AuditAgent(regions=account.regions, session=session, bucket_cache=BucketProbeCache(ttl=0))
+    return agent.get_all_resources()
+
+
+def test_get_all_resources_pages_through_every_resource_in_every_region(synthetic_account, account_session):
+    resources = scan(synthetic_account).to_records()
+
+    assert len(resources) == synthetic_account.expected_resources
+    assert not [resource for resource in resources if 'error' in resource]
+    by_type_and_region = Counter((resource['resource_type'], resource['region']) for resource in resources)
+    for region in synthetic_account.regions:
+        assert by_type_and_region[('EC2', region)] == synthetic_account.ec2_per_region
+        assert by_type_and_region[('RDS', region)] == synthetic_account.rds_per_region
+    assert sum(count for (resource_type, _), count in by_type_and_region.items()
+               if resource_type == 'S3') == synthetic_account.bucket_count
+    assert len({(resource['resource_type'], resource['resource_id']) for resource in resources}) == len(resources)
+
+
+def test_every_page_is_requested_once(synthetic_account, account_session):
+    scan(synthetic_account)
+
+    regions = len(synthetic_account.regions)
+    page_size = synthetic_account.page_size
+    calls = synthetic_account.calls
+    assert calls['ec2:DescribeInstances'] == regions * math.ceil(synthetic_account.ec2_per_region / page_size)
+    assert calls['rds:DescribeDBInstances'] == regions * math.ceil(synthetic_account.rds_per_region / page_size)
+    assert calls['s3:ListBuckets'] == math.ceil(synthetic_account.bucket_count / page_size)
+
+
+def test_explicit_session_scans_the_same_resources(synthetic_account):
+    resources = scan(synthetic_account, session=synthetic_account.session())
+
+    assert len(resources) == synthetic_account.expected_resources
+
+
+def test_ec2_encryption_comes_from_attached_ebs_volumes(synthetic_account, account_session):
+    agent = AuditAgent(regions=synthetic_account.regions)
+    instances = agent.scan_ec2_instances('eu-west-1').to_records()
+
+    # The synthetic account encrypts every third root volume and EBS-optimises every second instance
+    assert [instance['encrypted'] for instance in instances[:6]] == [True, False, False, True, False, False]
+    assert synthetic_account.calls['ec2:DescribeVolumes'] == math.ceil(synthetic_account.ec2_per_region /
+                                                                       synthetic_account.page_size)
+
+
+def test_targeted_rescan_reads_only_the_attached_volumes(synthetic_account, account_session):
+    ids = [synthetic_account.instance_id('us-east-1', i) for i in (0, 1, 3)]
+    instances = AuditAgent(regions=synthetic_account.regions).scan_ec2_instances('us-east-1', instance_ids=ids)
+
+    assert {instance['resource_id']: instance['encrypted'] for instance in instances} == \
+        {ids[0]: True, ids[1]: False, ids[2]: True}
+    assert synthetic_account.calls['ec2:DescribeVolumes'] == 1
+
+
+def test_unreadable_volumes_leave_encryption_unknown(synthetic_account, account_session, monkeypatch):
+    monkeypatch.setattr(synthetic_account, '_ec2_DescribeVolumes',
+                        lambda region, params: synthetic_account._error('UnauthorizedOperation', status=403))
+    instances = AuditAgent(regions=synthetic_account.regions).scan_ec2_instances('us-east-1').to_records()
+
+    assert len(instances) == synthetic_account.ec2_per_region
+    assert all(instance['encrypted'] is None for instance in instances)
+    assert RuleEngine().check(instances[1], 'GDPR') is None
@@ -0,0 +1,55 @@
+"""Targeted rescans driven by the change-event fixture"""
+import json
+import time
+
+import pytest
+
+from benchmarks.bench_change_events import FIXTURE, restamp
+from conftest import invoke
+
+RESCANNED = [
+    ('EC2', 'eu-west-1', 'i-00010000000000007'),
+    ('EC2', 'us-east-1', 'i-0000000000000000c'),
+    ('RDS', 'us-east-1', 'db-us-east-1-00003'),
+    ('S3', 'us-east-1', 'synthetic-bucket-000004'),
+]
+
+
+@pytest.fixture
+def fixture():
+    with open(FIXTURE) as f:
+        return json.load(f)
+
+
+def rescanned(body):
+    return sorted({(result['resource']['resource_type'], result['resource']['region'],
+                    result['resource']['resource_id']) for result in body['compliance_results']})
+
+
+def test_replayed_events_rescan_only_the_changed_resources(lambda_module, small_account, fixture):
+    status, body = invoke(lambda_module, restamp(fixture, time.time()))
+
+    assert status == 200
+    assert rescanned(body) == RESCANNED
+    assert (body['events'], body['ignored'], body['coalesced'], body['covered']) == (9, 2, 2, 0)
+    assert body['resources_rescanned'] == len(RESCANNED)
+    # The terminated instance is gone
+    assert body['not_found'] == ['ec2:us-east-1:i-00000ffffffffffff']
+    calls = small_account.calls
+    assert calls['ec2:DescribeInstances'] == 2
+    assert calls['rds:DescribeDBInstances'] == 1
+    # Named buckets are found with one prefix-filtered listing each, not a full listing
+    assert calls['s3:ListBuckets'] == 1
+
+
+def test_events_older_than_the_last_rescan_are_covered(lambda_module, small_account, fixture):
+    invoke(lambda_module, restamp(fixture, time.time()))
+    calls = sum(small_account.calls.values())
+
+    status, body = invoke(lambda_module, restamp(fixture, time.time() - 60))
+
+    assert status == 200
+    assert body['covered'] == 7
+    assert body['resources_rescanned'] == 0
+    assert body['compliance_results'] == []
+    assert sum(small_account.calls.values()) == calls
@@ -0,0 +1,74 @@
+"""Sharded coordinate, scan_shard and aggregate requests, inline and through a result sink"""
+import json
+
+from agents import fanout
+from agents.result_sink import read_results
+from conftest import invoke
+
+
+def pairs(results):
+    return sorted((result['resource']['resource_id'], result['framework']) for result in results)
+
+
+def test_shards_write_to_the_result_sink_and_return_pointers(lambda_module, small_account, tmp_path):
+    status, inline = invoke(lambda_module, {'request_type': 'coordinate', 'shard_size': 10})
+    assert status == 200
+
+    status, body = invoke(lambda_module, {'request_type': 'coordinate', 'shard_size': 10, 'scan_id': 'fan',
+                                          'result_sink': str(tmp_path), 'record_history': True})
+
+    assert status == 200
+    assert 'compliance_results' not in body
+    assert len(body['result_parts']) == body['shards'] > 1
+    results = [result for part in body['result_parts'] for result in read_results(part['uri'])]
+    assert pairs(results) == pairs(inline['compliance_results'])
+    assert sum(part['records'] for part in body['result_parts']) == len(results)
+    assert sum(sum(statuses.values()) for statuses in body['summary'].values()) == len(results)
+    (latest,) = lambda_module._instances['history'].latest_scans()
+    assert (latest['resources'], latest['verdicts']) == (small_account.expected_resources, len(results))
+
+
+def test_planned_shards_carry_resource_pointers_through_aggregate(lambda_module, small_account, tmp_path):
+    status, plan = invoke(lambda_module, {'request_type': 'coordinate', 'dispatch': 'plan', 'shard_size': 10,
+                                          'result_sink': str(tmp_path)})
+
+    assert status == 200
+    assert all('resources' not in shard and shard['resources_uri'] for shard in plan['shards'])
+    # Step Functions runs each shard payload on a worker, then passes their outputs to 'aggregate'
+    partials = [lambda_module.lambda_handler(shard, None) for shard in plan['shards']]
+    status, body = invoke(lambda_module, {'request_type': 'aggregate', 'partials': partials})
+
+    assert status == 200
+    assert body['resources_scanned'] == plan['resources_scanned'] == small_account.expected_resources
+    assert body['failed_shards'] == []
+    assert len(body['result_parts']) == len(plan['shards'])
+    assert all(len(partial['body']) < fanout.STATE_PAYLOAD_LIMIT // len(partials) for partial in partials)
+
+
+def test_inline_payloads_above_the_limit_are_refused(lambda_module, small_account, monkeypatch):
+    monkeypatch.setattr(fanout, 'STATE_PAYLOAD_LIMIT', 4096)
+
+    status, body = invoke(lambda_module, {'request_type': 'coordinate', 'dispatch': 'plan'})
+
+    assert status == 413
+    assert 'result_sink' in body['error']
+
+
+def test_scan_with_failed_shards_is_not_the_latest_scan(lambda_module, small_account, tmp_path, monkeypatch):
+    evaluate_resources = lambda_module.evaluate_resources
+
+    def fail_rds(resources, event):
+        if any(resource['resource_type'] == 'RDS' for resource in resources):
+            raise RuntimeError('model unavailable')
+        return evaluate_resources(resources, event)
+
+    monkeypatch.setattr(lambda_module, 'evaluate_resources', fail_rds)
+    status, body = invoke(lambda_module, {'request_type': 'coordinate', 'result_sink': str(tmp_path),
+                                          'record_history': True})
+
+    assert status == 200
+    assert body['failed_shards']
+    history = lambda_module._instances['history']
+    assert history._query('SELECT status FROM scans') == [('failed',)]
+    assert history.latest_scans() == []
+    assert json.dumps(body).count('model unavailable') == len(body['failed_shards'])
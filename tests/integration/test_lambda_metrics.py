@@ -0,0 +1,31 @@
+"""Invocation metrics in Lambda response bodies"""
+import json
+
+import pytest
+
+from agents import metrics
+from conftest import invoke
+
+
+@pytest.fixture(autouse=True)
+def recording(monkeypatch):
+    monkeypatch.setattr(metrics, '_enabled', True)
+
+
+def test_metrics_are_added_to_the_response_body(lambda_module):
+    status, body = invoke(lambda_module, {'request_type': 'unknown'})
+
+    assert status == 400
+    assert body['error'] == 'Invalid request type'
+    assert body['metrics']['counters']
+
+
+@pytest.mark.parametrize('response_body', ['{}', '{"message": "done"}', ' {"nested": {"a": [1, 2]}} \n'])
+def test_any_json_object_body_stays_valid(lambda_module, monkeypatch, response_body):
+    monkeypatch.setattr(lambda_module, 'handle_request',
+                        lambda event, context: {'statusCode': 200, 'body': response_body})
+
+    status, body = invoke(lambda_module, {'request_type': 'report'})
+
+    assert status == 200
+    assert set(body) == set(json.loads(response_body)) | {'metrics'}
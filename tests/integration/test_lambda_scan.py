@@ -0,0 +1,30 @@
+"""Lambda scans against the synthetic account"""
+import json
+
+from benchmarks.stub_bedrock import request_prompt, verdict_responder
+from conftest import invoke
+
+
+def test_pairs_without_applicable_rules_are_not_sent_to_the_model(lambda_module, small_account, bedrock):
+    prompted = set()
+
+    def responder(request):
+        for line in request_prompt(request).splitlines():
+            if line.strip().startswith('{"index":'):
+                prompted.update(json.loads(line)['frameworks'])
+        return verdict_responder(request)
+
+    bedrock.responder = responder
+    status, body = invoke(lambda_module, {'request_type': 'scan', 'record_history': True})
+
+    assert status == 200
+    assert bedrock.calls['invoke_model'] > 0
+    assert 'EU_AI_ACT' not in prompted
+    ai_act = [result for result in body['compliance_results'] if result['framework'] == 'EU_AI_ACT']
+    assert len(ai_act) == small_account.expected_resources
+    assert {(result['status'], result['source']) for result in ai_act} == {('NOT_APPLICABLE', 'applicability')}
+    assert body['not_applicable'] >= len(ai_act)
+    # Not applicable verdicts are recorded but not scored
+    scores = lambda_module._instances['history'].current_scores()
+    assert scores['EU_AI_ACT'] is None
+    assert scores['GDPR'] is not None
@@ -0,0 +1,113 @@
+"""Batch remediation against the synthetic account"""
+import json
+
+import pytest
+
+from agents.audit_agent import AuditAgent
+from agents.bedrock_pool import BedrockPool
+from agents.compliance_agent import not_applicable_verdict
+from agents.policy_agent import PolicyAgent
+from agents.response_cache import ResponseCache
+from agents.s3_probes import BucketProbeCache
+from benchmarks.stub_bedrock import verdict_responder
+from conftest import invoke
+from policies.rules import RuleEngine
+
+MUTATING = ('s3:PutBucketEncryption', 'rds:ModifyDBInstance', 'ec2:EnableEbsEncryptionByDefault')
+
+
+@pytest.fixture
+def scan_results(small_account):
+    engine = RuleEngine()
+    agent = AuditAgent(regions=small_account.regions, bucket_cache=BucketProbeCache(ttl=0))
+    results = []
+    for resource in agent.get_all_resources().to_records():
+        for framework in ('GDPR', 'FISMA'):
+            verdict = engine.check(resource, framework)
+            if verdict:
+                results.append(dict(verdict, resource=resource, framework=framework))
+    return results
+
+
+@pytest.fixture
+def policy_agent():
+    return PolicyAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool())
+
+
+def mutating_calls(account):
+    return sum(account.calls[operation] for operation in MUTATING)
+
+
+def test_remediation_is_planned_without_calling_aws_by_default(small_account, scan_results, policy_agent):
+    before = sum(small_account.calls.values())
+
+    plan = policy_agent.remediate_batch(scan_results)
+
+    assert plan['dry_run'] is True
+    assert plan['actions'] > 0
+    assert sum(small_account.calls.values()) == before
+    assert all(action['status'] == 'PLANNED' for group in plan['groups'].values() for action in group)
+
+
+def test_unencrypted_ec2_instances_need_manual_remediation(scan_results, policy_agent):
+    plan = policy_agent.remediate_batch(scan_results)
+
+    assert not [key for key in plan['groups'] if key.startswith('ec2:')]
+    ec2 = [item for item in plan['manual'] if item['resource_type'] == 'EC2' and item['action_type'] == 'encryption']
+    assert ec2
+    assert all('encrypted snapshots' in item['reason'] for item in ec2)
+
+
+def test_ledger_prevents_reapplying(small_account, scan_results, policy_agent):
+    applied = policy_agent.remediate_batch(scan_results, dry_run=False)
+
+    assert applied['remediated'] == applied['actions'] > 0
+    assert applied['failed'] == 0
+    assert mutating_calls(small_account) == applied['actions']
+
+    replay = policy_agent.remediate_batch(scan_results, dry_run=False)
+
+    assert replay['already_applied'] == applied['actions']
+    assert replay['remediated'] == 0
+    assert mutating_calls(small_account) == applied['actions']
+    assert all(action['status'] == 'ALREADY_APPLIED' for group in replay['groups'].values() for action in group)
+
+
+def test_only_non_compliant_and_partial_results_are_remediated(policy_agent):
+    bucket = {'resource_type': 'S3', 'resource_id': 'bucket-1', 'region': 'us-east-1', 'encrypted': True}
+    database = {'resource_type': 'RDS', 'resource_id': 'db-1', 'region': 'us-east-1', 'encrypted': True,
+                'backup_retention': 1, 'multi_az': True}
+    results = [
+        {'status': 'COMPLIANT', 'violations': [], 'risk_level': 'LOW', 'resource': bucket, 'framework': 'GDPR'},
+        dict(not_applicable_verdict(), resource=bucket, framework='EU_AI_ACT'),
+        {'status': 'ERROR', 'error': 'throttled', 'risk_level': 'UNKNOWN', 'resource': bucket, 'framework': 'FISMA'},
+        dict(RuleEngine().check(database, 'GDPR'), resource=database, framework='GDPR'),
+    ]
+
+    plan = policy_agent.remediate_batch(results)
+
+    assert (plan['violations'], plan['actions'], plan['manual']) == (1, 1, [])
+
+
+def compliant_responder(request):
+    """The model finds every pair it is asked about compliant"""
+    answer = json.loads(verdict_responder(request))
+    for verdict in answer.get('results', [answer]):
+        verdict.update(status='COMPLIANT', violations=[], recommendations=[], risk_level='LOW')
+    return json.dumps(answer)
+
+
+def test_full_scan_results_reach_manual_only_when_violating(lambda_module, bedrock, policy_agent):
+    bedrock.responder = compliant_responder
+    status, body = invoke(lambda_module, {'request_type': 'scan'})
+    results = body['compliance_results']
+    assert {'COMPLIANT', 'NOT_APPLICABLE'} <= {result['status'] for result in results}
+
+    plan = policy_agent.remediate_batch(results)
+
+    violating = {(result['resource']['resource_type'], result['resource']['resource_id'])
+                 for result in results if result['status'] in ('NON_COMPLIANT', 'PARTIAL')}
+    assert plan['manual']
+    assert {(item['resource_type'], item['resource_id']) for item in plan['manual']} <= violating
+    assert plan['violations'] == sum(len(result.get('rule_violations') or [None]) for result in results
+                                     if result['status'] in ('NON_COMPLIANT', 'PARTIAL'))
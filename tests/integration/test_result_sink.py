@@ -0,0 +1,83 @@
+"""Result sinks against moto S3, and scans that stream to one"""
+import os
+
+import boto3
+from moto import mock_aws
+
+from agents.result_sink import MIN_PART_SIZE, open_result_sink, read_results
+from conftest import invoke
+
+
+def test_multipart_upload_round_trips_through_s3():
+    # Random payloads barely compress, so the object spans more than one 5 MiB part
+    records = [{'resource_id': f'res-{index:06d}', 'framework': 'GDPR', 'status': 'COMPLIANT',
+                'payload': os.urandom(48).hex()} for index in range(120000)]
+    with mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='results')
+        with open_result_sink('s3://results/scans', 'scan-1', s3=s3, part_size=MIN_PART_SIZE) as sink:
+            for record in records:
+                sink.write(record)
+
+        assert sink.pointer['uri'] == 's3://results/scans/scan-1.ndjson.gz'
+        assert sink.pointer['bytes'] > MIN_PART_SIZE
+        assert list(read_results(sink.pointer['uri'], s3=s3)) == records
+        assert s3.list_multipart_uploads(Bucket='results').get('Uploads', []) == []
+
+
+def test_failed_upload_is_aborted():
+    with mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='results')
+        try:
+            with open_result_sink('s3://results', 'scan-2', s3=s3, part_size=MIN_PART_SIZE) as sink:
+                for index in range(60000):
+                    sink.write({'resource_id': f'res-{index:06d}', 'payload': os.urandom(48).hex()})
+                raise RuntimeError('evaluation failed')
+        except RuntimeError:
+            pass
+
+        assert s3.list_multipart_uploads(Bucket='results').get('Uploads', []) == []
+        assert s3.list_objects_v2(Bucket='results').get('KeyCount') == 0
+
+
+def test_scan_that_fails_part_way_is_closed_as_failed(lambda_module, small_account, tmp_path, monkeypatch):
+    monkeypatch.setenv('RESULT_SINK_CHUNK_SIZE', '25')
+    evaluate_resources = lambda_module.evaluate_resources
+    calls = []
+
+    def fail_on_second_chunk(resources, event):
+        calls.append(len(resources))
+        if len(calls) == 2:
+            raise RuntimeError('model unavailable')
+        return evaluate_resources(resources, event)
+
+    monkeypatch.setattr(lambda_module, 'evaluate_resources', fail_on_second_chunk)
+    sink_dir = tmp_path / 'results'
+    status, body = invoke(lambda_module, {'request_type': 'scan', 'scan_id': 'scan-fails',
+                                          'result_sink': str(sink_dir), 'record_history': True})
+
+    assert status == 500
+    assert 'model unavailable' in body['error']
+    history = lambda_module._instances['history']
+    ((scan_status, finished_at, resources),) = history._query('SELECT status, finished_at, resources FROM scans')
+    assert scan_status == 'failed'
+    assert finished_at is not None
+    assert resources == 25
+    assert history.latest_scans() == []
+    assert not (sink_dir / 'scan-fails.ndjson.gz').exists()
+
+
+def test_completed_scan_becomes_the_latest_scan(lambda_module, small_account, tmp_path, monkeypatch):
+    monkeypatch.setenv('RESULT_SINK_CHUNK_SIZE', '25')
+    status, body = invoke(lambda_module, {'request_type': 'scan', 'scan_id': 'scan-ok',
+                                          'result_sink': str(tmp_path / 'results'), 'record_history': True})
+
+    assert status == 200
+    assert body['resources_scanned'] == small_account.expected_resources
+    history = lambda_module._instances['history']
+    ((scan_status, resources),) = history._query('SELECT status, resources FROM scans')
+    assert (scan_status, resources) == ('completed', small_account.expected_resources)
+    (latest,) = history.latest_scans()
+    assert latest['resources'] == small_account.expected_resources
+    assert sum(1 for _ in read_results(body['results']['uri'])) == body['results']['records']
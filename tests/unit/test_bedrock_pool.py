@@ -0,0 +1,140 @@
+"""BedrockPool backs off on throttling and cancels pending work"""
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+from botocore.exceptions import ClientError
+
+from agents.bedrock_pool import AdaptiveLimiter, BedrockPool
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'InvokeModel')
+
+
+class Flaky:
+    """Raises the given error codes in turn, then answers"""
+
+    def __init__(self, *codes):
+        self.codes = list(codes)
+        self.attempts = 0
+
+    def __call__(self):
+        self.attempts += 1
+        if self.codes:
+            raise client_error(self.codes.pop(0))
+        return 'verdict'
+
+
+def test_throttles_halve_the_limit_and_are_retried():
+    pool = BedrockPool(initial_concurrency=8, base_delay=0)
+    flaky = Flaky('ThrottlingException', 'ThrottlingException')
+
+    assert pool.call(flaky) == 'verdict'
+
+    assert flaky.attempts == 3
+    # 8 halved twice, then one success adds 1/limit
+    assert pool.limiter.limit == pytest.approx(2.5)
+    assert pool.summary() == {'calls': 1, 'retries': 2, 'throttles': 2, 'failures': 0, 'cancelled': 0,
+                              'concurrency_limit': 2.5}
+
+
+def test_transient_errors_are_retried_without_backing_off():
+    pool = BedrockPool(initial_concurrency=4, base_delay=0)
+
+    assert pool.call(Flaky('ServiceUnavailableException')) == 'verdict'
+
+    assert pool.stats['throttles'] == 0
+    assert pool.limiter.limit == pytest.approx(4.25)
+
+
+def test_other_errors_fail_without_retrying():
+    pool = BedrockPool(base_delay=0)
+    flaky = Flaky('AccessDeniedException')
+
+    with pytest.raises(ClientError):
+        pool.call(flaky)
+
+    assert flaky.attempts == 1
+    assert (pool.stats['failures'], pool.stats['retries']) == (1, 0)
+
+
+def test_retries_stop_at_the_limit_and_concurrency_at_the_minimum():
+    pool = BedrockPool(initial_concurrency=4, max_retries=3, base_delay=0)
+    flaky = Flaky(*['ThrottlingException'] * 10)
+
+    with pytest.raises(ClientError):
+        pool.call(flaky)
+
+    assert flaky.attempts == 4
+    assert pool.limiter.limit == 1
+    assert pool.limiter.in_flight == 0
+
+
+def test_limit_grows_by_about_one_slot_per_window_of_successes():
+    limiter = AdaptiveLimiter(initial=4, maximum=5)
+    for _ in range(4):
+        limiter.on_success()
+    assert 4.9 < limiter.limit < 5
+
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.limit == 5
+
+
+def test_calls_never_exceed_the_limit():
+    pool = BedrockPool(max_concurrency=8, initial_concurrency=2)
+    pool.limiter.maximum = 2
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work(_):
+        def model():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+        return pool.call(model)
+
+    pool.map(work, range(8))
+
+    assert peak[0] == 2
+
+
+def test_cancel_pending_aborts_queued_calls():
+    pool = BedrockPool(max_concurrency=1)
+    release = threading.Event()
+    running = pool.submit(release.wait)
+    queued = [pool.submit(lambda: 'verdict') for _ in range(3)]
+
+    pool.cancel_pending()
+    release.set()
+
+    assert running.result(timeout=2) is True
+    for future in queued:
+        with pytest.raises(CancelledError):
+            future.result(timeout=2)
+    assert pool.stats['cancelled'] == 3
+    # Work submitted after the cancellation runs
+    assert pool.submit(lambda: 'verdict').result(timeout=2) == 'verdict'
+
+
+def test_cancel_pending_aborts_calls_waiting_to_retry(monkeypatch):
+    # The longest backoff, so the cancellation lands inside it
+    monkeypatch.setattr('agents.bedrock_pool.random.uniform', lambda low, high: high)
+    pool = BedrockPool(base_delay=4, max_delay=8)
+    flaky = Flaky(*['ThrottlingException'] * 10)
+    future = pool.submit(pool.call, flaky)
+    while flaky.attempts == 0:
+        time.sleep(0.01)
+    started = time.monotonic()
+
+    pool.cancel_pending()
+
+    with pytest.raises(CancelledError):
+        future.result(timeout=2)
+    assert time.monotonic() - started < 1
+    assert flaky.attempts == 1
+    assert pool.stats['cancelled'] == 1
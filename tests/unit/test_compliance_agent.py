@@ -0,0 +1,73 @@
+"""ComplianceAgent verdicts come from the model response, normalised"""
+import json
+
+import pytest
+
+from agents.bedrock_pool import BedrockPool
+from agents.bedrock_runtime import DEFAULT_MODEL_ID
+from agents.compliance_agent import ComplianceAgent
+from agents.model_router import FAST_MODEL_ID, ModelRouter
+from agents.response_cache import ResponseCache
+from conftest import ModelStub
+
+# Passes every deterministic rule, so the model decides it
+RESOURCE = {'resource_type': 'RDS', 'resource_id': 'db-1', 'region': 'us-east-1', 'engine': 'postgres',
+            'encrypted': True, 'backup_retention': 14, 'multi_az': True}
+
+MODEL_VERDICT = {
+    'status': 'PARTIAL',
+    'violations': ['Audit logging is not exported'],
+    'recommendations': ['Export audit logs to CloudWatch'],
+    'risk_level': 'MEDIUM',
+    'confidence': 0.92,
+}
+
+
+def make_agent(texts, routes=None):
+    router = ModelRouter(tiers={'fast': FAST_MODEL_ID, 'strong': DEFAULT_MODEL_ID}, routes=routes or {})
+    agent = ComplianceAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool(), router=router)
+    agent.bedrock = ModelStub(texts)
+    return agent
+
+
+@pytest.fixture
+def agent():
+    return make_agent({FAST_MODEL_ID: json.dumps(MODEL_VERDICT), DEFAULT_MODEL_ID: json.dumps(MODEL_VERDICT)})
+
+
+def test_model_verdict_flows_through_unchanged(agent):
+    verdict = agent.analyze_compliance(RESOURCE, 'GDPR')
+
+    assert verdict == dict(MODEL_VERDICT, model_tier='fast')
+    assert agent.bedrock.models == [FAST_MODEL_ID]
+
+
+def test_single_pair_batch_and_submitted_analysis_return_the_model_verdict(agent):
+    (batched,) = agent.analyze_compliance_batch([(RESOURCE, ['GDPR'])])
+
+    assert batched['GDPR']['status'] == 'PARTIAL'
+    assert batched['GDPR']['violations'] == MODEL_VERDICT['violations']
+    assert agent.submit_analysis(RESOURCE, 'FISMA').result()['violations'] == MODEL_VERDICT['violations']
+
+
+def test_prose_around_the_json_is_tolerated():
+    agent = make_agent({FAST_MODEL_ID: 'Here is my assessment:\n' + json.dumps(MODEL_VERDICT) + '\nThanks.'})
+
+    assert agent.analyze_compliance(RESOURCE, 'GDPR')['recommendations'] == MODEL_VERDICT['recommendations']
+
+
+def test_unparseable_response_escalates_then_reports_an_error():
+    agent = make_agent({FAST_MODEL_ID: 'I cannot tell.', DEFAULT_MODEL_ID: '{"status": "MAYBE"}'})
+
+    verdict = agent.analyze_compliance(RESOURCE, 'GDPR')
+
+    assert verdict['status'] == 'ERROR'
+    assert verdict['model_tier'] == 'strong'
+    assert agent.bedrock.models == [FAST_MODEL_ID, DEFAULT_MODEL_ID]
+
+
+def test_rule_violations_need_no_model_call(agent):
+    verdict = agent.analyze_compliance(dict(RESOURCE, backup_retention=1), 'GDPR')
+
+    assert verdict['source'] == 'rules'
+    assert agent.bedrock.models == []
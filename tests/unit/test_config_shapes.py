@@ -0,0 +1,74 @@
+"""Configuration shapes group resources per framework and fan verdicts out"""
+from agents.bedrock_pool import BedrockPool
+from agents.compliance_agent import ComplianceAgent
+from agents.config_shapes import attribute, group_shapes, shape_key
+from agents.model_router import FAST_MODEL_ID, ModelRouter
+from agents.response_cache import ResponseCache
+from benchmarks.stub_bedrock import StubBedrock, request_prompt, verdict_responder
+
+
+def instance(index, **overrides):
+    return dict({'resource_type': 'EC2', 'resource_id': f'i-{index}', 'region': 'us-east-1', 'state': 'running',
+                 'encrypted': True, 'name': f'web-{index}', 'last_scan': f'2026-10-18T00:00:0{index}'}, **overrides)
+
+
+def test_identity_and_scan_time_fields_do_not_change_the_shape():
+    assert shape_key(instance(1), 'GDPR') == shape_key(instance(2), 'GDPR')
+    assert shape_key(instance(1), 'GDPR') != shape_key(instance(1, encrypted=False), 'GDPR')
+    assert shape_key(instance(1), 'GDPR') != shape_key(instance(1, region='eu-west-1'), 'GDPR')
+
+
+def test_shapes_only_see_the_attributes_a_framework_assesses():
+    # GDPR does not assess the instance state; FISMA does
+    stopped = instance(2, state='stopped')
+
+    assert shape_key(instance(1), 'GDPR') == shape_key(stopped, 'GDPR')
+    assert shape_key(instance(1), 'FISMA') != shape_key(stopped, 'FISMA')
+
+
+def test_groups_list_members_per_framework_in_item_order():
+    items = [(instance(1), ['GDPR', 'FISMA']), (instance(2, state='stopped'), ['GDPR', 'FISMA']),
+             (instance(3), ['FISMA'])]
+
+    groups = group_shapes(items)
+
+    assert list(groups.values()) == [[0, 1], [0, 2], [1]]
+    assert [framework for framework, _ in groups] == ['GDPR', 'FISMA', 'FISMA']
+
+
+def test_attributed_verdicts_are_copies_naming_the_representative():
+    verdict = {'status': 'PARTIAL', 'violations': ['Access controls not documented']}
+    representative, member = instance(1), instance(2)
+
+    own = attribute(verdict, representative, representative, 2)
+    copied = attribute(verdict, member, representative, 2)
+
+    assert own == dict(verdict, shape_members=2)
+    assert copied == dict(verdict, shape_members=2, evaluated_as='i-1')
+    assert verdict == {'status': 'PARTIAL', 'violations': ['Access controls not documented']}
+
+
+def test_batches_evaluate_one_representative_per_shape():
+    router = ModelRouter(tiers={'fast': FAST_MODEL_ID, 'strong': FAST_MODEL_ID}, routes={})
+    agent = ComplianceAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool(), router=router)
+    prompts = []
+
+    def responder(request):
+        prompts.append(request_prompt(request))
+        return verdict_responder(request)
+
+    agent.bedrock = StubBedrock(responder=responder)
+    items = [(instance(index), ['GDPR', 'FISMA']) for index in range(1, 4)]
+    items.append((instance(4, encrypted=False), ['GDPR']))
+
+    results = agent.analyze_compliance_batch(items)
+
+    prompt = '\n'.join(prompts)
+    assert [f'"i-{index}"' in prompt for index in range(1, 5)] == [True, False, False, True]
+    assert [sorted(result) for result in results] == [['FISMA', 'GDPR']] * 3 + [['GDPR']]
+    assert all(result[framework]['status'] == 'PARTIAL' for result in results for framework in result)
+    assert 'evaluated_as' not in results[0]['GDPR']
+    assert [results[index]['FISMA']['evaluated_as'] for index in (1, 2)] == ['i-1', 'i-1']
+    assert results[1]['GDPR']['shape_members'] == 3
+    assert (results[3]['GDPR']['shape_members'], 'evaluated_as' in results[3]['GDPR']) == (1, False)
+    assert results[1]['GDPR'] is not results[2]['GDPR']
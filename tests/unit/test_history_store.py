@@ -0,0 +1,84 @@
+"""HistoryStore scan bookkeeping"""
+import pytest
+
+from agents.history_store import HistoryStore
+
+
+def results(resource_type, count, status='COMPLIANT'):
+    return [{'resource': {'resource_type': resource_type, 'resource_id': f'{resource_type.lower()}-{index}',
+                          'region': 'us-east-1'},
+             'framework': 'GDPR', 'status': status, 'risk_level': 'LOW'} for index in range(count)]
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    yield store
+    store.close()
+
+
+def test_resource_count_comes_from_the_latest_full_scan(history):
+    history.record_scan(results('EC2', 10) + results('S3', 5), 15, started_at=1000.0)
+    history.record_scan(results('EC2', 2, status='NON_COMPLIANT'), 2, source='rescan', started_at=2000.0)
+
+    assert history.resource_count() == 15
+    assert history.resource_count('EC2') == 10
+    assert history.resource_count('S3') == 5
+
+
+def test_resource_count_ignores_failed_scans(history):
+    history.record_scan(results('EC2', 3), 3, started_at=1000.0)
+    failed = history.start_scan('scan', started_at=2000.0)
+    history.add_results(failed, results('RDS', 4))
+    history.finish_scan(failed, 4, status='failed')
+
+    assert history.resource_count('EC2') == 3
+    assert [scan['resources'] for scan in history.latest_scans()] == [3]
+
+
+def test_rescans_alone_give_no_resource_count(history):
+    history.record_scan(results('EC2', 2), 2, source='rescan')
+
+    assert history.resource_count() == 0
+
+
+def test_full_scan_retires_verdicts_of_resources_it_did_not_see(history):
+    history.record_scan(results('S3', 4, status='NON_COMPLIANT'), 4, started_at=1000.0)
+    history.record_scan(results('S3', 1), 1, started_at=2000.0)
+
+    assert history.current_summary() == {'verdicts': 1, 'non_compliant': 0, 'critical_violations': 0,
+                                         'compliance_score': 100.0}
+    assert history.current_scores() == {'GDPR': 100.0}
+    assert history.latest_scans()[0]['compliance_score'] == 100.0
+    assert history.resource_count() == 1
+
+
+def test_rescans_and_failed_scans_retire_nothing(history):
+    history.record_scan(results('S3', 4, status='NON_COMPLIANT'), 4, started_at=1000.0)
+    history.record_scan(results('S3', 1), 1, source='rescan', started_at=2000.0)
+    failed = history.start_scan('scan', started_at=3000.0)
+    history.add_results(failed, results('S3', 1))
+    history.finish_scan(failed, 1, status='failed')
+
+    assert history.current_summary() == {'verdicts': 4, 'non_compliant': 3, 'critical_violations': 0,
+                                         'compliance_score': 25.0}
+
+
+def test_a_resource_that_reappears_counts_again(history):
+    history.record_scan(results('S3', 2, status='NON_COMPLIANT'), 2, started_at=1000.0)
+    history.record_scan(results('S3', 1, status='NON_COMPLIANT'), 1, started_at=2000.0)
+    history.record_scan(results('S3', 2, status='NON_COMPLIANT'), 2, started_at=3000.0)
+
+    assert history.current_summary()['non_compliant'] == 2
+
+
+def test_recent_violations_only_list_resources_the_latest_full_scan_saw(history):
+    history.record_scan(results('S3', 4, status='NON_COMPLIANT'), 4, started_at=1000.0)
+    history.record_scan(results('S3', 2, status='NON_COMPLIANT'), 2, started_at=2000.0)
+
+    assert sorted(violation['resource'] for violation in history.recent_violations()) == \
+        ['S3:us-east-1:s3-0', 'S3:us-east-1:s3-1']
+
+    # A rescan does not retire what it did not touch
+    history.record_scan(results('S3', 1, status='NON_COMPLIANT'), 1, source='rescan', started_at=3000.0)
+    assert len(history.recent_violations()) == 2
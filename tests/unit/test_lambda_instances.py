@@ -0,0 +1,31 @@
+"""Shared agents are created once even when requested from several threads"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import lambda_function
+from agents import fingerprint_store
+
+
+def test_concurrent_getters_create_one_instance(monkeypatch):
+    monkeypatch.setattr(lambda_function, '_instances', {})
+    created = []
+    start = threading.Barrier(8)
+
+    class SlowStore:
+        def __init__(self):
+            # Widen the window between the check and the set
+            time.sleep(0.05)
+            created.append(self)
+
+    monkeypatch.setattr(fingerprint_store, 'FingerprintStore', SlowStore)
+
+    def get(_):
+        start.wait()
+        return lambda_function.get_fingerprint_store()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        stores = list(pool.map(get, range(8)))
+
+    assert len(created) == 1
+    assert all(store is created[0] for store in stores)
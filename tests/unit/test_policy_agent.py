@@ -0,0 +1,100 @@
+"""PolicyAgent enforcement results come from the rule engine or the model"""
+import json
+
+from agents.bedrock_pool import BedrockPool
+from agents.bedrock_runtime import DEFAULT_MODEL_ID
+from agents.model_router import FAST_MODEL_ID, ModelRouter
+from agents.policy_agent import PolicyAgent
+from agents.response_cache import ResponseCache
+from conftest import ModelStub
+from policies.applicability import ApplicabilityIndex
+
+# Passes every deterministic rule, so the model decides it
+RESOURCE = {'resource_type': 'RDS', 'resource_id': 'db-1', 'region': 'us-east-1', 'engine': 'postgres',
+            'encrypted': True, 'backup_retention': 14, 'multi_az': True}
+
+RETENTION = 'Data retention policies must be defined and enforced'
+AUDIT_LOGGING = {'rule': 'Audit logging required', 'severity': 'high', 'current_state': 'Not exported',
+                 'required_action': 'Export audit logs', 'action_type': 'manual'}
+
+
+def make_agent(texts):
+    router = ModelRouter(tiers={'fast': FAST_MODEL_ID, 'strong': DEFAULT_MODEL_ID}, routes={})
+    # Every framework rule applies, so each request needs the model
+    agent = PolicyAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool(), router=router,
+                        applicability=ApplicabilityIndex(scopes={}))
+    agent.bedrock = ModelStub(texts)
+    return agent
+
+
+def test_model_result_flows_through():
+    agent = make_agent({FAST_MODEL_ID: json.dumps({'violations': [AUDIT_LOGGING], 'compliance_score': 80,
+                                                   'confidence': 0.95})})
+
+    result = agent.enforce_policy(RESOURCE, 'GDPR')
+
+    assert result == {
+        'resource_id': 'db-1',
+        'framework': 'GDPR',
+        'violations': [dict(AUDIT_LOGGING, severity='HIGH')],
+        'compliance_score': 80,
+        'auto_remediation': False,
+        'enforcement_status': 'PENDING',
+        'model_tier': 'fast',
+        'confidence': 0.95,
+    }
+
+
+def test_escalated_result_comes_from_the_stronger_model():
+    agent = make_agent({
+        FAST_MODEL_ID: json.dumps({'violations': [AUDIT_LOGGING], 'compliance_score': 50, 'confidence': 0.3}),
+        DEFAULT_MODEL_ID: json.dumps({'violations': [], 'compliance_score': 100, 'confidence': 0.9}),
+    })
+
+    result = agent.enforce_policy(RESOURCE, 'GDPR')
+
+    assert agent.bedrock.models == [FAST_MODEL_ID, DEFAULT_MODEL_ID]
+    assert (result['violations'], result['compliance_score']) == ([], 100)
+    assert (result['enforcement_status'], result['model_tier']) == ('COMPLIANT', 'strong')
+
+
+def test_missing_score_is_derived_from_the_rules_violated():
+    agent = make_agent({FAST_MODEL_ID: json.dumps({'violations': [RETENTION, 'Audit logging required']})})
+
+    result = agent.enforce_policy(RESOURCE, 'GDPR')
+
+    assert result['violations'][0] == {'rule': RETENTION, 'severity': 'UNKNOWN', 'current_state': '',
+                                       'required_action': '', 'action_type': 'manual'}
+    # Five GDPR rules and one more the model found: two of six are violated
+    assert result['compliance_score'] == 66
+
+
+def test_unparseable_response_is_an_error():
+    agent = make_agent({FAST_MODEL_ID: 'Encryption looks fine.', DEFAULT_MODEL_ID: '{"score": "high"}'})
+
+    result = agent.enforce_policy(RESOURCE, 'GDPR')
+
+    assert result['enforcement_status'] == 'ERROR'
+    assert result['model_tier'] == 'strong'
+    assert 'violations' not in result
+
+
+def test_rule_violations_are_scored_against_the_rules_judged():
+    agent = make_agent({})
+
+    result = agent.enforce_policy(dict(RESOURCE, encrypted=False, backup_retention=1), 'GDPR')
+
+    # The encryption rule is one of GDPR's five; the backup rule is a sixth
+    assert [violation['rule_id'] for violation in result['violations']] == ['encryption_at_rest', 'backup_retention']
+    assert result['compliance_score'] == 66
+    assert agent.bedrock.models == []
+
+
+def test_pairs_without_applicable_rules_need_no_model_call():
+    agent = PolicyAgent(cache=ResponseCache(max_entries=0), pool=BedrockPool())
+    agent.bedrock = ModelStub({})
+
+    result = agent.enforce_policy(RESOURCE, 'EU_AI_ACT')
+
+    assert (result['enforcement_status'], result['compliance_score']) == ('NOT_APPLICABLE', 100)
+    assert agent.bedrock.models == []
@@ -0,0 +1,89 @@
+"""ResourceTable rows, column encodings and DataFrame round trips"""
+import pandas as pd
+import pytest
+
+from agents.resource_table import ResourceTable, _CategoryColumn, _FlagColumn, _ObjectColumn
+from policies.rules import RuleEngine
+
+RECORDS = [
+    {'resource_type': 'EC2', 'resource_id': 'i-1', 'region': 'us-east-1', 'state': 'running', 'encrypted': None},
+    {'resource_type': 'S3', 'resource_id': 'bucket-1', 'region': 'eu-west-1', 'encrypted': True,
+     'public_access_blocked': False, 'tags': None},
+    {'resource_type': 'RDS', 'resource_id': 'db-1', 'region': 'us-east-1', 'engine': 'postgres', 'encrypted': False,
+     'backup_retention': 1, 'multi_az': True},
+    {'resource_type': 'S3', 'error': 'AccessDenied'},
+]
+
+
+def test_rows_come_back_as_they_were_appended():
+    table = ResourceTable(RECORDS)
+
+    assert table.to_records() == RECORDS
+    assert (table[-1], len(table)) == (RECORDS[-1], 4)
+    assert isinstance(table._columns['region'], _CategoryColumn)
+    assert isinstance(table._columns['encrypted'], _FlagColumn)
+    # Absent attributes and attributes set to None read back differently
+    assert 'tags' not in table[0] and table[1]['tags'] is None
+    assert table.column('encrypted') == [None, True, False, None]
+    assert table.column('missing') == [None] * 4
+    with pytest.raises(IndexError):
+        table[4]
+
+
+def test_values_that_do_not_fit_are_promoted_to_a_plain_column():
+    table = ResourceTable(RECORDS)
+    table.append({'resource_type': 'S3', 'encrypted': 'aws:kms', 'state': ['available']})
+
+    assert isinstance(table._columns['encrypted'], _ObjectColumn)
+    assert isinstance(table._columns['state'], _ObjectColumn)
+    assert table.to_records() == RECORDS + [{'resource_type': 'S3', 'encrypted': 'aws:kms', 'state': ['available']}]
+
+
+def test_selections_keep_only_the_columns_their_rows_have():
+    table = ResourceTable(RECORDS)
+
+    usable = table.without_errors()
+    buckets = table.filter(lambda row: row['resource_type'] == 'S3' and 'error' not in row)
+
+    assert usable.to_records() == RECORDS[:3]
+    assert 'error' not in usable.columns
+    assert buckets.to_records() == [RECORDS[1]]
+    assert set(buckets.columns) == set(RECORDS[1])
+    assert table[1:3].to_records() == RECORDS[1:3]
+    assert ResourceTable.concat([table[:2], RECORDS[2:]]).to_records() == RECORDS
+
+
+def test_dataframe_round_trip_keeps_unknown_flags():
+    table = ResourceTable(RECORDS)
+
+    frame = table.to_dataframe()
+
+    assert isinstance(frame['resource_type'].dtype, pd.CategoricalDtype)
+    assert frame['encrypted'].isna().tolist() == [True, False, False, True]
+    assert ResourceTable.from_dataframe(frame).to_records() == RECORDS
+
+
+def test_dataframe_is_cached_until_the_table_changes():
+    table = ResourceTable(RECORDS)
+    frame = table.to_dataframe()
+    assert table.to_dataframe() is frame
+
+    table.append({'resource_type': 'EC2', 'resource_id': 'i-2'})
+
+    assert len(table.to_dataframe()) == 5
+
+
+def test_nan_cells_of_other_frames_become_absent_attributes():
+    frame = pd.DataFrame([{'resource_type': 'RDS', 'backup_retention': 7},
+                          {'resource_type': 'S3', 'versioning': 'Enabled'}])
+
+    assert ResourceTable.from_dataframe(frame).to_records() == [
+        {'resource_type': 'RDS', 'backup_retention': 7.0},
+        {'resource_type': 'S3', 'versioning': 'Enabled'},
+    ]
+
+
+def test_rules_decide_the_same_from_a_table_as_from_dicts():
+    engine = RuleEngine()
+
+    assert engine.evaluate(ResourceTable(RECORDS), ['GDPR', 'FISMA']) == engine.evaluate(RECORDS, ['GDPR', 'FISMA'])
@@ -0,0 +1,113 @@
+"""ResponseCache expiry, eviction and its disk tier"""
+import json
+
+import pytest
+
+from agents import response_cache
+from agents.response_cache import ResponseCache, cache_key
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, 'time', clock)
+    return clock
+
+
+def verdict(index):
+    return {'status': 'COMPLIANT', 'index': index}
+
+
+def size(response):
+    return len(json.dumps(response, separators=(',', ':')))
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl=10)
+    cache.put('a', verdict(1))
+
+    clock.now += 9
+    assert cache.get('a') == verdict(1)
+    clock.now += 2
+    assert cache.get('a') is None
+    assert cache.summary()['entries'] == 0
+    assert (cache.stats['memory_hits'], cache.stats['misses']) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_first(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.put('a', verdict(1))
+    cache.put('b', verdict(2))
+    cache.get('a')
+
+    cache.put('c', verdict(3))
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (verdict(1), verdict(3))
+    assert cache.stats['evictions'] == 1
+
+
+def test_memory_tier_is_bounded_by_bytes(clock):
+    cache = ResponseCache(max_bytes=2 * size(verdict(1)))
+    for index in (1, 2, 3):
+        cache.put(str(index), verdict(index))
+
+    assert cache.get('1') is None
+    assert cache.summary()['bytes'] == 2 * size(verdict(1))
+    # A response larger than the whole tier is not kept
+    cache.put('big', {'padding': 'x' * 3 * size(verdict(1))})
+    assert cache.get('big') is None
+    assert cache.summary()['bytes'] == 0
+
+
+def test_disk_hits_are_promoted_into_memory(clock, tmp_path):
+    path = str(tmp_path / 'responses.db')
+    cache = ResponseCache(max_entries=1, path=path)
+    cache.put('a', verdict(1))
+    cache.put('b', verdict(2))
+
+    assert cache.get('a') == verdict(1)
+    assert cache.get('a') == verdict(1)
+    assert (cache.stats['disk_hits'], cache.stats['memory_hits']) == (1, 1)
+    # The disk tier outlives the process; a new cache starts cold in memory
+    assert ResponseCache(path=path).get('b') == verdict(2)
+
+
+def test_expired_disk_entries_are_not_returned(clock, tmp_path):
+    path = str(tmp_path / 'responses.db')
+    ResponseCache(ttl=10, path=path).put('a', verdict(1))
+
+    clock.now += 11
+
+    assert ResponseCache(path=path).get('a') is None
+
+
+def test_disk_tier_keeps_the_most_recently_used_entries(clock, tmp_path):
+    cache = ResponseCache(max_entries=0, path=str(tmp_path / 'responses.db'), max_disk_entries=2)
+    cache.put('a', verdict(1))
+    clock.now += 1
+    cache.put('b', verdict(2))
+    clock.now += 1
+    cache.get('a')
+    clock.now += 1
+
+    cache.put('c', verdict(3))
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (verdict(1), verdict(3))
+
+
+def test_keys_ignore_prompt_whitespace_but_not_parameters():
+    params = {'max_tokens': 1000}
+
+    assert cache_key('model', 'Assess\n    this resource', params) == cache_key('model', 'Assess this resource', params)
+    assert cache_key('model', 'Assess', params) != cache_key('model', 'Assess', {'max_tokens': 500})
+    assert cache_key('model', 'Assess', params) != cache_key('other-model', 'Assess', params)